@@ -7,21 +7,26 @@ import cv2
 from PIL import Image
 from datetime import datetime
 import pathlib
+import threading
 
 from utils.durian_grader import process_multi_view
 from utils.camera_manager import CameraManager
 from utils.image_combiner import combine_images_grid
+from utils.preview_pipeline import PreviewPipeline
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("green")
 
+# ช่วงเวลารีเฟรช preview จากกล้อง (วินาที)
+PREVIEW_INTERVAL = 1.0
+
 def resize_with_aspect_ratio(image, max_width, max_height):
     img_pil = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
     img_pil.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
     return img_pil
 
 class DurianGraderApp(TkinterDnD.Tk):
-    def __init__(self):
+    def __init__(self, preview_interval=PREVIEW_INTERVAL):
         super().__init__()
         self.title("Durian Grading System - Multi View")
         self.geometry("1440x960")
@@ -113,26 +118,49 @@ class DurianGraderApp(TkinterDnD.Tk):
         )
         self.save_button.grid(row=0, column=1, sticky="ew")
 
-        self.after(1000, self.update_previews)
-
-    def update_previews(self):
-        frames = self.camera_manager.get_frames()
-
+        # ดึงภาพและเตรียม preview ใน background thread, main loop ทำแค่สลับรูปใน label
+        self.preview_pipeline = PreviewPipeline(
+            self.camera_manager,
+            on_ready=lambda frames, previews: self.after(0, lambda: self.apply_previews(frames, previews)),
+            interval=preview_interval
+        )
+        self.after(1000, self.start_previews)
+
+    def start_previews(self):
+        self._sync_preview_pipeline()
+        self.preview_pipeline.start()
+
+    def _sync_preview_pipeline(self):
+        """ส่งขนาด label และช่องที่แสดงภาพนิ่งอยู่ให้ preview pipeline (เรียกจาก main thread)"""
+        sizes = {}
+        for i, label in enumerate(self.image_labels):
+            max_width = label.winfo_width() - 20
+            max_height = label.winfo_height() - 20
+            sizes[i] = (max_width if max_width > 0 else 300, max_height if max_height > 0 else 200)
+        self.preview_pipeline.set_preview_sizes(sizes)
+        self.preview_pipeline.set_skipped(self._static_views())
+
+    def _static_views(self):
+        """ช่องที่แสดงผลวิเคราะห์หรือรูปจากไฟล์ ไม่ต้องอัพเดตจากกล้อง"""
+        return {i for i in range(6) if self.analysis_results[i] is not None or i in self.loaded_images}
+
+    def apply_previews(self, frames, previews):
+        """สลับ preview จากกล้องที่เตรียมไว้แล้วเข้า label (ทำงานใน main loop)"""
+        static_views = self._static_views()
         for i in range(6):
-            if self.analysis_results[i] is not None:
-                frame = self.analysis_results[i]
-            elif i in self.loaded_images:
-                frame = self.loaded_images[i]
-            else:
-                frame = frames[i] if frames else None
+            if i in static_views:
+                continue
 
-            if frame is not None:
+            frame = frames[i] if i < len(frames) else None
+            preview = previews[i] if i < len(previews) else None
+            if frame is not None and preview is not None:
                 self.frames[i] = frame
-                self.update_single_preview(i, frame)
+                self.image_labels[i].configure(image=preview, text="")
+                self.image_labels[i].image = preview
             else:
                 self.image_labels[i].configure(text=f"View {i+1}\n(ไม่สามารถแสดงภาพได้)", image=None)
 
-        self.after(1000, self.update_previews)
+        self._sync_preview_pipeline()
 
     def update_single_preview(self, index, frame):
         label = self.image_labels[index]
@@ -184,20 +212,46 @@ class DurianGraderApp(TkinterDnD.Tk):
         self.result_textbox.configure(state="normal")
         self.result_textbox.delete("1.0", "end")
         self.result_textbox.insert("1.0", "กำลังวิเคราะห์ภาพจากกล้อง...\n")
-        self.update()
-
-        captured_frames = self.frames
-
-        # เรียกใช้งาน process_multi_view ซึ่งคืนค่า (frames_with_results, result_text)
-        frames_with_results, result_text = process_multi_view(captured_frames)
+        self.result_textbox.configure(state="disabled")
+        self.analyze_button.configure(state="disabled")
+
+        # ถ่ายภาพและวิเคราะห์ใน background thread (การถ่ายแบบ sync ลองได้หลายรอบ และ inference ใช้เวลานาน)
+        captured_frames = list(self.frames)
+        loaded_views = set(self.loaded_images)
+        threading.Thread(target=self._capture_job, args=(captured_frames, loaded_views), daemon=True).start()
+
+    def _capture_job(self, captured_frames, loaded_views):
+        """ถ่ายชุดใหม่และวิเคราะห์ (ทำงานใน background thread) แล้วส่งผลเข้า main loop"""
+        try:
+            # ถ่ายชุดใหม่จากกล้องทุกตัวพร้อมกัน (มุมที่โหลดรูปจากไฟล์ไว้ใช้รูปเดิม)
+            synced_frames, timestamps = self.camera_manager.get_synced_frames()
+            sync_note = ""
+            if synced_frames is not None:
+                for i, frame in enumerate(synced_frames):
+                    if i not in loaded_views and frame is not None:
+                        captured_frames[i] = frame
+            elif any(t is not None for t in timestamps):
+                spread = self.camera_manager.frame_spread(timestamps)
+                sync_note = f"⚠️ ภาพจากกล้องไม่พร้อมกัน (ห่างกัน {spread * 1000:.0f} ms) ใช้ภาพล่าสุดแทน\n\n"
+
+            # เรียกใช้งาน process_multi_view ซึ่งคืนค่า (frames_with_results, result_text)
+            frames_with_results, result_text = process_multi_view(captured_frames)
+        except Exception as e:
+            frames_with_results, result_text, sync_note = None, f"เกิดข้อผิดพลาดในการวิเคราะห์: {e}", ""
+        self.after(0, lambda: self._show_analysis(frames_with_results, result_text, sync_note))
+
+    def _show_analysis(self, frames_with_results, result_text, sync_note):
+        """แสดงผลการวิเคราะห์ (ทำงานใน main loop)"""
+        self.analyze_button.configure(state="normal")
 
         # เก็บภาพผลวิเคราะห์แต่ละ view ลง self.analysis_results
         if frames_with_results is not None and len(frames_with_results) == 6:
             self.analysis_results = frames_with_results
 
         current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        self.result_textbox.configure(state="normal")
         self.result_textbox.delete("1.0", "end")
-        self.result_textbox.insert("1.0", f"📅 วิเคราะห์เมื่อ: {current_time}\n\n{result_text}")
+        self.result_textbox.insert("1.0", f"📅 วิเคราะห์เมื่อ: {current_time}\n\n{sync_note}{result_text}")
         self.result_textbox.configure(state="disabled")
 
         # อัพเดต preview ให้แสดงภาพผลวิเคราะห์ทันที
@@ -223,6 +277,7 @@ class DurianGraderApp(TkinterDnD.Tk):
             cv2.imwrite(file_path, combined_image)
 
     def on_closing(self):
+        self.preview_pipeline.stop()
         self.camera_manager.release_cameras()
         self.destroy()
 
@@ -1,45 +1,108 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 
 class CameraManager:
-    def __init__(self, camera_ids=None):
+    def __init__(self, camera_ids=None, threaded=True, sync_window=0.05):
         if camera_ids is None:
             camera_ids = [0, 1, 2, 3, 4, 5]  # ค่าเริ่มต้นกล้อง 6 ตัว
         self.camera_ids = camera_ids
         self.captures = []
+        # threaded = grab() ทุกกล้องพร้อมกัน (thread ละกล้อง) แล้วค่อย retrieve()
+        self.threaded = threaded
+        # ชุดภาพที่ timestamp ห่างกันเกิน sync_window วินาทีถือว่าไม่พร้อมกัน
+        self.sync_window = sync_window
+        self._executor = None
+        # grab()/retrieve() ของ VideoCapture ตัวเดียวกันจากหลาย thread ไม่ปลอดภัย (preview และการถ่ายเพื่อวิเคราะห์)
+        # และ retrieve() อาจได้ภาพที่ thread อื่น grab ไว้ จึงให้อ่านกล้องได้ทีละ thread
+        self._lock = threading.RLock()
 
     def initialize_cameras(self):
         """เชื่อมต่อกล้องทั้งหมดตาม ID"""
         self.captures = [cv2.VideoCapture(i) for i in self.camera_ids]
+        if self.threaded and self.captures:
+            self._executor = ThreadPoolExecutor(max_workers=len(self.captures), thread_name_prefix="camera")
 
     def release_cameras(self):
         """ปล่อยกล้องทั้งหมดเมื่อเลิกใช้งาน"""
-        for cap in self.captures:
-            if cap.isOpened():
-                cap.release()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+            for cap in self.captures:
+                if cap.isOpened():
+                    cap.release()
+
+    def _map(self, func, captures):
+        """เรียก func กับทุกกล้อง (พร้อมกันใน thread pool เมื่อเป็นโหมด threaded)"""
+        if self._executor is not None:
+            return list(self._executor.map(func, captures))
+        return [func(cap) for cap in captures]
+
+    @staticmethod
+    def _grab(cap):
+        # timestamp คือเวลาที่ grab() เสร็จ ใกล้กับเวลาถ่ายจริงที่สุด
+        ok = cap.grab()
+        return ok, time.time()
+
+    @staticmethod
+    def _retrieve(cap):
+        ret, frame = cap.retrieve()
+        return frame if ret else None
+
+    def get_frame_set(self):
+        """
+        ดึงภาพจากกล้องทั้งหมดพร้อมเวลาที่ถ่าย
+        grab() ทุกกล้องก่อน (เร็ว ไม่ต้อง decode) แล้วจึง retrieve() เพื่อให้แต่ละมุมถ่ายใกล้เวลาเดียวกันที่สุด
+        คืนค่า (frames, timestamps) กล้องที่อ่านไม่ได้จะเป็น None ทั้งสองค่า
+        """
+        with self._lock:
+            grabs = self._map(self._grab, self.captures)
+            grabbed = [cap for cap, (ok, _) in zip(self.captures, grabs) if ok]
+            retrieved = list(self._map(self._retrieve, grabbed))
+        retrieved = iter(retrieved)
+
+        frames, timestamps = [], []
+        for ok, timestamp in grabs:
+            frame = next(retrieved) if ok else None
+            frames.append(frame)
+            timestamps.append(timestamp if frame is not None else None)
+        return frames, timestamps
+
+    def frame_spread(self, timestamps):
+        """ระยะเวลาระหว่างภาพแรกและภาพสุดท้ายในชุด (วินาที) ไม่นับกล้องที่อ่านไม่ได้"""
+        valid = [t for t in timestamps if t is not None]
+        return max(valid) - min(valid) if valid else 0.0
+
+    def get_synced_frames(self, attempts=3):
+        """
+        ดึงชุดภาพที่ทุกมุมถ่ายห่างกันไม่เกิน sync_window
+        ลองใหม่ไม่เกิน attempts ครั้ง คืนค่า (frames, timestamps) หรือ (None, timestamps ล่าสุด) ถ้าไม่พร้อมกัน
+        """
+        timestamps = []
+        # ถือ lock ตลอดทุกครั้งที่ลอง ไม่ให้ preview แทรก grab() ระหว่างรอบ
+        with self._lock:
+            for _ in range(attempts):
+                frames, timestamps = self.get_frame_set()
+                if self.frame_spread(timestamps) <= self.sync_window:
+                    return frames, timestamps
+        return None, timestamps
 
     def get_frames(self):
         """ดึงภาพจากกล้องทั้งหมด"""
-        frames = []
-        for cap in self.captures:
-            ret, frame = cap.read()
-            if ret:
-                frames.append(frame)
-            else:
-                frames.append(None)
-        return frames
+        return self.get_frame_set()[0]
 
     def check_status(self):
         """ตรวจสอบว่าแต่ละกล้องพร้อมใช้งานหรือไม่"""
-        status = []
-        for i, cap in enumerate(self.captures):
-            ret, _ = cap.read()
-            status.append(ret)
-        return status
+        with self._lock:
+            return [ok for ok, _ in self._map(self._grab, self.captures)]
 
     def capture_single(self, index):
         """ดึงภาพจากกล้องตัวใดตัวหนึ่ง"""
         if 0 <= index < len(self.captures):
-            cap = self.captures[index]
-            ret, frame = cap.read()
+            with self._lock:
+                ret, frame = self.captures[index].read()
             return frame if ret else None
         return None
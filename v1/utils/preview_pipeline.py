@@ -0,0 +1,81 @@
+import threading
+import time
+
+import cv2
+from PIL import Image
+from customtkinter import CTkImage
+
+def fit_size(width, height, max_width, max_height):
+    """ขนาดใหม่ที่คงอัตราส่วนภาพและไม่เกิน max_width x max_height"""
+    ratio = min(max_width / width, max_height / height, 1.0)
+    return max(int(width * ratio), 1), max(int(height * ratio), 1)
+
+def make_preview(frame, max_width, max_height):
+    """ย่อภาพ BGR ด้วย INTER_AREA แล้วสร้าง CTkImage (ไม่แตะ Tk จึงเรียกนอก main thread ได้)"""
+    height, width = frame.shape[:2]
+    size = fit_size(width, height, max_width, max_height)
+    small = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+    img_pil = Image.fromarray(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+    return CTkImage(light_image=img_pil, dark_image=img_pil, size=img_pil.size)
+
+class PreviewPipeline:
+    """
+    ดึงภาพจากกล้อง ย่อ และเตรียม CTkImage ใน thread แยกทุก interval วินาที
+    แล้วส่งผลให้ on_ready(frames, previews) โดย previews[i] เป็น None เมื่อกล้องนั้นไม่มีภาพ
+    (on_ready ถูกเรียกจาก thread ของ pipeline ผู้เรียกต้องส่งต่อเข้า main loop เอง)
+    """
+
+    def __init__(self, camera_manager, on_ready, interval=1.0, preview_size=(300, 200)):
+        self.camera_manager = camera_manager
+        self.on_ready = on_ready
+        self.interval = interval
+        # ขนาดสูงสุดของ preview แต่ละช่อง อัพเดตได้จาก main thread ด้วย set_preview_sizes()
+        self._preview_sizes = {}
+        self._default_size = preview_size
+        self._skip = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def set_preview_sizes(self, sizes):
+        """กำหนดขนาด preview ของแต่ละช่อง {index: (max_width, max_height)}"""
+        with self._lock:
+            self._preview_sizes = dict(sizes)
+
+    def set_skipped(self, indices):
+        """ช่องที่แสดงภาพอื่นอยู่ (รูปจากไฟล์/ผลวิเคราะห์) ไม่ต้องเตรียม preview"""
+        with self._lock:
+            self._skip = set(indices)
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.perf_counter()
+            try:
+                frames = self.camera_manager.get_frames()
+                with self._lock:
+                    sizes, skip = dict(self._preview_sizes), set(self._skip)
+
+                previews = [
+                    make_preview(frame, *sizes.get(i, self._default_size))
+                    if frame is not None and i not in skip else None
+                    for i, frame in enumerate(frames)
+                ]
+                if not self._stop.is_set():
+                    self.on_ready(frames, previews)
+            except Exception as e:
+                print(f"Preview pipeline error: {e}")
+
+            # นับเวลาที่ใช้ดึงภาพรวมในรอบ เพื่อให้อัตรารีเฟรชคงที่
+            self._stop.wait(max(self.interval - (time.perf_counter() - start), 0.0))
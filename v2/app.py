@@ -585,21 +585,12 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             # วิเคราะห์แต่ละรูป
             for img_key, img_array in self.original_images.items():
                 if img_array is not None:
-                    # บันทึกรูปชั่วคราว
-                    temp_path = f"temp_{img_key}.jpg"
-                    img_bgr = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-                    cv2.imwrite(temp_path, img_bgr)
-                    
-                    # วิเคราะห์
-                    processed_img, text_result = process_image(temp_path)
+                    # วิเคราะห์จาก array โดยตรง (รูปเก็บเป็น RGB)
+                    processed_img, text_result = process_image(img_array, color_order='RGB')
                     
                     if processed_img is not None:
                         self.processed_images[img_key] = processed_img
                         results[img_key] = text_result
-                    
-                    # ลบไฟล์ชั่วคราว
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
             
             # คำนวณระยะห่างสำหรับแต่ละ segment
             segment_distances = self._calculate_segment_distances()
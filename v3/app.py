@@ -15,6 +15,7 @@ from utils.config_loader import load_config, save_config
 from utils.durian_grader import process_image
 from utils.camera_settings import CameraSettingsDialog
 from utils.config_settings import ConfigSettingsDialog
+from utils.camera_pool import CameraPool
 
 # ตั้งค่าธีมสีและรูปแบบ
 ctk.set_appearance_mode("System")
@@ -63,6 +64,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         
         # ตัวแปรสำหรับกล้อง
         self.camera = None
+        self.camera_idx = None
         self.camera_active = False
         self.camera_thread = None
         self.loader_config()
@@ -83,8 +85,8 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.text_font = CTkFont(family="Helvetica", size=13)
         self.result_font = CTkFont(family="Consolas", size=14)
         
-        # ตรวจหากล้องที่มีอยู่
-        self._detect_cameras()
+        # handle กล้องที่เปิดไว้แล้ว ใช้ซ้ำตอนเปิด/สลับกล้อง
+        self.camera_pool = CameraPool()
         
         # สร้าง UI
         self._create_header_frame()
@@ -101,23 +103,53 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         )
         self.status_bar.grid(row=3, column=0, sticky="ew", padx=10, pady=(0, 5))
 
+        # ตรวจหากล้องใน background หลังจากหน้าต่างแสดงแล้ว
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(0, self._detect_cameras)
+
     def _detect_cameras(self):
-        """ตรวจหากล้องที่มีใช้ได้ในระบบ"""
-        self.available_cameras = []
-        
-        # ตรวจสอบกล้องสูงสุด 10 ตัว
-        for i in range(10):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret:
-                    self.available_cameras.append(i)
-                cap.release()
-            else:
-                break
-        
+        """ตรวจหากล้องที่มีใช้ได้ในระบบ (สูงสุด 10 ตัว) ใน background thread"""
+        self.camera_pool.discover_async(
+            lambda cameras: self.after(0, lambda: self._on_cameras_detected(cameras))
+        )
+
+    def _on_cameras_detected(self, cameras):
+        """เรียกใน main loop เมื่อค้นหากล้องเสร็จ"""
+        self.available_cameras = cameras
         if not self.available_cameras:
             print("ไม่พบกล้องในระบบ")
+            return
+        self._create_camera_controls()
+
+    def _create_camera_controls(self):
+        """สร้างปุ่มเลือกกล้องและปุ่มเปิด/ปิดกล้อง ไว้หน้าปุ่มตั้งค่า"""
+        # ปุ่มเลือกกล้อง
+        self.camera_label = ctk.CTkLabel(self.btn_frame, text="เลือกกล้อง:", font=self.text_font)
+        self.camera_label.pack(side="left", padx=(10, 5), pady=10, before=self.config_btn)
+        
+        camera_options = [f"กล้อง {i}" for i in self.available_cameras]
+        self.camera_combo = ctk.CTkComboBox(
+            self.btn_frame,
+            values=camera_options,
+            command=self.on_camera_select,
+            width=120,
+            font=self.text_font
+        )
+        self.camera_combo.pack(side="left", padx=5, pady=10, before=self.config_btn)
+        self.camera_combo.set(camera_options[0])
+        self.selected_camera_idx = self.available_cameras[0]
+        
+        # ปุ่มเปิด/ปิดกล้อง
+        self.camera_btn = ctk.CTkButton(
+            self.btn_frame, 
+            text="📹 เปิดกล้อง", 
+            command=self.toggle_camera,
+            font=self.button_font,
+            height=40,
+            fg_color=self.secondary_color,
+            hover_color=self.primary_color
+        )
+        self.camera_btn.pack(side="left", padx=10, pady=10, before=self.config_btn)
 
     def configure_content_frame(self, columns=2, show_result_panel=True):
         """กำหนดค่าการแสดงผลของ content frame"""
@@ -148,34 +180,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.btn_frame = ctk.CTkFrame(self.main_container)
         self.btn_frame.grid(row=1, column=0, sticky="ew", padx=20, pady=10)
         
-        # ปุ่มเลือกกล้อง
-        if self.available_cameras:
-            self.camera_label = ctk.CTkLabel(self.btn_frame, text="เลือกกล้อง:", font=self.text_font)
-            self.camera_label.pack(side="left", padx=(10, 5), pady=10)
-            
-            camera_options = [f"กล้อง {i}" for i in self.available_cameras]
-            self.camera_combo = ctk.CTkComboBox(
-                self.btn_frame,
-                values=camera_options,
-                command=self.on_camera_select,
-                width=120,
-                font=self.text_font
-            )
-            self.camera_combo.pack(side="left", padx=5, pady=10)
-            self.camera_combo.set(camera_options[0] if camera_options else "ไม่มีกล้อง")
-        
-        # ปุ่มเปิด/ปิดกล้อง
-        if self.available_cameras:
-            self.camera_btn = ctk.CTkButton(
-                self.btn_frame, 
-                text="📹 เปิดกล้อง", 
-                command=self.toggle_camera,
-                font=self.button_font,
-                height=40,
-                fg_color=self.secondary_color,
-                hover_color=self.primary_color
-            )
-            self.camera_btn.pack(side="left", padx=10, pady=10)
+        # ปุ่มเลือกกล้องและปุ่มเปิด/ปิดกล้องถูกเพิ่มด้านหน้าแถวเมื่อค้นหากล้องเสร็จ (_create_camera_controls)
         
         # ปุ่มตั้งค่าการแสดงผล
         self.config_btn = ctk.CTkButton(
@@ -413,8 +418,8 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         if camera_idx in self.available_cameras:
             self.selected_camera_idx = camera_idx
             if self.camera_active:
+                # กล้องเก่ากลับเข้า pool (ไม่ปิดอุปกรณ์) จึงสลับได้ทันทีโดยไม่ต้องรอ
                 self.stop_camera()
-                time.sleep(0.5)  # รอให้กล้องเก่าปิดก่อน
                 self.start_camera()
 
     def toggle_camera(self):
@@ -431,12 +436,12 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             return
         
         try:
-            self.camera = cv2.VideoCapture(self.selected_camera_idx)
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, self.fps)
+            self.camera_idx = self.selected_camera_idx
+            self.camera = self.camera_pool.acquire(self.camera_idx, width=640, height=480, fps=self.fps)
             
             if not self.camera.isOpened():
+                self.camera_pool.release(self.camera_idx, self.camera)
+                self.camera = None
                 self.status_var.set("ไม่สามารถเปิดกล้องได้")
                 return
             
@@ -457,9 +462,14 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         """หยุดกล้อง"""
         self.camera_active = False
         
-        if self.camera:
-            self.camera.release()
-            self.camera = None
+        # loop อ่านเฟรมจะคืน handle เข้า pool เองเมื่อออกจาก loop (ไม่ปิดกล้องขณะที่ยังอ่านอยู่)
+        self.camera = None
+        
+        # รอให้ loop คืน handle ก่อน เพื่อไม่ให้เปิดกล้องเดิมซ้อนตอนเปิดใหม่ทันที หรือคืน handle หลัง pool ถูกปิด
+        # (จำกัดเวลารอ เพราะ loop อาจรอ self.after() ที่ต้องใช้ main thread อยู่)
+        thread, self.camera_thread = self.camera_thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=1.0)
         
         self.camera_btn.configure(text="📹 เปิดกล้อง")
         self.fps_label.configure(text="")
@@ -473,10 +483,11 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         """Loop หลักสำหรับการแสดงผลจากกล้อง"""
         fps_counter = 0
         fps_start_time = time.time()
+        camera, camera_idx = self.camera, self.camera_idx
         
-        while self.camera_active and self.camera:
+        while self.camera_active and self.camera is camera:
             try:
-                ret, frame = self.camera.read()
+                ret, frame = camera.read()
                 if not ret:
                     break
                 
@@ -508,9 +519,8 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
                 print(f"Camera loop error: {e}")
                 break
         
-        # ทำความสะอาดเมื่อออกจาก loop
-        if self.camera:
-            self.camera.release()
+        # คืน handle เข้า pool เพื่อใช้ซ้ำตอนเปิด/สลับกล้องครั้งถัดไป
+        self.camera_pool.release(camera_idx, camera)
 
     def _update_camera_display(self, frame):
         """อัพเดตการแสดงผลจากกล้อง"""
@@ -524,23 +534,14 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         """วิเคราะห์เฟรมจากกล้องแบบ async"""
         def analyze():
             try:
-                # บันทึกเฟรมชั่วคราว
-                temp_path = "temp_camera_frame.jpg"
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(temp_path, frame_bgr)
-                
-                # วิเคราะห์
-                img_result, text_result = process_image(temp_path)
+                # วิเคราะห์จากเฟรม RGB โดยตรง ไม่ต้องเขียนไฟล์ชั่วคราว
+                img_result, text_result = process_image(frame, color_order='RGB')
 
                 if img_result is not None:
                     self.show_image(img_result)
                 
                 # อัพเดต UI ใน main thread
                 self.after(0, lambda: self._update_realtime_result(text_result))
-                
-                # ลบไฟล์ชั่วคราว
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
                     
             except Exception as e:
                 self.after(0, lambda e=e: self.status_var.set(f"ข้อผิดพลาดในการวิเคราะห์: {str(e)}"))
@@ -798,6 +799,13 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         except Exception as e:
             self.status_var.set(f"เกิดข้อผิดพลาดในการบันทึกไฟล์: {str(e)}")
 
+    def on_close(self):
+        """ปิดกล้องและ release handle ใน pool ก่อนปิดหน้าต่าง"""
+        if self.camera_active:
+            self.stop_camera()
+        self.camera_pool.close()
+        self.destroy()
+
     def __del__(self):
         """ทำความสะอาดเมื่อปิดแอปพลิเคชัน"""
         if hasattr(self, 'camera_active') and self.camera_active:
@@ -0,0 +1,87 @@
+import threading
+
+import cv2
+
+class CameraPool:
+    """
+    ค้นหากล้องใน background และเก็บ cv2.VideoCapture ที่เปิดไว้แล้วเพื่อใช้ซ้ำ
+    start_camera/การสลับกล้องจึงไม่ต้องเปิดอุปกรณ์ใหม่ทุกครั้ง (การเปิดกล้องหนึ่งครั้งใช้เวลาหลายร้อย ms)
+    """
+
+    def __init__(self, max_index=10, max_idle=2):
+        # ตรวจ index 0..max_index-1 และเก็บ handle ที่ว่างอยู่ไม่เกิน max_idle ตัว
+        self.max_index = max_index
+        self.max_idle = max_idle
+        self.available = []
+        self._idle = {}
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def discover(self):
+        """ตรวจหากล้องที่อ่านภาพได้ คืนค่า list ของ index (เก็บ handle ที่เปิดแล้วไว้ใน pool)"""
+        available = []
+        for i in range(self.max_index):
+            cap = cv2.VideoCapture(i)
+            if not cap.isOpened():
+                cap.release()
+                break
+            ret, _ = cap.read()
+            if ret:
+                available.append(i)
+                self.release(i, cap)
+            else:
+                cap.release()
+
+        with self._lock:
+            self.available = available
+        return available
+
+    def discover_async(self, on_done):
+        """รัน discover() ใน background thread แล้วเรียก on_done(available) จาก thread นั้น"""
+        def run():
+            try:
+                available = self.discover()
+            except Exception as e:
+                print(f"Camera discovery error: {e}")
+                available = []
+            on_done(available)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def acquire(self, index, width=None, height=None, fps=None):
+        """
+        คืนค่า handle ของกล้อง index (ใช้ตัวที่เปิดค้างไว้ถ้ามี ไม่เช่นนั้นเปิดใหม่)
+        ตั้งค่าความละเอียด/FPS เฉพาะค่าที่ต่างจากเดิม เพราะการ set ทำให้ driver เริ่มสตรีมใหม่
+        """
+        with self._lock:
+            cap = self._idle.pop(index, None)
+        if cap is None or not cap.isOpened():
+            cap = cv2.VideoCapture(index)
+
+        for prop, value in ((cv2.CAP_PROP_FRAME_WIDTH, width),
+                            (cv2.CAP_PROP_FRAME_HEIGHT, height),
+                            (cv2.CAP_PROP_FPS, fps)):
+            if value is not None and cap.get(prop) != value:
+                cap.set(prop, value)
+        return cap
+
+    def release(self, index, cap):
+        """คืน handle เข้า pool (ถ้า pool เต็ม, pool ถูก close() แล้ว หรือกล้องปิดไปแล้วจะ release ทันที)"""
+        if cap is None:
+            return
+        with self._lock:
+            if (not self._closed and cap.isOpened()
+                    and index not in self._idle and len(self._idle) < self.max_idle):
+                self._idle[index] = cap
+                return
+        cap.release()
+
+    def close(self):
+        """release handle ทั้งหมดใน pool (handle ที่คืนมาหลังจากนี้จะถูก release ทันที)"""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, {}
+        for cap in idle.values():
+            cap.release()
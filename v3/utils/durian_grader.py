@@ -181,9 +181,24 @@ def draw_results(image, mask, bounding_box):
 
     return image_with_alpha, segment_info, grade, segment_area
 
-def process_image(image_path):
+def load_image(image, color_order='BGR'):
+    """
+    รับรูปได้ทั้ง path ของไฟล์ หรือ numpy array ที่ระบุลำดับสี ('BGR' หรือ 'RGB')
+    คืนค่ารูป BGR สำหรับส่งเข้าโมเดล หรือ None ถ้าโหลดไม่ได้
+    """
+    if isinstance(image, str):
+        return cv2.imread(image)
+    if image is None:
+        return None
+    if color_order == 'RGB':
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    if color_order == 'BGR':
+        return image
+    raise ValueError(f"Unsupported color_order: {color_order}")
+
+def process_image(image, color_order='BGR'):
     loader_config()
-    image = cv2.imread(image_path)
+    image = load_image(image, color_order)
     if image is None:
         return None, "Error: Cannot load image."
 
@@ -1,24 +1,64 @@
+import time
+# เวลาเริ่มโปรเซส ใช้วัดเวลาเปิดหน้าต่างแรกและการวิเคราะห์ครั้งแรก
+APP_START_TIME = time.perf_counter()
+
 import customtkinter as ctk
 from customtkinter import CTkImage, CTkFont
 import tkinterdnd2
 from tkinterdnd2 import DND_FILES
 from tkinter import filedialog
 import cv2
-from PIL import Image, ImageOps, ImageFilter
+from PIL import Image, ImageOps, ImageFilter, ImageTk
 import numpy as np
 import os
 import threading
-import time
+import warnings
 from datetime import datetime
 
-from utils.config_loader import load_config, save_config
-from utils.durian_grader import process_image
+from utils.config_loader import load_config, save_config, get_config, ConfigSnapshot, MASK_MODES
+from utils.durian_grader import process_batch, warm_up_async, is_model_ready
+from utils.inference_backend import BACKENDS
+from utils.grading_engine import GradingEngine
+from utils.grading_result import ImageResult, overall_grade
+from utils.frame_grabber import FrameGrabber
+from utils.analysis_worker import AnalysisWorker
+from utils.rate_controller import AdaptiveRateController
+from utils.camera_pool import CameraPool
 from utils.camera_settings import CameraSettingsDialog
+from utils.stage_timer import StageStats, batch_summary
+from utils.result_store import ResultStore
+from utils.image_writer import ImageWriter, DEFAULT_PATTERN
+from utils.thumbnail_cache import ThumbnailCache
+from utils.preview_renderer import PreviewRenderer
+
+# รอให้หยุดปรับขนาดหน้าต่างนานเท่านี้ (ms) ก่อนวาดรูปใหม่
+RESIZE_DEBOUNCE_MS = 150
 
 # ตั้งค่าธีมสีและรูปแบบ
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("green")
 
+def format_result(result):
+    """แปลง ImageResult เป็นข้อความสำหรับแสดงผลและบันทึกไฟล์"""
+    if result.error is not None:
+        return f"Error: {result.error}"
+    if not result.detections:
+        return "No durians detected."
+
+    texts = [
+        f"Durian {i+1}:\n"
+        f"  L-Grade: {d.left_grade}\n"
+        f"  R-Grade: {d.right_grade}\n"
+        f"  Segment Area:\n"
+        f"   - L-diff: {d.left_diff:.2f}%\n"
+        f"   - R-diff: {d.right_diff:.2f}%\n"
+        f"  Grade: {d.grade}"
+        for i, d in enumerate(result.detections)
+    ]
+    if len(texts) == 1:
+        return texts[0]
+    return "\n".join(texts) + f"\n\nOverall Grade: {result.grade}"
+
 class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
     
     def loader_config(self):
@@ -29,6 +69,26 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.version = cfg.get('App', 'version', fallback='0.0.1')
         self.batch_size = int(cfg['Camera'].get('batch_size', 1))
         self.analysis_mode = cfg['Camera'].get('analysis_mode', 'auto')
+        # fixed = วิเคราะห์ทุก analysis_interval, adaptive = ปรับตาม latency ที่วัดได้ภายในช่วงที่กำหนด
+        self.analysis_rate = cfg['Camera'].get('analysis_rate', 'fixed')
+        self.min_interval = float(cfg['Camera'].get('min_interval', 0.1))
+        self.max_interval = float(cfg['Camera'].get('max_interval', 2.0))
+        self.target_utilization = float(cfg['Camera'].get('target_utilization', 0.8))
+        self.latency_budget = float(cfg['Camera'].get('latency_budget', 1.0))
+        # live preview: อัตราแสดงผลสูงสุด (0 = ไม่แสดง) และเวลาค้างรูปผลการวิเคราะห์ก่อนกลับไปแสดง preview
+        self.preview_fps = float(cfg['Camera'].get('preview_fps', 15))
+        self.preview_hold = float(cfg['Camera'].get('preview_hold', 1.0))
+        # บันทึกรูปที่วาดผลแล้ว/เฟรมดิบลงดิสก์ (config.ini รุ่นเก่าไม่มี [Recording] = ไม่บันทึก)
+        rec = cfg['Recording'] if cfg.has_section('Recording') else {}
+        self.save_annotated = str(rec.get('save_annotated', 'false')).lower() == 'true'
+        self.save_raw = str(rec.get('save_raw', 'false')).lower() == 'true'
+        self.recording_settings = {
+            'directory': rec.get('directory', 'recordings'),
+            'fmt': rec.get('format', 'jpg'),
+            'quality': int(rec.get('quality', 90)),
+            'pattern': rec.get('pattern', DEFAULT_PATTERN),
+            'max_queue': int(rec.get('max_queue', 16)),
+        }
     
     def __init__(self):
         super().__init__()
@@ -49,14 +109,23 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         # ตัวแปรเก็บข้อมูล
         self.image_path = None
         self.original_image = None
-        self.result_history = []
+        # ประวัติการวิเคราะห์เก็บใน SQLite (ในหน่วยความจำมีแค่รายการล่าสุด)
+        self.result_store = ResultStore()
         self.is_analyzing = False
         
         # ตัวแปรสำหรับกล้อง
         self.camera = None
+        self.camera_idx = None
         self.camera_active = False
         self.camera_thread = None
+        self.frame_grabber = None
+        self.analysis_worker = None
+        self.rate_controller = None
+        self.preview_renderer = None
+        # PhotoImage เดียวที่ใช้ซ้ำทุกเฟรม (paste ทับ) สร้างใหม่เฉพาะตอนขนาดเปลี่ยน
+        self._preview_photo = None
         self.loader_config()
+        self.image_writer = self._create_image_writer()
         self.frame_interval = 1.0 / self.fps
         self.last_analysis_time = 0
         self.available_cameras = []
@@ -74,8 +143,17 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.text_font = CTkFont(family="Helvetica", size=13)
         self.result_font = CTkFont(family="Consolas", size=14)
         
-        # ตรวจหากล้องที่มีอยู่
-        self._detect_cameras()
+        # thumbnail ของช่อง batch ย่อใน worker thread แล้วส่งกลับมาแสดงใน main loop
+        self.thumbnails = ThumbnailCache(
+            lambda *args: self.after(0, lambda: self._apply_thumbnail(*args))
+        )
+        # ช่อง -> (image_id, ขนาด) ที่ต้องแสดง และ ช่อง -> (image_id, รูป) สำหรับขอใหม่ตอนเปลี่ยนขนาด
+        self._tile_keys = {}
+        self._tile_images = {}
+        self._resize_job = None
+        
+        # handle กล้องที่เปิดไว้แล้ว ใช้ซ้ำตอนเปิด/สลับกล้อง
+        self.camera_pool = CameraPool()
         
         # สร้าง UI
         self._create_header_frame()
@@ -98,23 +176,131 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.batch_images = []
         self.batch_results = []
 
+        # process pool สำหรับวิเคราะห์ (workers = 0 ใน [Engine] คือวิเคราะห์ใน process นี้)
+        engine_workers = get_config().engine_workers
+        self.engine = GradingEngine(engine_workers) if engine_workers > 0 else None
+        # เวลาแต่ละขั้นของการวิเคราะห์ย้อนหลัง (แสดงในแผง diagnostics)
+        self.stage_stats = StageStats()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        # ตรวจหากล้องใน background หลังจากหน้าต่างแสดงแล้ว
+        self.after(0, self._detect_cameras)
+
+        # โหลดโมเดลใน background ระหว่างที่หน้าต่างเปิดขึ้นมา
+        self.first_grade_logged = False
+        self.after(0, lambda: self._log_startup("first window"))
+        self._start_model_warm_up("กำลังโหลดโมเดล... (วิเคราะห์ได้หลังโหลดเสร็จ)")
+
+    def _start_model_warm_up(self, message):
+        """โหลดและ warm-up โมเดลใน background พร้อมแสดงสถานะ"""
+        self.status_var.set(message)
+        on_ready = lambda elapsed: self.after(0, lambda: self._on_model_ready(elapsed))
+        on_error = lambda e: self.after(0, lambda: self.status_var.set(f"โหลดโมเดลไม่สำเร็จ: {str(e)}"))
+        if self.engine is not None:
+            self.engine.start(on_ready=on_ready, on_error=on_error)
+        else:
+            warm_up_async(on_ready=on_ready, on_error=on_error)
+
+    def _is_model_ready(self):
+        if self.engine is not None:
+            return self.engine.is_ready()
+        return is_model_ready()
+
+    def _grade_batch(self, images, color_order='BGR'):
+        """วิเคราะห์รูปผ่าน engine (ถ้าเปิดใช้) หรือใน process นี้ คืนค่า list ของ ImageResult ตามลำดับเดิม"""
+        if self.engine is not None:
+            results = self.engine.process_batch(images, color_order=color_order, config=get_config())
+        else:
+            results = process_batch(images, color_order=color_order, config=get_config())
+        self._record_timings(results)
+        return results
+
+    def _create_image_writer(self):
+        """สร้าง writer เมื่อเปิดบันทึกรูปอย่างน้อยหนึ่งแบบ (ไม่เปิด = None)"""
+        if not (self.save_annotated or self.save_raw):
+            return None
+        return ImageWriter(**self.recording_settings).start()
+
+    def _record_images(self, source, result, raw=None):
+        """
+        ส่งรูปที่วาดผลแล้ว (RGBA) และเฟรมดิบ (RGB) เข้าคิวบันทึก ไม่บล็อก
+        (รูปจากไฟล์ไม่ต้องส่ง raw เพราะมีไฟล์ต้นฉบับอยู่แล้ว)
+        """
+        writer = self.image_writer
+        if writer is None:
+            return
+        if self.save_annotated and result.image is not None:
+            writer.submit(result.image, 'annotated', source, result.grade, color_order='RGBA')
+        if self.save_raw and raw is not None:
+            writer.submit(raw, 'raw', source, result.grade, color_order='RGB')
+
+    def _record_timings(self, results):
+        """บันทึกเวลาแต่ละขั้นลงสถิติ rolling, log สรุปของ batch และอัพเดตแผง diagnostics"""
+        for result in results:
+            self.stage_stats.record(result.timings)
+        print(batch_summary(results, self.stage_stats))
+        text = self.stage_stats.format_table()
+        self.after(0, lambda: self.diag_label.configure(text=text))
+
+    def _log_startup(self, event):
+        """บันทึกเวลาตั้งแต่เริ่มโปรเซสจนถึงเหตุการณ์ที่กำหนด"""
+        print(f"[startup] {event}: {time.perf_counter() - APP_START_TIME:.2f}s after process start")
+
+    def _on_model_ready(self, elapsed):
+        """เรียกเมื่อโมเดลโหลดและ warm-up เสร็จ"""
+        self._log_startup(f"model ready (warm-up {elapsed:.2f}s)")
+        self.status_var.set("พร้อมใช้งาน")
+
+    def _log_first_grade(self):
+        """บันทึกเวลาการวิเคราะห์ครั้งแรก (ครั้งเดียว)"""
+        if not self.first_grade_logged:
+            self.first_grade_logged = True
+            self._log_startup("first grade")
+
     def _detect_cameras(self):
-        """ตรวจหากล้องที่มีใช้ได้ในระบบ"""
-        self.available_cameras = []
-        
-        # ตรวจสอบกล้องสูงสุด 10 ตัว
-        for i in range(10):
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                if ret:
-                    self.available_cameras.append(i)
-                cap.release()
-            else:
-                break
-        
+        """ตรวจหากล้องที่มีใช้ได้ในระบบ (สูงสุด 10 ตัว) ใน background thread"""
+        self.camera_pool.discover_async(
+            lambda cameras: self.after(0, lambda: self._on_cameras_detected(cameras))
+        )
+
+    def _on_cameras_detected(self, cameras):
+        """เรียกใน main loop เมื่อค้นหากล้องเสร็จ"""
+        self.available_cameras = cameras
+        self._log_startup(f"camera discovery ({len(cameras)} found)")
         if not self.available_cameras:
             print("ไม่พบกล้องในระบบ")
+            return
+        self._create_camera_controls()
+
+    def _create_camera_controls(self):
+        """สร้างปุ่มเลือกกล้องและปุ่มเปิด/ปิดกล้อง ไว้หน้าปุ่มตั้งค่า"""
+        # ปุ่มเลือกกล้อง
+        self.camera_label = ctk.CTkLabel(self.btn_frame, text="เลือกกล้อง:", font=self.text_font)
+        self.camera_label.pack(side="left", padx=(10, 5), pady=10, before=self.config_btn)
+        
+        camera_options = [f"กล้อง {i}" for i in self.available_cameras]
+        self.camera_combo = ctk.CTkComboBox(
+            self.btn_frame,
+            values=camera_options,
+            command=self.on_camera_select,
+            width=120,
+            font=self.text_font
+        )
+        self.camera_combo.pack(side="left", padx=5, pady=10, before=self.config_btn)
+        self.camera_combo.set(camera_options[0])
+        self.selected_camera_idx = self.available_cameras[0]
+        
+        # ปุ่มเปิด/ปิดกล้อง
+        self.camera_btn = ctk.CTkButton(
+            self.btn_frame, 
+            text="📹 เปิดกล้อง", 
+            command=self.toggle_camera,
+            font=self.button_font,
+            height=40,
+            fg_color=self.secondary_color,
+            hover_color=self.primary_color
+        )
+        self.camera_btn.pack(side="left", padx=10, pady=10, before=self.config_btn)
 
     def configure_content_frame(self, columns=2, show_result_panel=True):
         """กำหนดค่าการแสดงผลของ content frame"""
@@ -145,34 +331,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.btn_frame = ctk.CTkFrame(self.main_container)
         self.btn_frame.grid(row=1, column=0, sticky="ew", padx=20, pady=10)
         
-        # ปุ่มเลือกกล้อง
-        if self.available_cameras:
-            self.camera_label = ctk.CTkLabel(self.btn_frame, text="เลือกกล้อง:", font=self.text_font)
-            self.camera_label.pack(side="left", padx=(10, 5), pady=10)
-            
-            camera_options = [f"กล้อง {i}" for i in self.available_cameras]
-            self.camera_combo = ctk.CTkComboBox(
-                self.btn_frame,
-                values=camera_options,
-                command=self.on_camera_select,
-                width=120,
-                font=self.text_font
-            )
-            self.camera_combo.pack(side="left", padx=5, pady=10)
-            self.camera_combo.set(camera_options[0] if camera_options else "ไม่มีกล้อง")
-        
-        # ปุ่มเปิด/ปิดกล้อง
-        if self.available_cameras:
-            self.camera_btn = ctk.CTkButton(
-                self.btn_frame, 
-                text="📹 เปิดกล้อง", 
-                command=self.toggle_camera,
-                font=self.button_font,
-                height=40,
-                fg_color=self.secondary_color,
-                hover_color=self.primary_color
-            )
-            self.camera_btn.pack(side="left", padx=10, pady=10)
+        # ปุ่มเลือกกล้องและปุ่มเปิด/ปิดกล้องถูกเพิ่มด้านหน้าแถวเมื่อค้นหากล้องเสร็จ (_create_camera_controls)
         
         # ปุ่มตั้งค่าการแสดงผล
         self.config_btn = ctk.CTkButton(
@@ -203,7 +362,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             self.btn_frame, 
             text="💾 บันทึกผลลัพธ์", 
             command=self.save_results,
-            state="disabled",
+            state="normal" if self.result_store.count() else "disabled",
             font=self.button_font,
             height=40,
             fg_color=self.secondary_color,
@@ -259,6 +418,16 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         )
         self.fps_label.place(relx=0.02, rely=0.02)
         
+        # แผง diagnostics: p50/p95 ของเวลาแต่ละขั้น (ms) จากรูปล่าสุด
+        self.diag_label = ctk.CTkLabel(
+            self.drop_frame,
+            text="",
+            font=CTkFont(family="Consolas", size=11),
+            text_color="gray50",
+            justify="left"
+        )
+        self.diag_label.place(relx=0.98, rely=0.02, anchor="ne")
+        
         # ปุ่มเลือกรูปภาพ
         self.select_btn = ctk.CTkButton(
             self.drop_frame, 
@@ -357,7 +526,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
 
         config_window = ctk.CTkToplevel(self)
         config_window.title("ตั้งค่าการแสดงผล")
-        config_window.geometry("450x450")
+        config_window.geometry("450x560")
         config_window.transient(self)
         
         # Wait for the window to be visible before grabbing focus
@@ -389,23 +558,55 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         add_config_entry("Grading", "distance_threshold", "ค่าเกณฑ์ระยะห่าง (distance_threshold):", row=2, col=0)
         add_config_entry("Grading", "percentage_grading", "ค่าเกณฑ์เปอร์เซ็นต์ (%):", row=2, col=1)
         add_config_entry("Grading", "adj", "ค่าความลึกการตรวจ (adj):", row=3, col=0)
+        add_config_entry("Grading", "mask_mode", "โหมดการวัด mask:", row=3, col=1, widget_type="combo", options=list(MASK_MODES))
 
         # กล้อง
         add_config_entry("Camera", "fps", "FPS กล้อง:", row=4, col=0, widget_type="combo", options=["15", "24", "30", "60"])
         add_config_entry("Camera", "analysis_interval", "ช่วงเวลาการวิเคราะห์:", row=4, col=1)
+
+        # โมเดล
+        add_config_entry("Model", "backend", "Inference backend:", row=5, col=0, widget_type="combo", options=list(BACKENDS))
+        add_config_entry("Model", "imgsz", "ขนาดภาพเข้าโมเดล (imgsz):", row=5, col=1)
         
+        # ข้อความแจ้งค่าที่ใช้ไม่ได้ (ไม่บันทึกจนกว่าจะแก้)
+        error_label = ctk.CTkLabel(config_window, text="", text_color="red", wraplength=420)
+        error_label.grid(row=13, column=0, columnspan=2, padx=10, sticky="we")
+
         # ปุ่มตกลง แบบเต็มแถว
         def apply_config():
+            previous = get_config()
+            previous_model = (previous.model_backend, previous.model_imgsz)
             for (section, key), var in entries.items():
+                if not config.has_section(section):
+                    config.add_section(section)
                 config[section][key] = var.get()
+
+            # ตรวจด้วยตัวอ่านเดียวกับ get_config() (mask_mode ต้องอยู่ใน MASK_MODES, backend อยู่ใน BACKENDS, ตัวเลขต้องแปลงได้)
+            # ก่อนบันทึก ไม่ให้ config.ini ที่เสียทำให้วิเคราะห์ไม่ได้
+            try:
+                ConfigSnapshot.from_parser(config)
+                int(config['Camera']['fps'])
+                float(config['Camera'].get('analysis_interval', 0.1))
+            except (KeyError, ValueError) as e:
+                error_label.configure(text=f"ค่าไม่ถูกต้อง: {e}")
+                return
             save_config(config)
 
+            # เปลี่ยน backend แล้วโหลด/export โมเดลใหม่ใน background
+            current = get_config()
+            if (current.model_backend, current.model_imgsz) != previous_model:
+                if self.engine is not None:
+                    # worker แต่ละตัวถือโมเดลเดิมอยู่ สร้าง pool ใหม่ให้โหลดโมเดลตามค่าใหม่
+                    self.engine.shutdown(wait=False)
+                    self.engine = GradingEngine(self.engine.workers)
+                self._start_model_warm_up(f"กำลังโหลดโมเดล ({current.model_backend})...")
+
             self.fps = int(config['Camera']['fps'])
             self.analysis_interval = float(config['Camera'].get('analysis_interval', 0.1))
             self.frame_interval = 1.0 / self.fps
             config_window.destroy()
 
-        ctk.CTkButton(config_window, text="ตกลง", command=apply_config).grid(row=10, column=0, columnspan=2, pady=20, padx=10, sticky="we")
+        ctk.CTkButton(config_window, text="ตกลง", command=apply_config).grid(row=12, column=0, columnspan=2, pady=20, padx=10, sticky="we")
 
         # กำหนดคอลัมน์ให้ขยายได้
         config_window.grid_columnconfigure(0, weight=1)
@@ -416,7 +617,8 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         current_settings = {
             "batch_size": self.batch_size,
             "analysis_mode": self.analysis_mode,
-            "analysis_interval": self.analysis_interval
+            "analysis_interval": self.analysis_interval,
+            "analysis_rate": self.analysis_rate
         }
         
         CameraSettingsDialog(self, current_settings, self._on_camera_settings_save)
@@ -426,6 +628,9 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.batch_size = settings["batch_size"]
         self.analysis_mode = settings["analysis_mode"]
         self.analysis_interval = settings["analysis_interval"]
+        self.analysis_rate = settings["analysis_rate"]
+        if self.camera_active:
+            self.rate_controller = self._create_rate_controller()
         
         # บันทึกลงในไฟล์ config
         config = load_config()
@@ -435,6 +640,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         config['Camera']['batch_size'] = str(self.batch_size)
         config['Camera']['analysis_mode'] = self.analysis_mode
         config['Camera']['analysis_interval'] = str(self.analysis_interval)
+        config['Camera']['analysis_rate'] = self.analysis_rate
         save_config(config)
         
         self.status_var.set(f"บันทึกการตั้งค่ากล้องเรียบร้อยแล้ว (Batch: {self.batch_size}, โหมด: {self.analysis_mode})")
@@ -452,8 +658,8 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         if camera_idx in self.available_cameras:
             self.selected_camera_idx = camera_idx
             if self.camera_active:
+                # กล้องเก่ากลับเข้า pool (ไม่ปิดอุปกรณ์) จึงสลับได้ทันทีโดยไม่ต้องรอ
                 self.stop_camera()
-                time.sleep(0.5)  # รอให้กล้องเก่าปิดก่อน
                 self.start_camera()
 
     def toggle_camera(self):
@@ -470,12 +676,12 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             return
         
         try:
-            self.camera = cv2.VideoCapture(self.selected_camera_idx)
-            self.camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            self.camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-            self.camera.set(cv2.CAP_PROP_FPS, self.fps)
+            self.camera_idx = self.selected_camera_idx
+            self.camera = self.camera_pool.acquire(self.camera_idx, width=640, height=480, fps=self.fps)
             
             if not self.camera.isOpened():
+                self.camera_pool.release(self.camera_idx, self.camera)
+                self.camera = None
                 self.status_var.set("ไม่สามารถเปิดกล้องได้")
                 return
             
@@ -483,6 +689,20 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             self.camera_btn.configure(text="⏹️ ปิดกล้อง")
             self.select_btn.place_forget()  # ซ่อนปุ่มเลือกรูป
             
+            # thread อ่านเฟรมจากกล้องเต็มความเร็ว เก็บเฉพาะเฟรมล่าสุด
+            self.frame_grabber = FrameGrabber(self.camera).start()
+            
+            # thread วิเคราะห์ตัวเดียว รับเฟรมแบบ latest-wins
+            self.analysis_worker = AnalysisWorker(self._analyze_frame_job, on_error=self._on_analysis_error).start()
+            self.rate_controller = self._create_rate_controller()
+            
+            # thread ย่อเฟรมสำหรับ live preview (แยกจากการวิเคราะห์และจำกัดอัตราตาม preview_fps)
+            if self.preview_fps > 0:
+                renderer = PreviewRenderer(None, max_fps=self.preview_fps)
+                renderer.on_ready = lambda image: self.after(0, lambda: self._show_preview(renderer, image))
+                self.preview_renderer = renderer.start()
+                self._update_preview_size()
+            
             # เริ่ม thread สำหรับแสดงวิดีโอ
             self.camera_thread = threading.Thread(target=self._camera_loop, daemon=True)
             self.camera_thread.start()
@@ -496,8 +716,29 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         """หยุดกล้อง"""
         self.camera_active = False
         
+        if self.analysis_worker:
+            # ไม่รองานที่กำลังวิเคราะห์ให้จบ เพื่อไม่ให้ UI ค้าง
+            self.analysis_worker.stop(timeout=0)
+            self.analysis_worker = None
+        
+        if self.preview_renderer:
+            self.preview_renderer.stop()
+            self.preview_renderer = None
+        self._preview_photo = None
+        
+        # หยุด thread อ่านเฟรมก่อน release กล้อง
+        grabber_stopped = True
+        if self.frame_grabber:
+            grabber_stopped = self.frame_grabber.stop()
+            self.frame_grabber = None
+        
+        # คืน handle เข้า pool เพื่อใช้ซ้ำตอนเปิด/สลับกล้องครั้งถัดไป
+        # ถ้า thread อ่านเฟรมยังไม่จบ handle ยังถูกใช้อยู่ จึง release ทิ้งแทนการคืนเข้า pool
         if self.camera:
-            self.camera.release()
+            if grabber_stopped:
+                self.camera_pool.release(self.camera_idx, self.camera)
+            else:
+                self.camera.release()
             self.camera = None
         
         self.camera_btn.configure(text="📹 เปิดกล้อง")
@@ -509,96 +750,171 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.status_var.set("ปิดกล้องแล้ว")
 
     def _camera_loop(self):
-        """Loop หลักสำหรับการแสดงผลจากกล้อง"""
-        fps_counter = 0
-        fps_start_time = time.time()
+        """Loop หลักสำหรับการแสดงผลจากกล้อง (รับเฟรมล่าสุดจาก FrameGrabber)"""
+        grabber = self.frame_grabber
+        last_frame_id = 0
+        last_fps_update = time.time()
+        last_processed = 0
         
-        while self.camera_active and self.camera:
+        while self.camera_active and grabber is self.frame_grabber:
             try:
-                ret, frame = self.camera.read()
-                if not ret:
-                    break
+                item = grabber.wait_latest(last_frame_id, timeout=1.0)
+                if item is None:
+                    if not grabber.running:
+                        break
+                    continue
+                last_frame_id, timestamp, frame = item
                 
-                # คำนวณ FPS จริง
-                fps_counter += 1
+                # แสดง FPS จริงที่อ่านได้จากกล้อง และสถานะคิววิเคราะห์ทุก 1 วินาที
                 current_time = time.time()
+                if current_time - last_fps_update >= 1.0:
+                    worker = self.analysis_worker
+                    processed = worker.frames_processed if worker is not None else 0
+                    analysis_rate = (processed - last_processed) / (current_time - last_fps_update)
+                    last_fps_update, last_processed = current_time, processed
+                    text = self._camera_stats_text(grabber, analysis_rate)
+                    self.after(0, lambda text=text: self.fps_label.configure(text=text))
                 
-                if current_time - fps_start_time >= 1.0:
-                    actual_fps = fps_counter / (current_time - fps_start_time)
-                    self.after(0, lambda: self.fps_label.configure(text=f"FPS: {actual_fps:.1f}"))
-                    fps_counter = 0
-                    fps_start_time = current_time
-                
-                # แปลงสี BGR เป็น RGB
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                # วิเคราะห์เฟรมทุก analysis_interval วินาที (นับตามเวลาที่ถ่ายเฟรม)
+                # โหมด adaptive ใช้ interval ที่ rate controller คำนวณจาก latency จริง
+                controller = self.rate_controller
+                interval = controller.interval if controller is not None else self.analysis_interval
+                if timestamp - self.last_analysis_time >= interval:
+                    self.last_analysis_time = timestamp
+                    # แปลงสี BGR เป็น RGB เฉพาะเฟรมที่จะวิเคราะห์
+                    self._analyze_camera_frame(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), timestamp)
                 
-                # วิเคราะห์เฟรมทุก analysis_interval วินาที
-                if current_time - self.last_analysis_time >= self.analysis_interval:
-                    self.last_analysis_time = current_time
-                    self._analyze_camera_frame(frame_rgb.copy())
-                
-                # แสดงเฟรม
-                # self.after(0, lambda f=frame_rgb: self._update_camera_display(f))
-                
-                # รอตามค่า FPS ที่กำหนด
-                time.sleep(self.frame_interval)
+                # แสดงเฟรม (renderer ย่อและแปลงสีใน thread ของตัวเอง ที่นี่แค่ส่งเฟรมล่าสุด)
+                renderer = self.preview_renderer
+                if renderer is not None:
+                    renderer.submit(frame)
                 
             except Exception as e:
                 print(f"Camera loop error: {e}")
                 break
         
-        # ทำความสะอาดเมื่อออกจาก loop
-        if self.camera:
-            self.camera.release()
+        if grabber.error is not None:
+            print(f"Camera read error: {grabber.error}")
+        
+        # กล้องหยุดส่งเฟรมเอง (ไม่ได้กดปิด) ให้ปิดกล้องใน main thread
+        if self.camera_active and grabber is self.frame_grabber:
+            self.after(0, self.stop_camera)
+
+    def _create_rate_controller(self):
+        """
+        สร้าง rate controller เมื่อเลือกโหมด adaptive (โหมด fixed คืนค่า None)
+        โหมด batch ใช้ analysis_interval เสมอ: เฟรมรอจน batch เต็มก่อนวิเคราะห์ latency ต่อเฟรมจึงวัดเวลารอเติม batch
+        ไม่ใช่ความเร็วเครื่อง (ถ้านำมาปรับ interval จะถอยออกจนถึง max_interval)
+        """
+        if self.analysis_rate != "adaptive" or self.batch_size > 1:
+            return None
+        return AdaptiveRateController(
+            min_interval=self.min_interval,
+            max_interval=self.max_interval,
+            target_utilization=self.target_utilization,
+            latency_budget=self.latency_budget,
+        )
+
+    def _camera_stats_text(self, grabber, analysis_rate):
+        """ข้อความ FPS กล้อง + อัตราการวิเคราะห์จริง + จำนวนงานในคิววิเคราะห์ + จำนวนเฟรมที่ถูกทิ้งก่อนวิเคราะห์ + รูปที่บันทึกไม่สำเร็จ"""
+        text = f"FPS: {grabber.fps:.1f} | วิเคราะห์: {analysis_rate:.1f}/s"
+        if self.rate_controller is not None:
+            text += " (auto)"
+        elif self.analysis_rate == "adaptive":
+            text += " (auto ปิดในโหมด batch)"
+        worker = self.analysis_worker
+        if worker is not None:
+            text += f" | คิว: {worker.queue_depth} | ทิ้ง: {worker.frames_dropped}"
+        # รูปที่บันทึกไม่สำเร็จ (คิวเต็มเพราะดิสก์เขียนไม่ทัน หรือเขียนไฟล์ผิดพลาด)
+        writer = self.image_writer
+        if writer is not None and (writer.dropped or writer.errors):
+            text += f" | บันทึกรูปไม่สำเร็จ: {writer.dropped + writer.errors}"
+        return text
+
+    def _update_preview_size(self):
+        frame_width = self.drop_frame.winfo_width()
+        frame_height = self.drop_frame.winfo_height()
+        if frame_width <= 1 or frame_height <= 1:
+            frame_width = frame_height = 600
+        self.preview_renderer.set_size(frame_width - 20, frame_height - 20)
+
+    def _show_preview(self, renderer, image):
+        """แสดงเฟรม preview ที่ย่อแล้ว (main thread) โดย paste ทับ PhotoImage เดิม"""
+        try:
+            if renderer is not self.preview_renderer or renderer.holding:
+                return
+            photo = self._preview_photo
+            if photo is None or (photo.width(), photo.height()) != image.size:
+                photo = self._preview_photo = ImageTk.PhotoImage(image)
+            else:
+                photo.paste(image)
+            # label แสดงรูปอื่นอยู่ (เช่นรูปผลการวิเคราะห์) ต้องตั้ง image กลับเป็น preview
+            if self.image_label.image is not photo:
+                with warnings.catch_warnings():
+                    # CTkLabel เตือนเมื่อไม่ใช่ CTkImage (preview ไม่ต้อง scale ตาม DPI)
+                    warnings.simplefilter("ignore")
+                    self.image_label.configure(image=photo, text="")
+                self.image_label.image = photo
+        except Exception as e:
+            print(f"Preview update error: {e}")
+        finally:
+            renderer.frame_shown()
 
     def _update_camera_display(self, frame):
         """อัพเดตการแสดงผลจากกล้อง"""
+        if self.preview_renderer is not None:
+            # live preview แสดงเฟรมกล้องอยู่แล้ว
+            return
         try:
             self.original_image = frame
             self.update_image_display()
         except Exception as e:
             print(f"Display update error: {e}")
 
-    def _analyze_camera_frame(self, frame):
-        """วิเคราะห์เฟรมจากกล้องแบบ async"""
-        def analyze():
-            try:
-                # บันทึกเฟรมชั่วคราว
-                temp_path = "temp_camera_frame.jpg"
-                frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(temp_path, frame_bgr)
-            
-                # เพิ่มเข้า batch หรือวิเคราะห์ทันที
-                if self.batch_size > 1:
-                    # เพิ่มเข้า batch
-                    self.after(0, lambda: self.add_to_batch(frame.copy()))
-                    
-                    # อัพเดต UI ใน main thread
-                    self.after(0, lambda: self._update_camera_display(frame))
-                else:
-                    # วิเคราะห์ทันที (โหมดเดิม)
-                    img_result, text_result = process_image(temp_path)
+    def _analyze_camera_frame(self, frame, timestamp):
+        """ส่งเฟรมจากกล้องเข้าคิวของ analysis worker (เฟรมที่ยังรออยู่จะถูกแทนที่ด้วยเฟรมใหม่)"""
+        if self.analysis_worker is not None:
+            self.analysis_worker.submit((frame, timestamp))
 
-                    if img_result is not None:
-                        self.show_image(img_result)
-                    
-                    # อัพเดต UI ใน main thread
-                    self.after(0, lambda: self._update_realtime_result(text_result))
-            
-                # ลบไฟล์ชั่วคราว
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                
-            except Exception as e:
-                self.after(0, lambda e=e: self.status_var.set(f"ข้อผิดพลาดในการวิเคราะห์: {str(e)}"))
-    
-    # รันการวิเคราะห์ใน thread แยก
-        threading.Thread(target=analyze, daemon=True).start()
+    def _analyze_frame_job(self, item):
+        """วิเคราะห์เฟรมหนึ่งเฟรม (ทำงานใน thread ของ analysis worker ข้อผิดพลาดแสดงผ่าน _on_analysis_error)"""
+        frame, timestamp = item
+        start = time.perf_counter()
+        # เพิ่มเข้า batch หรือวิเคราะห์ทันที
+        if self.batch_size > 1:
+            # เพิ่มเข้า batch
+            self.after(0, lambda: self.add_to_batch(frame.copy()))
+
+            # อัพเดต UI ใน main thread
+            self.after(0, lambda: self._update_camera_display(frame))
+        else:
+            # วิเคราะห์ทันที (โหมดเดิม) จากเฟรม RGB โดยตรง
+            result = self._grade_batch([frame], color_order='RGB')[0]
+            self.result_store.add('camera', [result], ts=timestamp)
+            self._record_images('camera', result, raw=frame)
+
+            # latency ตั้งแต่ถ่ายเฟรมจนได้ผล ใช้ปรับความถี่ในโหมด adaptive
+            controller = self.rate_controller
+            if controller is not None:
+                controller.record(time.perf_counter() - start, time.time() - timestamp)
 
-    def _update_realtime_result(self, text_result):
+            # อัพเดต UI ใน main thread (ค้างรูปผลไว้ preview_hold วินาทีก่อนกลับไปแสดง live preview)
+            if result.image is not None:
+                renderer = self.preview_renderer
+                if renderer is not None:
+                    renderer.hold(self.preview_hold)
+                self.after(0, lambda: self.show_image(result.image))
+            self.after(0, lambda: self._update_realtime_result(result))
+
+    def _on_analysis_error(self, error):
+        """on_error ของ analysis worker (ถูกเรียกจาก thread ของ worker)"""
+        self.after(0, lambda: self.status_var.set(f"ข้อผิดพลาดในการวิเคราะห์: {str(error)}"))
+
+    def _update_realtime_result(self, result):
         """อัพเดตผลการวิเคราะห์แบบเรียลไทม์"""
         if hasattr(self, 'summary_text') and self.show_result_panel:
             try:
+                text_result = format_result(result)
                 current_time = datetime.now().strftime("%H:%M:%S")
                 formatted_result = f"🕒 {current_time}\n{text_result}"
                 
@@ -606,6 +922,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
                 self.summary_text.delete("1.0", "end")
                 self.summary_text.insert("1.0", formatted_result)
                 self.summary_text.configure(state="disabled")
+                self._log_first_grade()
                 
                 # อัพเดตผลลัพธ์ในช่องแรก
                 if self.result_textboxes:
@@ -617,8 +934,8 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
                 # เปิดใช้งานปุ่มบันทึก
                 self.save_btn.configure(state="normal")
             
-        except Exception as e:
-            print(f"Result update error: {e}")
+            except Exception as e:
+                print(f"Result update error: {e}")
 
     def _setup_drag_drop(self):
         """ตั้งค่าฟังก์ชันสำหรับรองรับการลากและวางไฟล์"""
@@ -691,8 +1008,18 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
                     self.summary_text.configure(state="normal")
 
     def on_frame_configure(self, event):
+        # <Configure> มาถี่ระหว่างลากปรับขนาดหน้าต่าง รอให้หยุดเปลี่ยนขนาดก่อนค่อยวาดใหม่ครั้งเดียว
+        if self._resize_job is not None:
+            self.after_cancel(self._resize_job)
+        self._resize_job = self.after(RESIZE_DEBOUNCE_MS, self._on_resize_settled)
+
+    def _on_resize_settled(self):
+        self._resize_job = None
         if self.original_image is not None:
             self.update_image_display()
+        if self.preview_renderer is not None:
+            self._update_preview_size()
+        self._refresh_tiles()
 
     def update_image_display(self):
         if self.original_image is None:
@@ -780,20 +1107,24 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         if self.image_path and not self.is_analyzing:
             self.is_analyzing = True
             
-            self.status_var.set("กำลังวิเคราะห์รูปภาพ... โปรดรอสักครู่")
+            if self._is_model_ready():
+                self.status_var.set("กำลังวิเคราะห์รูปภาพ... โปรดรอสักครู่")
+            else:
+                self.status_var.set("กำลังรอโหลดโมเดล... โปรดรอสักครู่")
             self.update()
             
             try:
-                img_result, text_result = process_image(self.image_path)
+                result = self._grade_batch([self.image_path])[0]
+                text_result = format_result(result)
                 
-                if img_result is not None:
-                    self.show_image(img_result)
+                if result.image is not None:
+                    self.show_image(result.image)
                 else:
                     self.show_image(self.image_path)
                 
+                current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
                 if hasattr(self, 'summary_text') and self.show_result_panel:
-                    current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-                    
                     # อัพเดตผลลัพธ์รวม
                     self.summary_text.configure(state="normal")
                     self.summary_text.delete("1.0", "end")
@@ -803,14 +1134,12 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
                     self.summary_text.configure(state="disabled")
                 
                 # บันทึกประวัติการวิเคราะห์
-                self.result_history.append({
-                    'path': self.image_path,
-                    'time': current_time,
-                    'result': text_result
-                })
+                self.result_store.add(self.image_path, [result], paths=[self.image_path])
+                self._record_images(self.image_path, result)
                 
                 self.save_btn.configure(state="normal")
                 self.status_var.set("วิเคราะห์เสร็จสมบูรณ์")
+                self._log_first_grade()
                 
             except Exception as e:
                 import traceback
@@ -829,7 +1158,13 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             
     def save_results(self):
         """บันทึกผลการวิเคราะห์ไปยังไฟล์ข้อความ"""
-        if not self.result_history:
+        # ให้ thread เขียนเขียนรายการล่าสุดลงฐานข้อมูลก่อนอ่าน (ไม่รอใน main loop) แล้วค่อยเปิดหน้าต่างบันทึก
+        self.save_btn.configure(state="disabled")
+        self.result_store.flush(on_done=lambda: self.after(0, self._save_results_flushed))
+
+    def _save_results_flushed(self):
+        self.save_btn.configure(state="normal")
+        if not self.result_store.count():
             return
     
         try:
@@ -843,22 +1178,24 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
                 with open(file_path, 'w', encoding='utf-8') as file:
                     file.write("===== รายงานการวิเคราะห์คุณภาพทุเรียน =====\n\n")
                 
-                    for idx, entry in enumerate(self.result_history, 1):
+                    # อ่านประวัติจากฐานข้อมูลทีละหน้าแล้วเขียนต่อเนื่อง
+                    for idx, entry in enumerate(self.result_store.iter_entries(), 1):
                         file.write(f"รายการที่ {idx}\n")
+                        entry_time = datetime.fromtimestamp(entry.ts).strftime("%d/%m/%Y %H:%M:%S")
                     
-                        if 'overall_grade' in entry:
+                        if len(entry.results) > 1 or entry.source == 'batch':
                             # บันทึกผลการวิเคราะห์แบบ batch
-                            file.write(f"เวลา: {entry['time']}\n")
-                            file.write(f"ผลการวิเคราะห์รวม: เกรด {entry['overall_grade']}\n\n")
+                            file.write(f"เวลา: {entry_time}\n")
+                            file.write(f"ผลการวิเคราะห์รวม: เกรด {entry.grade}\n\n")
                         
-                            for i, result in enumerate(entry['batch_results']):
-                                file.write(f"รูปที่ {i+1}:\n{result['text']}\n")
+                            for i, result in enumerate(entry.results):
+                                file.write(f"รูปที่ {i+1}:\n{format_result(result)}\n")
                                 file.write("-" * 30 + "\n")
                         else:
                             # บันทึกผลการวิเคราะห์แบบเดิม
-                            file.write(f"ไฟล์: {entry['path']}\n")
-                            file.write(f"เวลา: {entry['time']}\n")
-                            file.write(f"ผลการวิเคราะห์:\n{entry['result']}\n")
+                            file.write(f"ไฟล์: {entry.source}\n")
+                            file.write(f"เวลา: {entry_time}\n")
+                            file.write(f"ผลการวิเคราะห์:\n{format_result(entry.results[0])}\n")
                     
                         file.write("\n" + "=" * 50 + "\n\n")
                 
@@ -878,6 +1215,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             cols = min(3, self.batch_size)
         
             self.batch_image_labels = []
+            self._clear_tiles()
             for i in range(self.batch_size):
                 row = i // cols
                 col = i % cols
@@ -900,62 +1238,47 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             
                 self.batch_image_labels.append(img_label)
         
-        # กำหนดให้ grid ขยายได้
-        for i in range(cols):
-            self.batch_frame.grid_columnconfigure(i, weight=1)
-        for i in range(rows):
-            self.batch_frame.grid_rowconfigure(i, weight=1)
-        
-        # ถ้าเป็นโหมด manual ให้เพิ่มปุ่มวิเคราะห์
-        if self.analysis_mode == "manual":
-            self.analyze_btn = ctk.CTkButton(
-                self.drop_frame, 
-                text="🔍 วิเคราะห์ทั้งหมด", 
-                command=self.analyze_batch,
-                font=self.button_font,
-                height=40,
-                fg_color="#4CAF50",
-                hover_color="#689F38",
-                state="disabled"
-            )
-            self.analyze_btn.pack(side="bottom", pady=10)
-    else:
-        # อัพเดตการแสดงผลที่มีอยู่แล้ว
-        self.batch_frame.destroy()
-        self._update_batch_display()
+            # กำหนดให้ grid ขยายได้
+            for i in range(cols):
+                self.batch_frame.grid_columnconfigure(i, weight=1)
+            for i in range(rows):
+                self.batch_frame.grid_rowconfigure(i, weight=1)
+            
+            # ถ้าเป็นโหมด manual ให้เพิ่มปุ่มวิเคราะห์
+            if self.analysis_mode == "manual":
+                self.analyze_btn = ctk.CTkButton(
+                    self.drop_frame, 
+                    text="🔍 วิเคราะห์ทั้งหมด", 
+                    command=self.analyze_batch,
+                    font=self.button_font,
+                    height=40,
+                    fg_color="#4CAF50",
+                    hover_color="#689F38",
+                    state="disabled"
+                )
+                self.analyze_btn.pack(side="bottom", pady=10)
+        else:
+            # อัพเดตการแสดงผลที่มีอยู่แล้ว
+            self.batch_frame.destroy()
+            del self.batch_frame
+            if hasattr(self, 'analyze_btn'):
+                self.analyze_btn.destroy()
+                del self.analyze_btn
+            self._update_batch_display()
 
     def add_to_batch(self, image, path=None):
         """เพิ่มรูปภาพเข้าไปใน batch"""
         if len(self.batch_images) < self.batch_size:
             self.batch_images.append({
                 'image': image,
-                'path': path
+                'path': path,
+                'id': self.thumbnails.new_id()
             })
         
-            # อัพเดตการแสดงผล
+            # อัพเดตการแสดงผล (ย่อรูปใน worker thread)
             idx = len(self.batch_images) - 1
             if idx < len(self.batch_image_labels):
-                # แปลงรูปภาพเพื่อแสดงผล
-                img_pil = Image.fromarray(image)
-            
-                # ปรับขนาดให้พอดีกับ label
-                label_width = max(self.batch_image_labels[idx].winfo_width(), 100)
-                label_height = max(self.batch_image_labels[idx].winfo_height(), 100)
-            
-                ratio = min(label_width / max(img_pil.width, 1), label_height / max(img_pil.height, 1))
-                new_width = max(int(img_pil.width * ratio), 1)
-                new_height = max(int(img_pil.height * ratio), 1)
-            
-                try:
-                    resample_mode = Image.Resampling.LANCZOS
-                except AttributeError:
-                    resample_mode = Image.ANTIALIAS
-            
-                img_resized = img_pil.resize((new_width, new_height), resample_mode)
-                img_ctk = CTkImage(light_image=img_resized, dark_image=img_resized, size=(new_width, new_height))
-            
-                self.batch_image_labels[idx].configure(image=img_ctk, text="")
-                self.batch_image_labels[idx].image = img_ctk
+                self._set_tile_image(idx, self.batch_images[idx]['id'], image)
         
             # ถ้าเป็นโหมด auto และ batch เต็มแล้ว ให้วิเคราะห์อัตโนมัติ
             if self.analysis_mode == "auto" and len(self.batch_images) == self.batch_size:
@@ -969,6 +1292,39 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
             self.status_var.set(f"Batch เต็มแล้ว (สูงสุด {self.batch_size} รูป)")
             return False
 
+    def _tile_size(self, idx):
+        label = self.batch_image_labels[idx]
+        return max(label.winfo_width(), 100), max(label.winfo_height(), 100)
+
+    def _set_tile_image(self, idx, image_id, image):
+        """ขอ thumbnail ของช่อง idx ตามขนาดช่องปัจจุบัน (ข้ามถ้าช่องแสดงรูปเดิมที่ขนาดเดิมอยู่แล้ว)"""
+        key = (image_id, self._tile_size(idx))
+        self._tile_images[idx] = (image_id, image)
+        if self._tile_keys.get(idx) == key:
+            return
+        self._tile_keys[idx] = key
+        self.thumbnails.request(idx, image_id, image, key[1])
+
+    def _apply_thumbnail(self, idx, image_id, size, img_ctk):
+        """แสดง thumbnail ที่ย่อเสร็จแล้ว (ทิ้งผลที่ล้าสมัย เช่นช่องถูกรีเซ็ตหรือเปลี่ยนรูประหว่างย่อ)"""
+        if self._tile_keys.get(idx) != (image_id, size) or idx >= len(self.batch_image_labels):
+            return
+        self.batch_image_labels[idx].configure(image=img_ctk, text="")
+        self.batch_image_labels[idx].image = img_ctk
+
+    def _refresh_tiles(self):
+        """ขอ thumbnail ใหม่ของช่องที่ขนาดเปลี่ยนหลังปรับขนาดหน้าต่าง"""
+        if not hasattr(self, 'batch_frame'):
+            return
+        for idx, (image_id, image) in list(self._tile_images.items()):
+            if idx < len(self.batch_image_labels):
+                self._set_tile_image(idx, image_id, image)
+
+    def _clear_tiles(self):
+        self._tile_keys.clear()
+        self._tile_images.clear()
+        self.thumbnails.forget_tiles()
+
     def analyze_batch(self):
         """วิเคราะห์รูปภาพทั้งหมดใน batch"""
         if not self.batch_images:
@@ -978,103 +1334,70 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.update()
     
         self.batch_results = []
-        overall_grade = "AB"  # เริ่มต้นด้วยเกรด AB
     
-        for i, img_data in enumerate(self.batch_images):
-            try:
-                # ถ้ามี path ให้วิเคราะห์จาก path
-                if img_data['path']:
-                    img_result, text_result = process_image(img_data['path'])
-                else:
-                    # บันทึกรูปภาพชั่วคราว
-                    temp_path = f"temp_batch_{i}.jpg"
-                    cv2.imwrite(temp_path, cv2.cvtColor(img_data['image'], cv2.COLOR_RGB2BGR))
-                    img_result, text_result = process_image(temp_path)
-                
-                    # ลบไฟล์ชั่วคราว
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-            
-                # เก็บผลลัพธ์
-                self.batch_results.append({
-                    'image': img_result,
-                    'text': text_result
-                })
-            
-                # ตรวจสอบเกรด
-                if "Grade: C" in text_result:
-                    overall_grade = "C"
-                
-            except Exception as e:
-                self.batch_results.append({
-                    'image': img_data['image'],
-                    'text': f"Error: {str(e)}"
-                })
+        try:
+            # วิเคราะห์ทั้ง batch ด้วยการเรียกโมเดลครั้งเดียว (รูปเก็บเป็น RGB ทั้งจากไฟล์และกล้อง)
+            outputs = self._grade_batch([img_data['image'] for img_data in self.batch_images], color_order='RGB')
+        except Exception as e:
+            outputs = [ImageResult(error=str(e)) for _ in self.batch_images]
+    
+        for img_data, result in zip(self.batch_images, outputs):
+            # ถ้าวิเคราะห์ไม่สำเร็จให้แสดงรูปเดิม
+            img_result = result.image
+            if img_result is None and result.error is not None:
+                img_result = img_data['image']
+        
+            # เก็บผลลัพธ์ (รูปเดิมที่แสดงซ้ำใช้ id เดิม จึงได้ thumbnail จาก cache)
+            self.batch_results.append({
+                'image': img_result,
+                'id': img_data['id'] if img_result is img_data['image'] else self.thumbnails.new_id(),
+                'result': result
+            })
     
-        # แสดงผลลัพธ์
-        self._show_batch_results(overall_grade)
+        # แสดงผลลัพธ์ (C ถ้ามีรูปใดเป็นเกรด C)
+        self._show_batch_results(overall_grade(r['result'] for r in self.batch_results))
 
     def _show_batch_results(self, overall_grade):
         """แสดงผลการวิเคราะห์ batch"""
         if not self.batch_results:
             return
     
-        # อัพเดตการแสดงผลรูปภาพ
+        # อัพเดตการแสดงผลรูปภาพ (ย่อใน worker thread เฉพาะช่องที่รูปเปลี่ยน)
         for i, result in enumerate(self.batch_results):
-            if i < len(self.batch_image_labels):
-                # แสดงรูปผลลัพธ์
-                if result['image'] is not None:
-                    img_pil = Image.fromarray(result['image'])
-                
-                    # ปรับขนาดให้พอดีกับ label
-                    label_width = max(self.batch_image_labels[i].winfo_width(), 100)
-                    label_height = max(self.batch_image_labels[i].winfo_height(), 100)
-                
-                    ratio = min(label_width / max(img_pil.width, 1), label_height / max(img_pil.height, 1))
-                    new_width = max(int(img_pil.width * ratio), 1)
-                    new_height = max(int(img_pil.height * ratio), 1)
-                
-                    try:
-                        resample_mode = Image.Resampling.LANCZOS
-                    except AttributeError:
-                        resample_mode = Image.ANTIALIAS
-                    
-                    img_resized = img_pil.resize((new_width, new_height), resample_mode)
-                    img_ctk = CTkImage(light_image=img_resized, dark_image=img_resized, size=(new_width, new_height))
-                
-                    self.batch_image_labels[i].configure(image=img_ctk, text="")
-                    self.batch_image_labels[i].image = img_ctk
+            if i < len(self.batch_image_labels) and result['image'] is not None:
+                self._set_tile_image(i, result['id'], result['image'])
     
-    # อัพเดตผลการวิเคราะห์ใน text box
-    if hasattr(self, 'summary_text') and self.show_result_panel:
         current_time = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+        # อัพเดตผลการวิเคราะห์ใน text box
+        if hasattr(self, 'summary_text') and self.show_result_panel:
+            # อัพเดตผลลัพธ์รวม
+            self.summary_text.configure(state="normal")
+            self.summary_text.delete("1.0", "end")
+            summary_text = f"📅 วันที่วิเคราะห์: {current_time}\n"
+            summary_text += f"🏆 ผลการวิเคราะห์รวม: เกรด {overall_grade}\n"
+            summary_text += f"จำนวนรูปภาพ: {len(self.batch_results)}"
+            self.summary_text.insert("1.0", summary_text)
+            self.summary_text.configure(state="disabled")
         
-        # อัพเดตผลลัพธ์รวม
-        self.summary_text.configure(state="normal")
-        self.summary_text.delete("1.0", "end")
-        summary_text = f"📅 วันที่วิเคราะห์: {current_time}\n"
-        summary_text += f"🏆 ผลการวิเคราะห์รวม: เกรด {overall_grade}\n"
-        summary_text += f"จำนวนรูปภาพ: {len(self.batch_results)}"
-        self.summary_text.insert("1.0", summary_text)
-        self.summary_text.configure(state="disabled")
-        
-        # อัพเดตผลลัพธ์แต่ละรูป
-        for i, result in enumerate(self.batch_results):
-            if i < len(self.result_textboxes):
-                self.result_textboxes[i].configure(state="normal")
-                self.result_textboxes[i].delete("1.0", "end")
-                self.result_textboxes[i].insert("1.0", result['text'])
-                self.result_textboxes[i].configure(state="disabled")
+            # อัพเดตผลลัพธ์แต่ละรูป
+            for i, result in enumerate(self.batch_results):
+                if i < len(self.result_textboxes):
+                    self.result_textboxes[i].configure(state="normal")
+                    self.result_textboxes[i].delete("1.0", "end")
+                    self.result_textboxes[i].insert("1.0", format_result(result['result']))
+                    self.result_textboxes[i].configure(state="disabled")
     
-    # บันทึกประวัติการวิเคราะห์
-    self.result_history.append({
-        'time': current_time,
-        'overall_grade': overall_grade,
-        'batch_results': self.batch_results
-    })
+        # บันทึกประวัติการวิเคราะห์ (ไม่เก็บรูปไว้ในประวัติ)
+        self.result_store.add('batch', [r['result'] for r in self.batch_results],
+                              paths=[img_data['path'] for img_data in self.batch_images], grade=overall_grade)
+        for img_data, result in zip(self.batch_images, self.batch_results):
+            self._record_images(img_data['path'] or 'batch', result['result'],
+                                raw=img_data['image'] if img_data['path'] is None else None)
     
-    self.save_btn.configure(state="normal")
-    self.status_var.set(f"วิเคราะห์เสร็จสมบูรณ์ - ผลลัพธ์รวม: เกรด {overall_grade}")
+        self.save_btn.configure(state="normal")
+        self.status_var.set(f"วิเคราะห์เสร็จสมบูรณ์ - ผลลัพธ์รวม: เกรด {overall_grade}")
+        self._log_first_grade()
 
     def reset_batch(self):
         """รีเซ็ต batch images"""
@@ -1082,6 +1405,7 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         self.batch_results = []
     
         # รีเซ็ตการแสดงผล
+        self._clear_tiles()
         if hasattr(self, 'batch_image_labels'):
             for i, label in enumerate(self.batch_image_labels):
                 label.configure(image=None, text=f"(ว่าง)")
@@ -1104,6 +1428,23 @@ class DurianGraderApp(tkinterdnd2.TkinterDnD.Tk):
         if self.analysis_mode == "manual" and hasattr(self, 'analyze_btn'):
             self.analyze_btn.configure(state="disabled")
 
+    def on_close(self):
+        """ปิดกล้องและ worker ทั้งหมดก่อนปิดหน้าต่าง"""
+        if self.camera_active:
+            self.stop_camera()
+        if self.engine is not None:
+            self.engine.shutdown(wait=False)
+            self.engine = None
+        self.camera_pool.close()
+        self.result_store.close()
+        self.thumbnails.close()
+        if self.image_writer is not None:
+            writer = self.image_writer
+            writer.stop()
+            print(f"Image writer: {writer.written} saved, {writer.dropped} dropped (queue full), "
+                  f"{writer.errors} errors")
+        self.destroy()
+
     def __del__(self):
         """ทำความสะอาดเมื่อปิดแอปพลิเคชัน"""
         if hasattr(self, 'camera_active') and self.camera_active:
@@ -0,0 +1,46 @@
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+# ให้ import utils.* ได้เมื่อรันสคริปต์จากโฟลเดอร์ใดก็ได้
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if APP_DIR not in sys.path:
+    sys.path.insert(0, APP_DIR)
+
+SAMPLE_DIR = os.path.join(APP_DIR, '..', 'sample_data')
+
+
+def sample_image_paths():
+    """รายชื่อรูปตัวอย่าง: durian_top.jpg และ side_views/side*.jpg"""
+    paths = [os.path.join(SAMPLE_DIR, 'durian_top.jpg')]
+    paths += sorted(glob.glob(os.path.join(SAMPLE_DIR, 'side_views', 'side*.jpg')))
+    return [os.path.normpath(p) for p in paths if os.path.exists(p)]
+
+
+def sample_mask(image):
+    """
+    สร้าง mask ทุเรียนจากรูปตัวอย่างโดยไม่ใช้โมเดล (Otsu บนค่า saturation + contour ใหญ่สุด)
+    ใช้สำหรับ benchmark ส่วนคำนวณเรขาคณิตเท่านั้น
+    """
+    saturation = cv2.GaussianBlur(cv2.cvtColor(image, cv2.COLOR_BGR2HSV)[:, :, 1], (15, 15), 0)
+    _, thresh = cv2.threshold(saturation, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    thresh = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, np.ones((25, 25), np.uint8))
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    mask = np.zeros(thresh.shape, dtype=np.uint8)
+    if contours:
+        cv2.drawContours(mask, [max(contours, key=cv2.contourArea)], -1, 255, -1)
+    return mask
+
+
+def best_of(func, repeat):
+    """รัน func หลายครั้งแล้วคืนเวลาที่ดีที่สุด (วินาที) และผลลัพธ์ล่าสุด"""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
@@ -0,0 +1,80 @@
+"""
+เปรียบเทียบ latency ต่อเฟรมของ inference backend (pytorch / onnx / openvino) บน sample_data
+
+แต่ละ backend จะ export โมเดลเข้า cache_dir ให้อัตโนมัติในครั้งแรก (ไม่นับรวมในเวลา)
+infer ms คือเวลาเรียกโมเดลหนึ่งเฟรม, total ms รวมการวัดผลทุเรียนทุกลูกในเฟรม
+คอลัมน์ |dL| / |dR| คือผลต่าง diff-percentage ของทุเรียนลูกแรกเทียบกับ pytorch
+
+รันจากโฟลเดอร์ v4:
+    python benchmarks/bench_backends.py
+    python benchmarks/bench_backends.py --backends pytorch onnx --repeat 10
+"""
+import argparse
+import dataclasses
+import os
+
+import cv2
+
+from _common import sample_image_paths, best_of
+import utils.durian_grader as durian_grader
+from utils.config_loader import get_config
+from utils.inference_backend import BACKENDS
+
+
+def run_frame(yolo, image, config, conf):
+    """inference หนึ่งเฟรมแล้ววัดผลทุกลูก คืนค่า (infer วินาที, ผลวัดของลูกแรกหรือ None)"""
+    infer_time, results = best_of(
+        lambda: yolo(image, device=durian_grader.device, imgsz=config.model_imgsz, conf=conf, verbose=False)[0], 1)
+    first = None
+    if results.masks is not None:
+        height, width = image.shape[:2]
+        for seg_mask in durian_grader._unpad_masks(results.masks.data, height, width):
+            _, grade, area, _ = durian_grader._measure_detection(seg_mask, height, width, config)
+            first = first or (grade, area)
+    return infer_time, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--conf', type=float, default=0.25)
+    args = parser.parse_args()
+
+    images = [(os.path.basename(path), cv2.imread(path)) for path in sample_image_paths()]
+    reference = {}
+
+    print(f"{'backend':<9} {'image':<16} {'infer ms':>9} {'total ms':>9} {'grade':>6} {'|dL|':>6} {'|dR|':>6}")
+    for backend in args.backends:
+        config = dataclasses.replace(get_config(), model_backend=backend)
+        try:
+            yolo = durian_grader.get_model(config)
+        except RuntimeError as e:
+            print(f"{backend:<9} skipped: {e}")
+            continue
+
+        # เฟรมแรกของแต่ละ backend ช้ากว่าปกติ (จัดสรรหน่วยความจำ/คอมไพล์) จึงไม่นับ
+        run_frame(yolo, images[0][1], config, args.conf)
+
+        for name, image in images:
+            best_infer, best_total, first = float('inf'), float('inf'), None
+            for _ in range(args.repeat):
+                total, (infer_time, first) = best_of(lambda: run_frame(yolo, image, config, args.conf), 1)
+                best_infer = min(best_infer, infer_time)
+                best_total = min(best_total, total)
+
+            timing = f"{backend:<9} {name:<16} {best_infer * 1000:>9.1f} {best_total * 1000:>9.1f}"
+            if first is None:
+                print(f"{timing} {'-':>6}")
+                continue
+
+            grade, area = first
+            reference.setdefault(name, first)
+            ref_grade, ref_area = reference[name]
+            d_left = abs(area['left']['diff-percentage'] - ref_area['left']['diff-percentage'])
+            d_right = abs(area['right']['diff-percentage'] - ref_area['right']['diff-percentage'])
+            print(f"{timing} {grade + ('' if grade == ref_grade else '!'):>6} {d_left:>6.3f} {d_right:>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
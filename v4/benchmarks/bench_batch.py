@@ -0,0 +1,97 @@
+"""
+ตรวจว่า process_batch ให้ผลเท่ากับ process_image ทีละรูป เมื่อรูปใน batch มีขนาดต่างกัน และเทียบเวลา
+
+ใช้รูปจาก sample_data ทั้งรูปเดิม (แนวตั้ง) รูปหมุน 90 องศา (แนวนอน) และรูปย่อครึ่งหนึ่ง ปนกันใน batch เดียว
+(process_batch แยกกลุ่มตามขนาดรูปแล้วเรียกโมเดลครั้งละกลุ่ม ถ้ารวมรูปต่างขนาดใน batch เดียว
+ultralytics จะเติมขอบทุกรูปเป็นสี่เหลี่ยมจัตุรัส ซึ่งวัดบน CPU ได้ช้ากว่าทีละรูปราว 2 เท่า: 15 รูป 3.0s เทียบกับ 1.4s)
+ผลของแต่ละรูปเทียบทุเรียนลูกแรกจาก process_image กับลูกที่กรอบซ้อนทับมากที่สุดจาก process_batch:
+IoU = การซ้อนทับของกรอบ, |dL| / |dR| = ผลต่าง diff-percentage, pt err = ระยะห่างสูงสุดของ red_pt/blue_pt (พิกเซล)
+
+รันจากโฟลเดอร์ v4:
+    python benchmarks/bench_batch.py
+    python benchmarks/bench_batch.py --mask-mode native
+"""
+import argparse
+import dataclasses
+import os
+import time
+
+import cv2
+import numpy as np
+
+from _common import sample_image_paths
+import utils.durian_grader as durian_grader
+from utils.config_loader import get_config, MASK_MODES
+from utils.grading_result import SIDES
+
+
+def mixed_images():
+    """คืนค่า list ของ (ชื่อ, รูป BGR) ที่มีหลายขนาดและหลายอัตราส่วน"""
+    images = []
+    for path in sample_image_paths():
+        name = os.path.splitext(os.path.basename(path))[0]
+        image = cv2.imread(path)
+        images.append((name, image))
+        images.append((name + '-rot', cv2.rotate(image, cv2.ROTATE_90_CLOCKWISE)))
+        images.append((name + '-half', cv2.resize(image, None, fx=0.5, fy=0.5, interpolation=cv2.INTER_AREA)))
+    return images
+
+
+def iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    w = max(min(ax + aw, bx + bw) - max(ax, bx), 0)
+    h = max(min(ay + ah, by + bh) - max(ay, by), 0)
+    union = aw * ah + bw * bh - w * h
+    return w * h / union if union > 0 else 0.0
+
+
+def point_error(detection, reference):
+    errors = [0.0]
+    for points, reference_points in ((detection.red_pts, reference.red_pts), (detection.blue_pts, reference.blue_pts)):
+        for side in SIDES:
+            if points[side] is not None and reference_points[side] is not None:
+                errors.append(float(np.linalg.norm(np.subtract(points[side], reference_points[side]))))
+    return max(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mask-mode', choices=MASK_MODES, help="แทนค่า mask_mode ใน config.ini")
+    args = parser.parse_args()
+
+    config = get_config()
+    if args.mask_mode:
+        config = dataclasses.replace(config, mask_mode=args.mask_mode)
+    images = mixed_images()
+    # เรียกครั้งแรกช้ากว่าปกติ (จัดสรรหน่วยความจำ) จึงไม่นับ
+    durian_grader.process_image(images[0][1], render=False, config=config)
+
+    start = time.perf_counter()
+    singles = [durian_grader.process_image(image, render=False, config=config) for _, image in images]
+    single_time = time.perf_counter() - start
+    start = time.perf_counter()
+    batch = durian_grader.process_batch([image for _, image in images], render=False, config=config)
+    batch_time = time.perf_counter() - start
+
+    print(f"{'image':<18} {'size':>10} {'n':>5} {'grade':>7} {'IoU':>6} {'|dL|':>6} {'|dR|':>6} {'pt err':>7}")
+    worst = 0.0
+    for (name, image), single, batched in zip(images, singles, batch):
+        height, width = image.shape[:2]
+        line = (f"{name:<18} {f'{width}x{height}':>10} {f'{len(single.detections)}/{len(batched.detections)}':>5} "
+                f"{f'{single.grade}/{batched.grade}':>7}")
+        if single.detections and batched.detections:
+            reference = single.detections[0]
+            match = max(batched.detections, key=lambda d: iou(d.bbox, reference.bbox))
+            error = point_error(match, reference)
+            worst = max(worst, error)
+            line += (f" {iou(match.bbox, reference.bbox):>6.3f} {abs(match.left_diff - reference.left_diff):>6.3f} "
+                     f"{abs(match.right_diff - reference.right_diff):>6.3f} {error:>7.1f}")
+        print(line)
+
+    print(f"mask_mode {config.mask_mode}: {len(images)} images, one-by-one {single_time:.2f}s, "
+          f"batch {batch_time:.2f}s ({single_time / batch_time:.2f}x), worst pt err {worst:.1f}px")
+
+
+if __name__ == "__main__":
+    main()
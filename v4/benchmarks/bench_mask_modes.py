@@ -0,0 +1,77 @@
+"""
+ตรวจความแม่นยำและความเร็วของ mask_mode (full / roi / native) บน sample_data
+
+ใช้ mask ที่สร้างจากรูปตัวอย่างแล้วย่อเป็นความละเอียดของโมเดล (เช่น 640x384)
+จากนั้นวัดผลด้วยแต่ละโหมดเทียบกับโหมด full (วิธีเดิม)
+peak MB คือหน่วยความจำสูงสุดที่ numpy จองระหว่างวัดผลหนึ่งครั้ง
+|dL| / |dR| = ผลต่าง diff-percentage, pt err = ระยะห่างสูงสุดของ red_pt/blue_pt (พิกเซลภาพ) เทียบกับโหมด full
+
+รันจากโฟลเดอร์ v4:
+    python benchmarks/bench_mask_modes.py
+"""
+import argparse
+import dataclasses
+import os
+import tracemalloc
+
+import cv2
+import numpy as np
+import torch
+
+from _common import sample_image_paths, sample_mask, best_of
+import utils.durian_grader as durian_grader
+from utils.config_loader import ConfigSnapshot, MASK_MODES
+
+
+def native_mask(image, model_size):
+    """ย่อ mask ของรูปตัวอย่างเป็นขนาด mask ที่โมเดลส่งออกมา (ค่า 0/1 แบบ float)"""
+    mask = sample_mask(image)
+    small = cv2.resize(mask, model_size[::-1], interpolation=cv2.INTER_AREA)
+    return torch.from_numpy((small > 127).astype(np.float32))
+
+
+def point_error(info, reference):
+    """ระยะห่างสูงสุด (พิกเซล) ของ red_pt/blue_pt เทียบกับโหมด full"""
+    errors = [0.0]
+    for side in ('left', 'right', 'top', 'bottom'):
+        for key in ('red_pt', 'blue_pt'):
+            if info[side][key] is not None and reference[side][key] is not None:
+                errors.append(float(np.linalg.norm(np.subtract(info[side][key], reference[side][key]))))
+    return max(errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--model-size', type=int, nargs=2, default=(640, 384), metavar=('H', 'W'))
+    args = parser.parse_args()
+
+    print(f"{'image':<16} {'mode':<7} {'ms':>8} {'speedup':>8} {'peak MB':>8} {'grade':>6} "
+          f"{'L-diff%':>8} {'R-diff%':>8} {'|dL|':>6} {'|dR|':>6} {'pt err':>7}")
+    for path in sample_image_paths():
+        image = cv2.imread(path)
+        height, width = image.shape[:2]
+        seg_mask = native_mask(image, tuple(args.model_size))
+
+        reference, full_time = None, None
+        for mode in MASK_MODES:
+            config = dataclasses.replace(ConfigSnapshot(), mask_mode=mode)
+            elapsed, (info, grade, area, _) = best_of(
+                lambda: durian_grader._measure_detection(seg_mask, height, width, config), args.repeat)
+            tracemalloc.start()
+            durian_grader._measure_detection(seg_mask, height, width, config)
+            peak = tracemalloc.get_traced_memory()[1] / 1e6
+            tracemalloc.stop()
+            if reference is None:
+                reference, full_time = (info, grade, area), elapsed
+
+            left, right = area['left']['diff-percentage'], area['right']['diff-percentage']
+            print(f"{os.path.basename(path):<16} {mode:<7} {elapsed * 1000:>8.1f} {full_time / elapsed:>7.1f}x {peak:>8.1f} "
+                  f"{grade + ('' if grade == reference[1] else '!'):>6} {left:>8.3f} {right:>8.3f} "
+                  f"{abs(left - reference[2]['left']['diff-percentage']):>6.3f} "
+                  f"{abs(right - reference[2]['right']['diff-percentage']):>6.3f} "
+                  f"{point_error(info, reference[0]):>7.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+วัดเวลาแต่ละขั้นของ pipeline บน sample_data (durian_top.jpg และ side_views/side*.jpg)
+
+ขั้นที่วัด: decode, inference, mask upsample (ตาม mask_mode), contour, area count, measure (contour + area + เกรด), render
+และฟังก์ชันที่ใช้จริง: calculate_grade_by_distance, draw_results, process_image (ครบทุกขั้นตั้งแต่อ่านไฟล์)
+ms = เวลาที่ดีที่สุดจาก --repeat ครั้ง, per s = จำนวนครั้งต่อวินาที,
+peak MB = หน่วยความจำสูงสุดที่ Python/numpy จองระหว่างรันหนึ่งครั้ง (ไม่รวมหน่วยความจำภายในของ torch)
+
+ถ้าโมเดลไม่พบทุเรียนในรูป ขั้นหลัง inference จะใช้ mask ที่สร้างจากรูปตัวอย่าง (mask = sample)
+เพื่อให้ยังวัดส่วนเรขาคณิตได้
+
+รันจากโฟลเดอร์ v4:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --json bench_v4.json
+    python benchmarks/bench_pipeline.py --compare bench_v4.json --mask-mode native
+"""
+import argparse
+import dataclasses
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tracemalloc
+
+import cv2
+import numpy as np
+import torch
+
+from _common import APP_DIR, sample_image_paths, sample_mask, best_of
+import utils.durian_grader as durian_grader
+from utils.config_loader import get_config, load_config, MASK_MODES
+from utils.measurement import compute_segment_area
+
+STAGES = ('decode', 'inference', 'mask_upsample', 'contour', 'area_count', 'measure', 'render',
+          'calculate_grade_by_distance', 'draw_results', 'process_image')
+
+
+def run_stage(func, repeat):
+    """คืนค่า (สถิติของขั้น, ผลลัพธ์ล่าสุด)"""
+    elapsed, result = best_of(func, repeat)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    stats = {
+        'ms': round(elapsed * 1000, 3),
+        'peak_mb': round(peak / 1e6, 3),
+        'per_s': round(1.0 / elapsed, 2) if elapsed > 0 else None,
+    }
+    return stats, result
+
+
+def model_mask_size(height, width, imgsz):
+    """ขนาด mask ของโมเดลหลังตัดขอบ letterbox (ภาพย่อให้ด้านยาว = imgsz)"""
+    ratio = imgsz / max(height, width)
+    return round(height * ratio), round(width * ratio)
+
+
+def sample_seg_mask(image, imgsz):
+    """mask จากรูปตัวอย่างที่ย่อเป็นขนาด mask ของโมเดล (float 0/1 แบบเดียวกับ results.masks.data ที่ตัดขอบแล้ว)"""
+    height, width = image.shape[:2]
+    mask_h, mask_w = model_mask_size(height, width, imgsz)
+    small = cv2.resize(sample_mask(image), (mask_w, mask_h), interpolation=cv2.INTER_AREA)
+    return torch.from_numpy((small > 127).astype(np.float32))
+
+
+def upsample(seg_mask, height, width, mask_mode):
+    """ขยาย mask ตาม mask_mode เหมือน _measure_detection คืนค่า (mask, offset, scale)"""
+    if mask_mode == 'native':
+        mask_height, mask_width = seg_mask.shape
+        native = (seg_mask.cpu().numpy() > 0.5).astype(np.uint8) * 255
+        return native, (0, 0), (width / mask_width, height / mask_height)
+    if mask_mode == 'roi':
+        roi_mask, offset = durian_grader._upsample_mask_roi(seg_mask, height, width)
+        if roi_mask is not None:
+            return roi_mask, offset, (1.0, 1.0)
+    return durian_grader._upsample_mask(seg_mask, height, width), (0, 0), (1.0, 1.0)
+
+
+def contour_points(mask, adj, seg_mask, height, width, mask_mode):
+    """หาจุดวัดแบบเดียวกับ _measure_detection (native ขยาย mask เฉพาะแถบตามขอบกรอบ)"""
+    if mask_mode == 'native':
+        return durian_grader._native_points(seg_mask.cpu().numpy().astype(np.float32), mask, height, width, adj)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return [durian_grader._contour_points(cnt, adj) for cnt in contours]
+
+
+def bench_image(path, yolo, config, conf, repeat):
+    """วัดทุกขั้นของรูปหนึ่งรูป คืนค่า dict ของผล"""
+    stages = {}
+    stages['decode'], image = run_stage(lambda: cv2.imread(path), repeat)
+    height, width = image.shape[:2]
+
+    stages['inference'], results = run_stage(
+        lambda: yolo(image, device=durian_grader.device, imgsz=config.model_imgsz, conf=conf, verbose=False)[0],
+        repeat)
+    if results.masks is not None:
+        seg_mask, mask_source = durian_grader._unpad_masks(results.masks.data, height, width)[0], 'model'
+        x1, y1, x2, y2 = results.boxes[0].xyxy.cpu().numpy()[0].astype(int)
+        bbox = (x1, y1, x2 - x1, y2 - y1)
+    else:
+        seg_mask, mask_source = sample_seg_mask(image, config.model_imgsz), 'sample'
+        bbox = None
+
+    stages['mask_upsample'], (mask, offset, scale) = run_stage(
+        lambda: upsample(seg_mask, height, width, config.mask_mode), repeat)
+    stages['contour'], points = run_stage(
+        lambda: contour_points(mask, config.adj, seg_mask, height, width, config.mask_mode), repeat)
+    points = points if config.mask_mode == 'native' else None
+
+    # เส้นแบ่งจากผลวัดจริง แปลงเป็นพิกัดของ mask แบบเดียวกับ measure()
+    segment_info, grade, segment_area = durian_grader.measure(mask, offset=offset, scale=scale, config=config,
+                                                              points=points)
+    center_y = (segment_info['top']['blue_pt'][1] + segment_info['bottom']['blue_pt'][1]) // 2
+    center_x = (segment_info['left']['blue_pt'][0] + segment_info['right']['blue_pt'][0]) // 2
+    mask_x = int(round((center_x - offset[0] + 0.5) / scale[0] - 0.5))
+    mask_y = int(round((center_y - offset[1] + 0.5) / scale[1] - 0.5))
+    stages['area_count'], _ = run_stage(
+        lambda: compute_segment_area(mask, mask_x, mask_y, pixel_area=scale[0] * scale[1]), repeat)
+    # measure รวมเวลาหาจุดวัดของ native ด้วย (เหมือน _measure_detection)
+    stages['measure'], _ = run_stage(
+        lambda: durian_grader.measure(
+            mask, offset=offset, scale=scale, config=config,
+            points=contour_points(mask, config.adj, seg_mask, height, width, 'native') if points else None),
+        repeat)
+
+    full_mask = durian_grader._upsample_mask(seg_mask, height, width)
+    if bbox is None:
+        bbox = cv2.boundingRect(full_mask)
+    stages['render'], _ = run_stage(
+        lambda: durian_grader.render_results(image, full_mask, bbox, segment_info, config), repeat)
+    stages['calculate_grade_by_distance'], _ = run_stage(
+        lambda: durian_grader.calculate_grade_by_distance(segment_info, segment_area, config), repeat)
+    stages['draw_results'], _ = run_stage(
+        lambda: durian_grader.draw_results(image, full_mask, bbox, config), repeat)
+    stages['process_image'], _ = run_stage(
+        lambda: durian_grader.process_image(path, render=True, config=config), repeat)
+
+    return {
+        'image': os.path.basename(path),
+        'size': [width, height],
+        'mask_source': mask_source,
+        'grade': grade,
+        'stages': stages,
+    }
+
+
+def summarize(images):
+    """รวมเวลาของทุกรูปต่อขั้น: ms รวม, peak MB สูงสุด, จำนวนรูปต่อวินาที"""
+    summary = {}
+    for stage in STAGES:
+        total = sum(image['stages'][stage]['ms'] for image in images)
+        summary[stage] = {
+            'ms': round(total, 3),
+            'peak_mb': max(image['stages'][stage]['peak_mb'] for image in images),
+            'images_per_s': round(len(images) / (total / 1000), 2) if total > 0 else None,
+        }
+    return summary
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=APP_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(report, baseline=None):
+    base_images = {image['image']: image for image in baseline['images']} if baseline else {}
+    header = f"{'image':<16} {'stage':<28} {'ms':>9} {'per s':>9} {'peak MB':>8}"
+    print(header + (f" {'base ms':>9} {'speedup':>8}" if baseline else ""))
+    rows = [(image['image'] + ('*' if image['mask_source'] == 'sample' else ''), image['stages'],
+             base_images.get(image['image'], {}).get('stages', {})) for image in report['images']]
+    rows.append(('total', {stage: dict(s, per_s=s['images_per_s']) for stage, s in report['summary'].items()},
+                 baseline['summary'] if baseline else {}))
+
+    for name, stages, base_stages in rows:
+        for stage in STAGES:
+            s = stages[stage]
+            line = f"{name:<16} {stage:<28} {s['ms']:>9.2f} {s['per_s'] or 0:>9.1f} {s['peak_mb']:>8.2f}"
+            base = base_stages.get(stage)
+            if base:
+                line += f" {base['ms']:>9.2f} {base['ms'] / s['ms'] if s['ms'] else 0:>7.2f}x"
+            print(line)
+    if any(image['mask_source'] == 'sample' for image in report['images']):
+        print("* model found no durian; stages after inference use the sample mask")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--mask-mode', choices=MASK_MODES, help="แทนค่า mask_mode ใน config.ini")
+    parser.add_argument('--json', help="บันทึกผลเป็นไฟล์ JSON")
+    parser.add_argument('--compare', help="ไฟล์ JSON จากรอบก่อน (เช่นเวอร์ชันที่ใช้งานอยู่) เพื่อแสดง speedup")
+    args = parser.parse_args()
+
+    config = get_config()
+    if args.mask_mode:
+        config = dataclasses.replace(config, mask_mode=args.mask_mode)
+    yolo = durian_grader.get_model(config)
+    paths = sample_image_paths()
+    # เรียกครั้งแรกช้ากว่าปกติ (จัดสรรหน่วยความจำ) จึงไม่นับ
+    durian_grader.process_image(paths[0], config=config)
+
+    images = [bench_image(path, yolo, config, args.conf, args.repeat) for path in paths]
+    report = {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': load_config().get('App', 'version', fallback='0.0.1'),
+        'commit': git_commit(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'torch': torch.__version__,
+        'config': {
+            'model_backend': config.model_backend,
+            'model_imgsz': config.model_imgsz,
+            'mask_mode': config.mask_mode,
+            'device': str(durian_grader.device),
+        },
+        'repeat': args.repeat,
+        'conf': args.conf,
+        'images': images,
+        'summary': summarize(images),
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+    print_table(report, baseline)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Saved {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: นับพื้นที่ segment แบบ loop เดิม เทียบกับ compute_segment_area
+
+รันจากโฟลเดอร์ v4:
+    python benchmarks/bench_segment_area.py
+"""
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+from _common import sample_image_paths, sample_mask, best_of
+from utils.measurement import compute_segment_area, empty_segment_area
+
+
+def segment_area_loop(mask, center_x, center_line_y):
+    """การนับพื้นที่แบบเดิมใน draw_results (วนทีละพิกเซล) ใช้เป็นค่าอ้างอิง"""
+    segment_area = empty_segment_area()
+    ys, xs = np.where(mask > 0)
+    for x_point, y_point in zip(xs, ys):
+        if x_point < center_x:
+            if y_point < center_line_y:
+                segment_area['left']['top'] += 1
+            else:
+                segment_area['left']['bottom'] += 1
+        else:
+            if y_point < center_line_y:
+                segment_area['right']['top'] += 1
+            else:
+                segment_area['right']['bottom'] += 1
+
+    for side in ('left', 'right'):
+        area = segment_area[side]
+        area['diff'] = abs(area['top'] - area['bottom'])
+        area['all'] = area['top'] + area['bottom']
+        area['diff-percentage'] = area['diff'] / area['all'] * 100
+    return segment_area
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='จำนวนรอบของ kernel แบบ vectorized')
+    parser.add_argument('--loop-repeat', type=int, default=1, help='จำนวนรอบของ loop เดิม')
+    args = parser.parse_args()
+
+    print(f"{'image':<16} {'pixels':>10} {'loop (ms)':>12} {'kernel (ms)':>12} {'speedup':>9}  match")
+    for path in sample_image_paths():
+        mask = sample_mask(cv2.imread(path))
+        x, y, w, h = cv2.boundingRect(mask)
+        center_x, center_line_y = x + w // 2, y + h // 2
+
+        loop_t, expected = best_of(lambda: segment_area_loop(mask, center_x, center_line_y), args.loop_repeat)
+        kern_t, actual = best_of(lambda: compute_segment_area(mask, center_x, center_line_y), args.repeat)
+
+        print(f"{os.path.basename(path):<16} {np.count_nonzero(mask):>10} "
+              f"{loop_t * 1000:>12.1f} {kern_t * 1000:>12.2f} {loop_t / kern_t:>8.0f}x  {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+ยิงคำขอพร้อมกันหลาย client เข้า grade_server เพื่อวัด throughput, latency และขนาด batch ที่เกิดขึ้นจริง
+
+ไม่ระบุ --url จะเปิด service ใน process นี้ (port ว่าง) ให้อัตโนมัติ จึงทดสอบได้โดยไม่ต้องมีเครื่องอื่น
+ใช้รูปจาก sample_data วนส่งตามลำดับ
+
+รันจากโฟลเดอร์ v4:
+    python benchmarks/bench_server.py --clients 8 --requests 64
+    python benchmarks/bench_server.py --url http://127.0.0.1:8765 --clients 4 --batch-window-ms 0
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from _common import sample_image_paths
+import grade_server
+from utils.batch_dispatcher import BatchDispatcher
+from utils.durian_grader import process_batch, warm_up, is_model_ready
+
+
+def start_local_server(max_batch, batch_window_ms, max_pending):
+    """เปิด service บน 127.0.0.1 port ว่างใน thread แยก คืนค่า (url, server, dispatcher)"""
+    warm_up()
+    dispatcher = BatchDispatcher(grade_server.make_grade_items(process_batch), max_batch=max_batch,
+                                 max_wait=batch_window_ms / 1000, max_pending=max_pending).start()
+    server = grade_server.GradingServer(('127.0.0.1', 0), dispatcher, is_model_ready, 50 * 1024 * 1024, 60.0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server, dispatcher
+
+
+def post(url, body, annotated):
+    """ส่งรูปหนึ่งรูป คืนค่า (HTTP status, latency วินาที)"""
+    request = urllib.request.Request(url + '/grade' + ('?annotated=1' if annotated else ''), data=body,
+                                     headers={'Content-Type': 'application/octet-stream'})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request) as response:
+            json.loads(response.read())
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    return status, time.perf_counter() - start
+
+
+def health(url):
+    with urllib.request.urlopen(url + '/health') as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="service ที่เปิดอยู่แล้ว (ไม่ระบุ = เปิดใน process นี้)")
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--annotated', action='store_true')
+    parser.add_argument('--max-batch', type=int, default=8)
+    parser.add_argument('--batch-window-ms', type=float, default=20.0)
+    parser.add_argument('--max-pending', type=int, default=32)
+    args = parser.parse_args()
+
+    bodies = []
+    for path in sample_image_paths():
+        with open(path, 'rb') as f:
+            bodies.append(f.read())
+
+    server = None
+    url = args.url
+    if url is None:
+        url, server, dispatcher = start_local_server(args.max_batch, args.batch_window_ms, args.max_pending)
+    before = health(url)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        responses = list(pool.map(lambda i: post(url, bodies[i % len(bodies)], args.annotated),
+                                  range(args.requests)))
+    elapsed = time.perf_counter() - start
+    after = health(url)
+
+    latencies = sorted(latency for status, latency in responses if status == 200)
+    statuses = {}
+    for status, _ in responses:
+        statuses[status] = statuses.get(status, 0) + 1
+    batches = after['batches'] - before['batches']
+    images = after['images'] - before['images']
+
+    print(f"{args.requests} requests from {args.clients} clients in {elapsed:.2f}s "
+          f"({len(latencies) / elapsed:.2f} img/s)")
+    print(f"status: {statuses}")
+    if latencies:
+        print(f"latency ms: p50 {statistics.median(latencies) * 1000:.1f}, "
+              f"p95 {latencies[int(0.95 * (len(latencies) - 1))] * 1000:.1f}, max {latencies[-1] * 1000:.1f}")
+    print(f"batches: {batches}, average batch: {images / batches if batches else 0:.2f}")
+    print(f"stages ms: {json.dumps(after['stages_ms'])}")
+
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        dispatcher.stop()
+
+
+if __name__ == "__main__":
+    main()
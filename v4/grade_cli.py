@@ -0,0 +1,193 @@
+"""
+วิเคราะห์รูปทุเรียนทั้งโฟลเดอร์โดยไม่ต้องเปิด GUI แล้วเขียนผลเป็น JSONL หรือ CSV ทีละรูป
+
+ตัวอย่าง (รันจากโฟลเดอร์ v4):
+    python grade_cli.py /data/archive -o results.jsonl
+    python grade_cli.py a.jpg b.jpg --format csv --annotated-dir annotated/
+    python grade_cli.py /data/archive -o results.csv --workers 4 --batch-size 8
+"""
+import argparse
+import csv
+import dataclasses
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from utils.config_loader import get_config, MASK_MODES
+from utils.durian_grader import process_batch
+from utils.grading_result import result_to_dict
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+CSV_FIELDS = ['path', 'image_grade', 'durian', 'grade', 'left_grade', 'right_grade',
+              'left_diff', 'right_diff', 'bbox', 'error', 'elapsed_ms']
+
+
+def collect_images(inputs):
+    """คืนค่า list ของ (path, relative path) จากไฟล์และโฟลเดอร์ (ค้นหาในโฟลเดอร์ย่อยด้วย)"""
+    images = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(IMAGE_EXTENSIONS):
+                        path = os.path.join(root, name)
+                        images.append((path, os.path.relpath(path, item)))
+        else:
+            images.append((item, os.path.basename(item)))
+    return images
+
+
+def iter_batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def grade_in_process(paths, batch_size, decode_threads, render, config):
+    """
+    โหลดรูปด้วย thread pool (cv2.imread ปล่อย GIL) ล่วงหน้าหนึ่ง batch ระหว่างที่โมเดลวิเคราะห์ batch ปัจจุบัน
+    คืนค่า ImageResult ตามลำดับของ paths
+    """
+    with ThreadPoolExecutor(max_workers=decode_threads) as pool:
+        batches = list(iter_batches(paths, batch_size))
+        pending = [pool.submit(cv2.imread, path) for path in batches[0]] if batches else []
+        for i in range(len(batches)):
+            images = [future.result() for future in pending]
+            if i + 1 < len(batches):
+                pending = [pool.submit(cv2.imread, path) for path in batches[i + 1]]
+            yield from process_batch(images, render=render, config=config)
+
+
+def grade_with_engine(paths, batch_size, workers, render, config):
+    """
+    ส่ง path เข้า GradingEngine (แต่ละ worker โหลดรูปและวิเคราะห์เอง) โดยมีงานค้างไม่เกิน 2 รอบของ worker
+    คืนค่า ImageResult ตามลำดับของ paths
+    """
+    from utils.grading_engine import GradingEngine
+
+    engine = GradingEngine(workers)
+    try:
+        in_flight = []
+        for batch in iter_batches(paths, batch_size):
+            in_flight.append(engine.submit_batch(batch, render=render, config=config))
+            while len(in_flight) > 2:
+                for future in in_flight.pop(0):
+                    yield from future.result()
+        for futures in in_flight:
+            for future in futures:
+                yield from future.result()
+    finally:
+        engine.shutdown()
+
+
+def csv_rows(path, result):
+    """แถว CSV หนึ่งแถวต่อทุเรียนหนึ่งลูก (รูปที่ไม่พบทุเรียนหรือผิดพลาดได้หนึ่งแถวที่ไม่มีค่าการวัด)"""
+    base = {
+        'path': path,
+        'image_grade': result.grade or '',
+        'error': result.error or '',
+        'elapsed_ms': f"{result.elapsed * 1000:.1f}",
+    }
+    if not result.detections:
+        return [base]
+    return [
+        dict(base, durian=i + 1, grade=d.grade, left_grade=d.left_grade, right_grade=d.right_grade,
+             left_diff=f"{d.left_diff:.4f}", right_diff=f"{d.right_diff:.4f}", bbox=" ".join(map(str, d.bbox)))
+        for i, d in enumerate(result.detections)
+    ]
+
+
+def open_output(path):
+    """เปิดไฟล์ผลลัพธ์ (path เป็น None = stdout)"""
+    if path:
+        return open(path, 'w', newline='', encoding='utf-8')
+    # ผลลัพธ์ออกทาง stdout: ย้าย print/log อื่นทั้งหมด (รวมของ worker process) ไปที่ stderr
+    sys.stdout.flush()
+    out = os.fdopen(os.dup(sys.stdout.fileno()), 'w', newline='', encoding='utf-8')
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    return out
+
+
+def write_annotated(image, path):
+    # รูปที่วาดผลแล้วเป็นลำดับสี RGBA (ตามที่ UI ใช้แสดงผล)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    cv2.imwrite(path, cv2.cvtColor(image, cv2.COLOR_RGBA2BGR))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help="ไฟล์รูปหรือโฟลเดอร์")
+    parser.add_argument('-o', '--output', help="ไฟล์ผลลัพธ์ (ไม่ระบุ = stdout)")
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help="รูปแบบผลลัพธ์ (ไม่ระบุ = ตามนามสกุลของ --output หรือ jsonl)")
+    parser.add_argument('--annotated-dir', help="บันทึกรูปที่วาดผลแล้วลงโฟลเดอร์นี้ (โครงสร้างโฟลเดอร์ตามต้นฉบับ)")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="จำนวน worker process (0 = วิเคราะห์ใน process นี้, ไม่ระบุ = [Engine] workers)")
+    parser.add_argument('--decode-threads', type=int, default=4)
+    parser.add_argument('--mask-mode', choices=MASK_MODES, help="แทนค่า mask_mode ใน config.ini")
+    args = parser.parse_args()
+
+    # ปิด log ต่อรูปของ ultralytics (worker process ได้ค่านี้ไปด้วย)
+    os.environ.setdefault('YOLO_VERBOSE', 'False')
+
+    config = get_config()
+    if args.mask_mode:
+        config = dataclasses.replace(config, mask_mode=args.mask_mode)
+    workers = config.engine_workers if args.workers is None else args.workers
+    output_format = args.format or ('csv' if args.output and args.output.lower().endswith('.csv') else 'jsonl')
+    render = args.annotated_dir is not None
+
+    images = collect_images(args.inputs)
+    if not images:
+        print("No images found.", file=sys.stderr)
+        return 1
+    paths = [path for path, _ in images]
+
+    if workers > 0:
+        results = grade_with_engine(paths, args.batch_size, workers, render, config)
+    else:
+        results = grade_in_process(paths, args.batch_size, args.decode_threads, render, config)
+
+    out = open_output(args.output)
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS) if output_format == 'csv' else None
+    if writer:
+        writer.writeheader()
+
+    counts = {'AB': 0, 'C': 0, 'none': 0, 'error': 0}
+    start = time.perf_counter()
+    # เขียนรูปที่วาดผลแล้วใน thread แยก ไม่ให้การ encode ถ่วงการวิเคราะห์
+    with ThreadPoolExecutor(max_workers=2) as writer_pool:
+        for n, ((path, rel_path), result) in enumerate(zip(images, results), 1):
+            if writer:
+                writer.writerows(csv_rows(path, result))
+            else:
+                out.write(json.dumps(dict(path=path, **result_to_dict(result)), ensure_ascii=False) + "\n")
+            out.flush()
+
+            counts['error' if result.error else (result.grade or 'none')] += 1
+            if render and result.image is not None:
+                annotated_path = os.path.join(args.annotated_dir, os.path.splitext(rel_path)[0] + '.jpg')
+                writer_pool.submit(write_annotated, result.image, annotated_path)
+                result.image = None
+
+            if n % 100 == 0:
+                elapsed = time.perf_counter() - start
+                print(f"{n}/{len(images)} images, {n / elapsed:.2f} img/s", file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    out.close()
+
+    print(f"Graded {len(images)} images in {elapsed:.1f}s ({len(images) / elapsed:.2f} img/s) - "
+          f"AB: {counts['AB']}, C: {counts['C']}, no durian: {counts['none']}, errors: {counts['error']}",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""
+HTTP service สำหรับวิเคราะห์รูปทุเรียนในเครื่อง ให้หลายสถานีบนไลน์ใช้เครื่องวิเคราะห์ร่วมกัน
+คำขอที่เข้ามาในช่วงเวลาสั้นๆ (--batch-window-ms) ถูกรวมเป็นการเรียกโมเดลครั้งเดียว
+
+Endpoints:
+    GET  /health                      สถานะโมเดล คิว และสถิติ batch
+    POST /grade                       body = ไฟล์รูป (jpg/png/...) หรือ multipart/form-data (field ใดก็ได้ที่เป็นไฟล์)
+    POST /grade?width=W&height=H      body = เฟรมดิบ uint8 ขนาด H x W x 3 (ลำดับสี BGR, หรือระบุ &color=rgb)
+    เพิ่ม &annotated=1 เพื่อรับรูปที่วาดผลแล้วเป็น PNG (base64) ในฟิลด์ annotated_png
+
+ตอบ 503 เมื่อคิวเต็ม (พร้อม Retry-After), 413 เมื่อไฟล์ใหญ่เกิน --max-upload-mb, 504 เมื่อรอผลเกิน --timeout
+
+ตัวอย่าง (รันจากโฟลเดอร์ v4):
+    python grade_server.py --port 8765
+    curl --data-binary @durian.jpg http://127.0.0.1:8765/grade
+    curl -F image=@durian.jpg "http://127.0.0.1:8765/grade?annotated=1"
+"""
+import argparse
+import base64
+import email.parser
+import email.policy
+import json
+import os
+import sys
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import cv2
+import numpy as np
+
+from utils.batch_dispatcher import BatchDispatcher, DispatcherFullError
+from utils.config_loader import get_config
+from utils.durian_grader import process_batch, warm_up_async, is_model_ready
+from utils.grading_result import result_to_dict
+from utils.stage_timer import StageStats
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def multipart_file(content_type, body):
+    """คืนค่า bytes ของไฟล์แรกใน multipart/form-data"""
+    message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+        b"Content-Type: " + content_type.encode('latin-1') + b"\r\n\r\n" + body)
+    for part in message.iter_parts() if message.is_multipart() else []:
+        if part.get_filename() is not None or part.get_content_type().startswith('image/'):
+            return part.get_payload(decode=True)
+    raise BadRequest("No file in multipart body.")
+
+
+def decode_image(content_type, body, query):
+    """แปลง body ของคำขอเป็นรูป BGR (ไฟล์รูป, multipart หรือเฟรมดิบตาม width/height ใน query)"""
+    if 'width' in query or 'height' in query:
+        try:
+            width, height = int(query['width'][0]), int(query['height'][0])
+        except (KeyError, ValueError):
+            raise BadRequest("Raw frames need integer width and height.")
+        if width <= 0 or height <= 0 or len(body) != width * height * 3:
+            raise BadRequest(f"Raw frame must be {width}x{height}x3 bytes, got {len(body)}.")
+        frame = np.frombuffer(body, dtype=np.uint8).reshape(height, width, 3)
+        color = query.get('color', ['bgr'])[0].lower()
+        if color not in ('bgr', 'rgb'):
+            raise BadRequest("color must be bgr or rgb.")
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR) if color == 'rgb' else frame
+
+    if content_type.split(';')[0].strip().lower() == 'multipart/form-data':
+        body = multipart_file(content_type, body)
+    image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise BadRequest("Cannot decode image.")
+    return image
+
+
+def encode_png(image):
+    # รูปที่วาดผลแล้วเป็นลำดับสี RGBA (ตามที่ UI ใช้แสดงผล)
+    ok, buffer = cv2.imencode('.png', cv2.cvtColor(image, cv2.COLOR_RGBA2BGRA))
+    return base64.b64encode(buffer).decode('ascii') if ok else None
+
+
+class GradingServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, dispatcher, model_ready, max_upload, timeout):
+        super().__init__(address, GradingRequestHandler)
+        self.dispatcher = dispatcher
+        self.model_ready = model_ready
+        self.max_upload = max_upload
+        self.request_timeout = timeout
+        self.stage_stats = StageStats()
+        self.started = time.time()
+
+
+class GradingRequestHandler(BaseHTTPRequestHandler):
+    server_version = "DurianGrader/1.0"
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urlsplit(self.path).path != '/health':
+            self._send_json(404, {'error': "Not found."})
+            return
+        server = self.server
+        dispatcher = server.dispatcher
+        ready = server.model_ready()
+        self._send_json(200, {
+            'status': 'ok' if ready else 'loading',
+            'model_ready': ready,
+            'pending': dispatcher.pending,
+            'max_pending': dispatcher.max_pending,
+            'batches': dispatcher.batches,
+            'images': dispatcher.items_processed,
+            'average_batch': round(dispatcher.average_batch, 2),
+            'rejected': dispatcher.items_rejected,
+            'uptime_s': round(time.time() - server.started, 1),
+            'stages_ms': {
+                stage: {f"p{q}": round(value * 1000, 2) for q, value in values.items()}
+                for stage, values in server.stage_stats.percentiles((50, 95)).items()
+            },
+        })
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != '/grade':
+            self._send_json(404, {'error': "Not found."})
+            return
+        server = self.server
+        length = self.headers.get('Content-Length')
+        if length is None:
+            self._send_json(411, {'error': "Content-Length required."})
+            return
+        # ตรวจก่อนอ่าน body: ค่าไม่ใช่ตัวเลขทำให้ไม่มีคำตอบ ค่าติดลบทำให้ read() รอจน client ตัดการเชื่อมต่อ
+        try:
+            length = int(length)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self._send_json(400, {'error': "Content-Length must be a non-negative integer."})
+            return
+        if length > server.max_upload:
+            self._send_json(413, {'error': f"Upload larger than {server.max_upload} bytes."})
+            return
+        body = self.rfile.read(length)
+        query = parse_qs(url.query)
+        annotated = query.get('annotated', ['0'])[0].lower() in ('1', 'true', 'yes')
+
+        # decode ใน thread ของคำขอ (หลายคำขอ decode พร้อมกันได้) ส่งเฉพาะรูปเข้า batch
+        try:
+            image = decode_image(self.headers.get('Content-Type', ''), body, query)
+        except BadRequest as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        try:
+            future = server.dispatcher.submit((image, annotated))
+        except DispatcherFullError as e:
+            self._send_json(503, {'error': str(e)}, headers={'Retry-After': '1'})
+            return
+        try:
+            result = future.result(timeout=server.request_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._send_json(504, {'error': "Timed out waiting for grading."})
+            return
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+
+        server.stage_stats.record(result.timings)
+        payload = result_to_dict(result)
+        if annotated:
+            payload['annotated_png'] = encode_png(result.image) if result.image is not None else None
+        self._send_json(200, payload)
+
+
+def make_grade_items(grade_batch):
+    """
+    handler ของ dispatcher: วิเคราะห์ทั้ง batch ด้วยการเรียกครั้งเดียว
+    วาดผลเมื่อมีคำขอใดใน batch ต้องการรูป แล้วทิ้งรูปของคำขอที่ไม่ต้องการ
+    """
+    def grade_items(items):
+        render = any(annotated for _, annotated in items)
+        results = grade_batch([image for image, _ in items], render=render, config=get_config())
+        for (_, annotated), result in zip(items, results):
+            if not annotated:
+                result.image = None
+        return results
+    return grade_items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--max-batch', type=int, default=8, help="จำนวนรูปสูงสุดต่อการเรียกโมเดลหนึ่งครั้ง")
+    parser.add_argument('--batch-window-ms', type=float, default=20.0,
+                        help="รอคำขออื่นมารวม batch นานสุดกี่ ms หลังคำขอแรก")
+    parser.add_argument('--max-pending', type=int, default=32, help="จำนวนคำขอที่รอได้ก่อนตอบ 503")
+    parser.add_argument('--max-upload-mb', type=float, default=20.0)
+    parser.add_argument('--timeout', type=float, default=30.0, help="เวลารอผลสูงสุดต่อคำขอ (วินาที)")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="จำนวน worker process (0 = วิเคราะห์ใน process นี้)")
+    args = parser.parse_args()
+
+    # ปิด log ต่อรูปของ ultralytics (worker process ได้ค่านี้ไปด้วย)
+    os.environ.setdefault('YOLO_VERBOSE', 'False')
+
+    if args.workers > 0:
+        from utils.grading_engine import GradingEngine
+        engine = GradingEngine(args.workers)
+        engine.start()
+        grade_batch, model_ready = engine.process_batch, engine.is_ready
+    else:
+        engine = None
+        warm_up_async()
+        grade_batch, model_ready = process_batch, is_model_ready
+
+    dispatcher = BatchDispatcher(make_grade_items(grade_batch), max_batch=args.max_batch,
+                                 max_wait=args.batch_window_ms / 1000, max_pending=args.max_pending).start()
+    server = GradingServer((args.host, args.port), dispatcher, model_ready,
+                           int(args.max_upload_mb * 1024 * 1024), args.timeout)
+    print(f"Grading service on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        dispatcher.stop()
+        if engine is not None:
+            engine.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+วิเคราะห์ไฟล์วิดีโอสายพาน (mp4/avi) ด้วย pipeline เดียวกับกล้อง แล้วเขียน timeline ของเกรดทีละเฟรมที่สุ่ม
+สุ่มเฟรมทุก analysis_interval วินาทีตามเวลาของวิดีโอ (ไม่ใช่เวลาจริง) จึงวิเคราะห์ได้เร็วเท่าที่เครื่องทำได้
+
+ตัวอย่าง (รันจากโฟลเดอร์ v4):
+    python grade_video.py conveyor.mp4 -o timeline.jsonl
+    python grade_video.py day/*.mp4 -o timeline.csv --percentage-grading 4.5
+    python grade_video.py conveyor.mp4 --interval 0.25 --annotated-dir frames/ --workers 2
+"""
+import argparse
+import csv
+import dataclasses
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from grade_cli import CSV_FIELDS, csv_rows, open_output, write_annotated
+from utils.config_loader import get_config, load_config, MASK_MODES
+from utils.durian_grader import process_batch
+from utils.grading_result import result_to_dict
+from utils.video_sampler import VideoSampler
+
+TIMELINE_FIELDS = ['video', 'frame', 'time_s'] + CSV_FIELDS[1:]
+
+
+def iter_sample_batches(sampler, size):
+    """รวมเฟรมจาก sampler เป็นก้อนละ size เฟรม (ก้อนสุดท้ายอาจเล็กกว่า)"""
+    batch = []
+    for item in sampler:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def grade_video(sampler, batch_size, render, config, engine=None):
+    """
+    วิเคราะห์เฟรมที่ sampler ส่งมา (sampler decode ก้อนถัดไปล่วงหน้าระหว่างที่โมเดลทำงาน)
+    คืนค่า (frame_index, video_time, ImageResult) ตามลำดับเวลา
+    """
+    if engine is None:
+        for batch in iter_sample_batches(sampler, batch_size):
+            results = process_batch([frame for _, _, frame in batch], render=render, config=config)
+            for (index, video_time, _), result in zip(batch, results):
+                yield index, video_time, result
+        return
+
+    # มีงานค้างใน engine ไม่เกิน 2 ก้อน เพื่อไม่ให้เฟรมที่ decode แล้วสะสมในหน่วยความจำ
+    in_flight = []
+    for batch in iter_sample_batches(sampler, batch_size):
+        futures = engine.submit_batch([frame for _, _, frame in batch], render=render, config=config)
+        in_flight.append(([(index, video_time) for index, video_time, _ in batch], futures))
+        while len(in_flight) > 2:
+            yield from _collect(*in_flight.pop(0))
+    for stamps, futures in in_flight:
+        yield from _collect(stamps, futures)
+
+
+def _collect(stamps, futures):
+    results = [result for future in futures for result in future.result()]
+    for (index, video_time), result in zip(stamps, results):
+        yield index, video_time, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('videos', nargs='+', help="ไฟล์วิดีโอ")
+    parser.add_argument('-o', '--output', help="ไฟล์ timeline (ไม่ระบุ = stdout)")
+    parser.add_argument('--format', choices=('jsonl', 'csv'),
+                        help="รูปแบบผลลัพธ์ (ไม่ระบุ = ตามนามสกุลของ --output หรือ jsonl)")
+    parser.add_argument('--interval', type=float,
+                        help="ช่วงห่างของเฟรมที่วิเคราะห์ตามเวลาวิดีโอ (วินาที, ไม่ระบุ = [Camera] analysis_interval, 0 = ทุกเฟรม)")
+    parser.add_argument('--start', type=float, default=0.0, help="เริ่มที่วินาทีที่เท่าไรของวิดีโอ")
+    parser.add_argument('--end', type=float, help="หยุดที่วินาทีที่เท่าไรของวิดีโอ")
+    parser.add_argument('--annotated-dir', help="บันทึกเฟรมที่วาดผลแล้วลงโฟลเดอร์นี้ (แยกโฟลเดอร์ตามชื่อวิดีโอ)")
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=0,
+                        help="จำนวน worker process (0 = วิเคราะห์ใน process นี้)")
+    parser.add_argument('--percentage-grading', type=float, help="แทนค่า percentage_grading ใน config.ini")
+    parser.add_argument('--mask-mode', choices=MASK_MODES, help="แทนค่า mask_mode ใน config.ini")
+    args = parser.parse_args()
+
+    # ปิด log ต่อรูปของ ultralytics (worker process ได้ค่านี้ไปด้วย)
+    os.environ.setdefault('YOLO_VERBOSE', 'False')
+
+    config = get_config()
+    if args.percentage_grading is not None:
+        config = dataclasses.replace(config, percentage_grading=args.percentage_grading)
+    if args.mask_mode:
+        config = dataclasses.replace(config, mask_mode=args.mask_mode)
+    interval = args.interval
+    if interval is None:
+        interval = float(load_config()['Camera'].get('analysis_interval', 0.1))
+    output_format = args.format or ('csv' if args.output and args.output.lower().endswith('.csv') else 'jsonl')
+    render = args.annotated_dir is not None
+
+    engine = None
+    if args.workers > 0:
+        from utils.grading_engine import GradingEngine
+        engine = GradingEngine(args.workers)
+        # รอ worker โหลดโมเดลก่อน ไม่ให้เวลา warm-up ปนกับความเร็วที่รายงาน
+        for future in engine.start():
+            future.result()
+
+    out = open_output(args.output)
+    writer = csv.DictWriter(out, fieldnames=TIMELINE_FIELDS, extrasaction='ignore') if output_format == 'csv' else None
+    if writer:
+        writer.writeheader()
+
+    exit_code = 0
+    try:
+        with ThreadPoolExecutor(max_workers=2) as writer_pool:
+            for video in args.videos:
+                try:
+                    sampler = VideoSampler(video, interval, start_time=args.start, end_time=args.end)
+                except RuntimeError as e:
+                    print(e, file=sys.stderr)
+                    exit_code = 1
+                    continue
+
+                counts = {'AB': 0, 'C': 0, 'none': 0, 'error': 0}
+                stem = os.path.splitext(os.path.basename(video))[0]
+                start = time.perf_counter()
+                try:
+                    for index, video_time, result in grade_video(sampler, args.batch_size, render, config, engine):
+                        if writer:
+                            writer.writerows(dict(row, video=video, frame=index, time_s=f"{video_time:.3f}")
+                                             for row in csv_rows(video, result))
+                        else:
+                            record = dict(video=video, frame=index, time_s=round(video_time, 3), **result_to_dict(result))
+                            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                        out.flush()
+
+                        counts['error' if result.error else (result.grade or 'none')] += 1
+                        if render and result.image is not None:
+                            annotated_path = os.path.join(args.annotated_dir, stem, f"{index:06d}.jpg")
+                            writer_pool.submit(write_annotated, result.image, annotated_path)
+                            result.image = None
+                except Exception as e:
+                    print(f"{video}: {e}", file=sys.stderr)
+                    exit_code = 1
+                finally:
+                    sampler.stop()
+
+                elapsed = time.perf_counter() - start
+                # เวลาของวิดีโอที่อ่านผ่านไปจริง (รวมช่วงที่ข้าม) เทียบกับเวลาที่ใช้
+                video_seconds = max(sampler.frames_read / sampler.fps if sampler.fps > 0 else sampler.last_time, 0.0)
+                video_seconds = max(video_seconds - args.start, 0.0)
+                print(f"{video}: {sampler.frames_sampled} of {sampler.frames_read} frames "
+                      f"({video_seconds:.1f}s of video) in {elapsed:.1f}s "
+                      f"({video_seconds / elapsed if elapsed > 0 else 0:.1f}x real time) - "
+                      f"AB: {counts['AB']}, C: {counts['C']}, no durian: {counts['none']}, errors: {counts['error']}",
+                      file=sys.stderr)
+    finally:
+        out.close()
+        if engine is not None:
+            engine.shutdown()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
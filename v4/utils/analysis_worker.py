@@ -0,0 +1,77 @@
+import threading
+from collections import deque
+
+class AnalysisWorker:
+    """
+    thread วิเคราะห์ตัวเดียวที่ทำงานตลอดอายุกล้อง รับงานผ่านคิวขนาดจำกัดแบบ latest-wins
+    เมื่อคิวเต็ม งานเก่าสุดที่ยังไม่เริ่มจะถูกทิ้ง (นับใน frames_dropped) จึงมี inference พร้อมกันได้แค่งานเดียว
+    """
+
+    def __init__(self, handler, maxsize=1, on_error=None):
+        # handler(item) ถูกเรียกใน thread ของ worker ทีละงาน, on_error(exception) เมื่อ handler ผิดพลาด (จาก thread เดียวกัน)
+        self.handler = handler
+        self.on_error = on_error
+        self._queue = deque(maxlen=maxsize)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._busy = False
+
+        self.frames_submitted = 0
+        self.frames_processed = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """หยุดรับงาน ทิ้งงานที่ค้างในคิว และรอให้งานที่กำลังทำอยู่จบ (ไม่เกิน timeout)"""
+        with self._condition:
+            self._running = False
+            self._queue.clear()
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, item):
+        """ส่งงานเข้าคิว ถ้าคิวเต็มจะแทนที่งานเก่าสุด คืนค่า False เมื่อ worker หยุดแล้ว"""
+        with self._condition:
+            if not self._running:
+                return False
+            self.frames_submitted += 1
+            if len(self._queue) == self._queue.maxlen:
+                self.frames_dropped += 1
+            self._queue.append(item)
+            self._condition.notify()
+            return True
+
+    @property
+    def queue_depth(self):
+        """จำนวนงานที่รออยู่ในคิว + งานที่กำลังทำ"""
+        with self._condition:
+            return len(self._queue) + (1 if self._busy else 0)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._running and not self._queue:
+                    self._condition.wait()
+                if not self._running:
+                    return
+                item = self._queue.popleft()
+                self._busy = True
+
+            try:
+                self.handler(item)
+            except Exception as e:
+                print(f"Analysis worker error: {e}")
+                if self.on_error:
+                    self.on_error(e)
+            finally:
+                with self._condition:
+                    self._busy = False
+                    self.frames_processed += 1
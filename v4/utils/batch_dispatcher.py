@@ -0,0 +1,113 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+class DispatcherFullError(RuntimeError):
+    """คิวของ BatchDispatcher เต็ม (ผู้เรียกควรลองใหม่ภายหลัง)"""
+
+class BatchDispatcher:
+    """
+    รวมงานที่ส่งเข้ามาจากหลาย thread ภายในช่วงเวลาสั้นๆ (max_wait วินาที) เป็น batch เดียว
+    แล้วเรียก handler(items) ครั้งเดียวใน thread ของ dispatcher (เช่น process_batch = เรียกโมเดลครั้งเดียว)
+
+    submit() คืนค่า Future ของผลแต่ละงาน และจำกัดงานที่รออยู่ไม่เกิน max_pending (backpressure)
+    """
+
+    def __init__(self, handler, max_batch=8, max_wait=0.02, max_pending=32):
+        # handler(items) ต้องคืนค่า list ของผลลัพธ์ที่ยาวและเรียงตาม items
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_pending = max_pending
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._busy = 0
+
+        self.batches = 0
+        self.items_processed = 0
+        self.items_rejected = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """หยุดรับงาน ยกเลิกงานที่ยังไม่เริ่ม และรอ batch ที่กำลังทำอยู่ (ไม่เกิน timeout)"""
+        with self._condition:
+            self._running = False
+            pending, self._queue = list(self._queue), deque()
+            self._condition.notify_all()
+        for future, _ in pending:
+            future.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, item):
+        """ส่งงานหนึ่งงาน คืนค่า Future (ยก DispatcherFullError เมื่อคิวเต็ม, RuntimeError เมื่อหยุดแล้ว)"""
+        future = Future()
+        with self._condition:
+            if not self._running:
+                raise RuntimeError("Dispatcher is not running.")
+            if len(self._queue) >= self.max_pending:
+                self.items_rejected += 1
+                raise DispatcherFullError(f"Too many pending requests ({self.max_pending}).")
+            self._queue.append((future, item))
+            self._condition.notify()
+        return future
+
+    @property
+    def pending(self):
+        """จำนวนงานที่รออยู่ในคิว + งานใน batch ที่กำลังทำ"""
+        with self._condition:
+            return len(self._queue) + self._busy
+
+    @property
+    def average_batch(self):
+        return self.items_processed / self.batches if self.batches else 0.0
+
+    def _next_batch(self):
+        """รองานแรก แล้วรวมงานที่เข้ามาภายใน max_wait (หรือจนครบ max_batch)"""
+        with self._condition:
+            while self._running and not self._queue:
+                self._condition.wait()
+            if not self._running:
+                return None
+            deadline = time.monotonic() + self.max_wait
+            while self._running and len(self._queue) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+            self._busy = len(batch)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            # งานที่ผู้เรียกยกเลิกไปแล้วไม่ต้องส่งเข้า handler
+            batch = [(future, item) for future, item in batch if future.set_running_or_notify_cancel()]
+            try:
+                if batch:
+                    results = self.handler([item for _, item in batch])
+                    for (future, _), result in zip(batch, results):
+                        future.set_result(result)
+            except Exception as e:
+                print(f"Batch dispatcher error: {e}")
+                for future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._busy = 0
+                    if batch:
+                        self.batches += 1
+                        self.items_processed += len(batch)
@@ -5,7 +5,7 @@ class CameraSettingsDialog:
     def __init__(self, parent, current_settings: Dict[str, Any], on_save: Callable[[Dict[str, Any]], None]):
         self.window = ctk.CTkToplevel(parent)
         self.window.title("ตั้งค่ากล้อง")
-        self.window.geometry("500x400")
+        self.window.geometry("500x450")
         self.window.transient(parent)
         self.window.grab_set()
         
@@ -89,7 +89,18 @@ class CameraSettingsDialog:
         interval_slider.pack(fill="x", padx=10, pady=5)
         
         self.interval_label = ctk.CTkLabel(camera_frame, text=f"ความถี่: {self.analysis_interval_var.get():.1f} วินาที")
-        self.interval_label.pack(anchor="e", padx=10, pady=(0, 10))
+        self.interval_label.pack(anchor="e", padx=10, pady=(0, 5))
+        
+        # โหมด adaptive จะปรับความถี่เองตามเวลาที่ใช้วิเคราะห์จริง (ไม่ใช้ค่าจาก slider, ใช้เฉพาะ batch size = 1)
+        self.adaptive_rate_var = ctk.StringVar(value=self.current_settings.get("analysis_rate", "fixed"))
+        adaptive_switch = ctk.CTkSwitch(
+            camera_frame,
+            text="ปรับความถี่อัตโนมัติตามความเร็วเครื่อง (เฉพาะ batch size = 1)",
+            variable=self.adaptive_rate_var,
+            onvalue="adaptive",
+            offvalue="fixed"
+        )
+        adaptive_switch.pack(anchor="w", padx=10, pady=(0, 10))
         
         # Save button
         save_btn = ctk.CTkButton(
@@ -112,7 +123,8 @@ class CameraSettingsDialog:
         settings = {
             "batch_size": self.batch_size_var.get(),
             "analysis_mode": self.analysis_mode_var.get(),
-            "analysis_interval": self.analysis_interval_var.get()
+            "analysis_interval": self.analysis_interval_var.get(),
+            "analysis_rate": self.adaptive_rate_var.get()
         }
         self.on_save(settings)
         self.window.destroy()
@@ -1,8 +1,19 @@
 import configparser
 import os
+import threading
+from dataclasses import dataclass
+from utils.inference_backend import BACKENDS
 
 CONFIG_FILE = 'config.ini'
 
+# full = ขยาย mask เต็มภาพ
+# roi = ขยายเฉพาะบริเวณที่มี mask (ค่าประมาณ: diff-percentage ต่างจาก full ได้ราว 0.005 จุด,
+#       ถ้าทุเรียนเกือบเต็มภาพจะเร็วพอๆ กับ full หรือช้ากว่าเล็กน้อย)
+# native = วัดพื้นที่บน mask ความละเอียดของโมเดล (เร็วที่สุด, diff-percentage ต่างจาก full ได้ราว 0.5 จุด
+#          ส่วน red_pt/blue_pt ขยายเฉพาะแถบตามขอบกรอบจึงตรงกับ full)
+# ค่าเริ่มต้นคือ full (วิธีเดิม) ส่วน roi/native ต้องเลือกเองใน [Grading] mask_mode
+MASK_MODES = ('full', 'roi', 'native')
+
 def load_config():
     config = configparser.ConfigParser()
     if not os.path.exists(CONFIG_FILE):
@@ -17,12 +28,35 @@ def load_config():
                 "[Grading]\n"
                 "distance_threshold = 130\n"
                 "percentage_grading = 5.0\n"
-                "adj = 10\n\n"
+                "adj = 10\n"
+                "mask_mode = full\n\n"
                 "[Camera]\n"
                 "fps = 24\n"
                 "analysis_interval = 0.1\n"
                 "batch_size = 1\n"
                 "analysis_mode = auto\n"
+                "analysis_rate = fixed\n"
+                "min_interval = 0.1\n"
+                "max_interval = 2.0\n"
+                "target_utilization = 0.8\n"
+                "latency_budget = 1.0\n"
+                "preview_fps = 15\n"
+                "preview_hold = 1.0\n\n"
+                "[Model]\n"
+                "backend = pytorch\n"
+                "weights = yolo11n-seg.pt\n"
+                "imgsz = 640\n"
+                "cache_dir = model_cache\n\n"
+                "[Engine]\n"
+                "workers = 0\n\n"
+                "[Recording]\n"
+                "save_annotated = false\n"
+                "save_raw = false\n"
+                "directory = recordings\n"
+                "format = jpg\n"
+                "quality = 90\n"
+                "pattern = {date}/{time}_{source}_{kind}_{grade}_{seq:06d}.{ext}\n"
+                "max_queue = 16\n"
             )
     config.read(CONFIG_FILE)
     return config
@@ -30,3 +64,84 @@ def load_config():
 def save_config(config):
     with open(CONFIG_FILE, 'w') as configfile:
         config.write(configfile)
+    # ให้ get_config() อ่านค่าใหม่ทันที ไม่ต้องรอ mtime เปลี่ยน
+    invalidate_config()
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """ค่าตั้งค่าที่อ่านจาก config.ini ณ เวลาหนึ่ง (แก้ไขไม่ได้ ส่งต่อระหว่าง thread ได้อย่างปลอดภัย)"""
+    line_thickness: int = 2
+    text_size: float = 0.5
+    text_bold: int = 1
+    point_size: int = 5
+    distance_threshold: int = 3
+    percentage_grading: float = 5.0
+    adj: int = 10
+    mask_mode: str = 'full'
+    model_backend: str = 'pytorch'
+    model_weights: str = 'yolo11n-seg.pt'
+    model_imgsz: int = 640
+    model_cache_dir: str = 'model_cache'
+    engine_workers: int = 0
+
+    @classmethod
+    def from_parser(cls, cfg):
+        mask_mode = cfg['Grading'].get('mask_mode', 'full') or 'full'
+        if mask_mode not in MASK_MODES:
+            raise ValueError(f"Unsupported mask_mode: {mask_mode}")
+
+        # config.ini รุ่นเก่าไม่มี [Model] ใช้ค่าเริ่มต้นแทน
+        model = cfg['Model'] if cfg.has_section('Model') else {}
+        backend = model.get('backend', cls.model_backend) or cls.model_backend
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported model backend: {backend}")
+
+        # 0 = วิเคราะห์ใน process ของแอป (ไม่ใช้ process pool)
+        engine = cfg['Engine'] if cfg.has_section('Engine') else {}
+
+        return cls(
+            line_thickness=int(cfg['Rendering']['line_thickness']),
+            text_size=float(cfg['Rendering']['text_size']),
+            text_bold=int(cfg['Rendering']['text_bold']),
+            point_size=int(cfg['Rendering']['point_size']),
+            distance_threshold=int(cfg['Grading']['distance_threshold']),
+            percentage_grading=float(cfg['Grading']['percentage_grading']),
+            adj=int(cfg['Grading']['adj']),
+            mask_mode=mask_mode,
+            model_backend=backend,
+            model_weights=model.get('weights', cls.model_weights),
+            model_imgsz=int(model.get('imgsz', cls.model_imgsz)),
+            model_cache_dir=model.get('cache_dir', cls.model_cache_dir),
+            engine_workers=int(engine.get('workers', cls.engine_workers)),
+        )
+
+_snapshot = None
+_snapshot_stamp = None
+_snapshot_lock = threading.Lock()
+
+def _file_stamp():
+    try:
+        stat = os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+def get_config():
+    """
+    คืนค่า ConfigSnapshot ล่าสุด
+    อ่าน config.ini ใหม่เฉพาะเมื่อไฟล์ถูกแก้ไข (mtime/ขนาดเปลี่ยน) หรือหลัง save_config
+    """
+    global _snapshot, _snapshot_stamp
+    with _snapshot_lock:
+        stamp = _file_stamp()
+        if _snapshot is None or stamp is None or stamp != _snapshot_stamp:
+            _snapshot = ConfigSnapshot.from_parser(load_config())
+            _snapshot_stamp = _file_stamp()
+        return _snapshot
+
+def invalidate_config():
+    """ล้าง snapshot ที่ cache ไว้ ครั้งถัดไปจะอ่าน config.ini ใหม่"""
+    global _snapshot, _snapshot_stamp
+    with _snapshot_lock:
+        _snapshot = None
+        _snapshot_stamp = None
@@ -1,236 +1,513 @@
-from ultralytics import YOLO
+import threading
+import time
 import cv2
-import torch
 import numpy as np
-from utils.config_loader import load_config
-
-# ตรวจสอบว่าใช้ GPU ได้หรือไม่
-print("Using CUDA:", torch.cuda.is_available())
-device = 'cuda' if torch.cuda.is_available() else 'cpu'
-
-# โหลดโมเดล YOLO แบบ Segmentation
-model = YOLO('yolo11n-seg.pt')
-model.to(device)
-
-line_thickness = 2
-text_size = 0.5
-text_bold = 1
-point_size = 5
-DISTANCE_THRESHOLD = 3
-PERCENTAGE_GRADING = 5.0
-ADJ = 10
-
-def loader_config():
-    global line_thickness, text_size, text_bold, point_size, DISTANCE_THRESHOLD,PERCENTAGE_GRADING, ADJ
-    cfg = load_config()
-    line_thickness = int(cfg['Rendering']['line_thickness'])
-    text_size = float(cfg['Rendering']['text_size'])
-    text_bold = int(cfg['Rendering']['text_bold'])
-    point_size = int(cfg['Rendering']['point_size'])
-    DISTANCE_THRESHOLD = int(cfg['Grading']['distance_threshold'])
-    PERCENTAGE_GRADING = float(cfg['Grading']['percentage_grading'])
-    ADJ = int(cfg['Grading']['adj'])
-
-def calculate_grade_by_distance(segment_info, segment_area):
+from utils.config_loader import get_config
+from utils.measurement import compute_segment_area
+from utils.inference_backend import load_model
+from utils.grading_result import DetectionResult, ImageResult
+from utils.stage_timer import timed
+
+# โมเดลและ device ถูกกำหนดเมื่อเรียก get_model() ครั้งแรก
+# (import ultralytics/torch ใช้เวลาหลายวินาที จึงไม่ทำตอน import โมดูลนี้)
+model = None
+device = None
+_model_key = None
+_model_lock = threading.Lock()
+_model_ready = threading.Event()
+
+def get_model(config=None):
+    """
+    คืนค่าโมเดล YOLO แบบ Segmentation ตาม [Model] ใน config (backend/weights/imgsz)
+    โหลดครั้งแรกที่ถูกเรียก และโหลดใหม่เมื่อค่าใน [Model] เปลี่ยน (ปลอดภัยเมื่อเรียกจากหลาย thread)
+    ทุกครั้งที่โหลด is_model_ready() เป็น False จนกว่าโมเดลใหม่ inference รูปว่างเสร็จหนึ่งครั้ง
+    """
+    global model, device, _model_key
+    config = config or get_config()
+    key = (config.model_backend, config.model_weights, config.model_imgsz, config.model_cache_dir)
+    if model is None or key != _model_key:
+        with _model_lock:
+            if model is None or key != _model_key:
+                _model_ready.clear()
+                start = time.perf_counter()
+                model, device = load_model(
+                    config.model_weights,
+                    backend=config.model_backend,
+                    imgsz=config.model_imgsz,
+                    cache_dir=config.model_cache_dir,
+                )
+                _model_key = key
+                print(f"Model loaded ({config.model_backend}) in {time.perf_counter() - start:.2f}s")
+                model(np.zeros((640, 640, 3), dtype=np.uint8), device=device, imgsz=config.model_imgsz, verbose=False)
+                _model_ready.set()
+    return model
+
+def warm_up():
+    """โหลดโมเดลและ inference รูปว่างหนึ่งครั้ง (ถ้ายังไม่ได้โหลด) เพื่อไม่ให้การวิเคราะห์ครั้งแรกเสียเวลา cold-start"""
+    start = time.perf_counter()
+    get_model()
+    elapsed = time.perf_counter() - start
+    print(f"Model warm-up finished in {elapsed:.2f}s")
+    return elapsed
+
+def warm_up_async(on_ready=None, on_error=None):
+    """
+    เริ่ม warm_up() ใน background thread
+    on_ready(elapsed) / on_error(exception) ถูกเรียกจาก thread นั้น (ฝั่ง UI ต้องส่งต่อเข้า main loop เอง)
+    """
+    def run():
+        try:
+            elapsed = warm_up()
+        except Exception as e:
+            print(f"Model warm-up error: {e}")
+            if on_error:
+                on_error(e)
+            return
+        if on_ready:
+            on_ready(elapsed)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def is_model_ready():
+    """True เมื่อโมเดลโหลดและ warm-up เสร็จแล้ว"""
+    return _model_ready.is_set()
+
+def calculate_grade_by_distance(segment_info, segment_area, config=None):
     """
     red_pt คือจุดเฉลี่ยขอบ (x,y)
     blue_pt คือจุดกึ่งกลางเส้นขอบกรอบเขียว (x,y)
     """
+    percentage_grading = (config or get_config()).percentage_grading
     segment_info['left']['score'] = np.linalg.norm(np.array(segment_info['left']['red_pt']) - np.array(segment_info['left']['blue_pt']))
     segment_info['right']['score']= np.linalg.norm(np.array(segment_info['right']['red_pt']) - np.array(segment_info['right']['blue_pt']))
     segment_info['top']['score'] = np.linalg.norm(np.array(segment_info['top']['red_pt']) - np.array(segment_info['top']['blue_pt']))
     segment_info['bottom']['score'] = np.linalg.norm(np.array(segment_info['bottom']['red_pt']) - np.array(segment_info['bottom']['blue_pt']))
 
-    segment_info['left']['grade'] = "C" if segment_area['left']['diff-percentage'] > PERCENTAGE_GRADING else "AB"
-    segment_info['right']['grade'] = "C" if segment_area['right']['diff-percentage'] > PERCENTAGE_GRADING else "AB"
+    segment_info['left']['grade'] = "C" if segment_area['left']['diff-percentage'] > percentage_grading else "AB"
+    segment_info['right']['grade'] = "C" if segment_area['right']['diff-percentage'] > percentage_grading else "AB"
 
     max_score = max(segment_area['left']['diff-percentage'], segment_area['right']['diff-percentage'])
 
-    if max_score > PERCENTAGE_GRADING:
+    if max_score > percentage_grading:
         return "C", segment_info
     else:
         return "AB", segment_info
 
-def draw_results(image, mask, bounding_box):
-    global line_thickness, text_size, text_bold, point_size, ADJ
+def _new_segment_info():
     # กำหนดค่าเริ่มต้นสำหรับ segment_info
     # blue_pt durain middle point
     # red_pt durain average point
-
-    segment_info = {
+    return {
         'left': {'grade': "C", 'score': 0.0,"red_pt": None,"blue_pt": None},
         'right': {'grade': "C", 'score': 0.0, "red_pt": None, "blue_pt": None},
         'top': {'grade': "C", 'score': 0.0, "red_pt": None, "blue_pt": None},
         'bottom': {'grade': "C", 'score': 0.0, "red_pt": None, "blue_pt": None}
         }
 
-    segment_area = {
-        'left': {'top': 0, 'bottom': 0,"diff": 0,"all": 0,"diff-percentage": 0.0},
-        'right': {'top': 0, 'bottom': 0,"diff": 0,"all": 0,"diff-percentage": 0.0},
+def _contour_points(cnt, adj):
+    """คำนวณจุดกึ่งกลางขอบกรอบ (blue_pt) และจุดเฉลี่ยขอบลูก (red_pt) ของ contour หนึ่งตัว"""
+    points = cnt.reshape(-1, 2)
+    bbox = cv2.boundingRect(cnt)
+    return (bbox, *_side_points(bbox, dict.fromkeys(('left', 'right', 'top', 'bottom'), points), adj))
+
+def _side_points(bbox, points, adj):
+    """
+    blue_pt/red_pt จากกรอบ (x, y, w, h) และจุดบน contour ของแต่ละด้าน (points[side] = array ของ (x, y))
+    red_pt ของแต่ละด้านใช้เฉพาะจุดที่อยู่ห่างขอบกรอบด้านนั้นไม่เกิน adj
+    """
+    x, y, w, h = bbox
+
+    blue_pts = {
+        "top": ((x + x + w) // 2, y),
+        "bottom": ((x + x + w) // 2, y + h),
+        "left": (x, (y + y + h) // 2),
+        "right": (x + w, (y + y + h) // 2),
     }
-            
+
+    red_pts = {}
+    left_points = points["left"][points["left"][:, 0] < x + adj]
+    if len(left_points) > 0:
+        red_pts["left"] = (x, int(np.mean(left_points[:, 1])))
+
+    right_points = points["right"][points["right"][:, 0] > x + w - adj]
+    if len(right_points) > 0:
+        red_pts["right"] = (x + w, int(np.mean(right_points[:, 1])))
+
+    bottom_points = points["bottom"][points["bottom"][:, 1] > y + h - adj]
+    if len(bottom_points) > 0:
+        red_pts["bottom"] = (x + w // 2, int(np.mean(bottom_points[:, 1])))
+
+    top_points = points["top"][points["top"][:, 1] < y + adj]
+    if len(top_points) > 0:
+        red_pts["top"] = (x + w // 2, int(np.mean(top_points[:, 1])))
+
+    return blue_pts, red_pts
+
+def measure(mask, offset=(0, 0), scale=(1.0, 1.0), config=None, timings=None, points=None):
+    """
+    วัดเรขาคณิตและให้เกรดจาก binary mask โดยไม่สร้างหรือวาดรูปใดๆ
+    คืนค่า (segment_info, grade, segment_area)
+    timings (dict) = บวกเวลาของขั้น contour และ area เข้าไป
+    points = (blue_pts, red_pts) ในพิกัดภาพที่คำนวณไว้แล้ว (ข้ามการหา contour จาก mask)
+
+    mask อาจเป็นเพียงบางส่วนของภาพ (offset = มุมซ้ายบนในพิกัดภาพ)
+    หรือมีความละเอียดต่างจากภาพ (scale = ขนาดพิกเซลของ mask ในหน่วยพิกเซลภาพ)
+    จุดและพื้นที่ที่คืนค่าจะอยู่ในพิกัดของภาพเต็มเสมอ
+    """
+    config = config or get_config()
+    segment_info = _new_segment_info()
+    ox, oy = offset
+    sx, sy = scale
+
+    with timed(timings, 'contour'):
+        if points is not None:
+            point_sets = [points]
+        else:
+            contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            if (ox, oy, sx, sy) != (0, 0, 1.0, 1.0):
+                # แปลงจุดกึ่งกลางพิกเซลของ mask ไปเป็นพิกัดภาพ
+                contours = [np.round((cnt + 0.5) * (sx, sy) - 0.5 + (ox, oy)).astype(np.int32) for cnt in contours]
+            point_sets = [_contour_points(cnt, config.adj)[1:] for cnt in contours]
+
+        for blue_pts, red_pts in point_sets:
+            for side, pt in blue_pts.items():
+                segment_info[side]["blue_pt"] = pt
+            for side, pt in red_pts.items():
+                segment_info[side]["red_pt"] = pt
+
+    # คำนวณเส้นแบ่งแนวนอน (y) จากจุดกลาง top-bottom (blue line)
+    center_line_y = (segment_info["top"]["blue_pt"][1] + segment_info["bottom"]["blue_pt"][1]) // 2
+    center_x = (segment_info["left"]["blue_pt"][0] + segment_info["right"]["blue_pt"][0]) // 2
+
+    # คำนวณพื้นที่ของแต่ละ segment (แปลงเส้นแบ่งกลับเป็นพิกัดของ mask)
+    with timed(timings, 'area'):
+        segment_area = compute_segment_area(
+            mask,
+            int(round((center_x - ox + 0.5) / sx - 0.5)),
+            int(round((center_line_y - oy + 0.5) / sy - 0.5)),
+            pixel_area=sx * sy
+        )
+
+    grade, segment_info = calculate_grade_by_distance(segment_info, segment_area, config)
+    return segment_info, grade, segment_area
+
+def render_results(image, mask, bounding_box, segment_info, config=None):
+    """วาดผลการวัด (กรอบ จุด เส้น และสีตามเกรด) ลงบนสำเนาของรูป คืนค่ารูป BGRA"""
+    config = config or get_config()
+    line_thickness, point_size = config.line_thickness, config.point_size
     image_with_alpha = cv2.cvtColor(image, cv2.COLOR_RGB2BGRA)
     x, y, w, h = bounding_box
     center_x = x + w // 2
     cv2.line(image_with_alpha, (center_x, y), (center_x, y + h), (0, 0, 255, 255), line_thickness)
-    
-    left_mask = np.zeros_like(mask, dtype=np.uint8)
-    right_mask = np.zeros_like(mask, dtype=np.uint8)
-    left_mask[:, :center_x] = mask[:, :center_x]
-    right_mask[:, center_x:] = mask[:, center_x:]
 
     contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
     cv2.drawContours(image_with_alpha, contours, -1, (255, 255, 255, 255), 1)
 
+    red_pts = {}
     for cnt in contours:
-        x, y, w, h = cv2.boundingRect(cnt)
-        cv2.rectangle(image_with_alpha, (x, y), (x + w, y + h), (0, 255, 0, 255), line_thickness)
-
-        points = cnt.squeeze()
-        segment_info["top"]["blue_pt"] = ((x + x + w) // 2, y)
-        segment_info["bottom"]["blue_pt"] = ((x + x + w) // 2, y + h)
-        segment_info["left"]["blue_pt"] = (x, (y + y + h) // 2)
-        segment_info["right"]["blue_pt"] = (x + w, (y + y + h) // 2)
+        (cx, cy, cw, ch), blue_pts, cnt_red_pts = _contour_points(cnt, config.adj)
+        red_pts.update(cnt_red_pts)
+        cv2.rectangle(image_with_alpha, (cx, cy), (cx + cw, cy + ch), (0, 255, 0, 255), line_thickness)
 
         # เส้นกรอบเขียว
-        cv2.line(image_with_alpha, segment_info["top"]["blue_pt"], segment_info["right"]["blue_pt"], (0, 255, 0, 255), line_thickness)
-        cv2.line(image_with_alpha, segment_info["right"]["blue_pt"], segment_info["bottom"]["blue_pt"], (0, 255, 0, 255), line_thickness)
-        cv2.line(image_with_alpha, segment_info["bottom"]["blue_pt"], segment_info["left"]["blue_pt"], (0, 255, 0, 255), line_thickness)
-        cv2.line(image_with_alpha, segment_info["left"]["blue_pt"], segment_info["top"]["blue_pt"], (0, 255, 0, 255), line_thickness)
-        
+        cv2.line(image_with_alpha, blue_pts["top"], blue_pts["right"], (0, 255, 0, 255), line_thickness)
+        cv2.line(image_with_alpha, blue_pts["right"], blue_pts["bottom"], (0, 255, 0, 255), line_thickness)
+        cv2.line(image_with_alpha, blue_pts["bottom"], blue_pts["left"], (0, 255, 0, 255), line_thickness)
+        cv2.line(image_with_alpha, blue_pts["left"], blue_pts["top"], (0, 255, 0, 255), line_thickness)
 
         # จุดกึ่งกลางเส้นขอบเขียว
-        for p in [segment_info["top"]["blue_pt"], segment_info["bottom"]["blue_pt"], segment_info["left"]["blue_pt"], segment_info["right"]["blue_pt"]]:
+        for p in [blue_pts["top"], blue_pts["bottom"], blue_pts["left"], blue_pts["right"]]:
             cv2.circle(image_with_alpha, p, point_size, (0, 0, 255, 255), -1)
-        
-        # วาดเส้นขอบน้ำเงินจุดกึ่งกลางเส้นขอบเขียว A
-        cv2.line(image_with_alpha, segment_info["left"]["blue_pt"], segment_info["right"]["blue_pt"], (0, 0, 255, 255), line_thickness)
-
-        # ตรวจหาและวาดจุดเฉลี่ยขอบลูก
-        left_points = points[points[:, 0] < x + ADJ]
-        if len(left_points) > 0:
-            left_avg_y = np.mean(left_points[:, 1])
-            left_point = (x, int(left_avg_y))
-            segment_info["left"]["red_pt"] = left_point
-            cv2.circle(image_with_alpha, left_point, point_size, (255, 0, 0, 255), -1)
-
-        right_points = points[points[:, 0] > x + w - ADJ]
-        if len(right_points) > 0:
-            right_avg_y = np.mean(right_points[:, 1])
-            right_point = (x + w, int(right_avg_y))
-            segment_info["right"]["red_pt"] = right_point
-            cv2.circle(image_with_alpha, right_point, point_size, (255, 0, 0, 255), -1)
-
-        bottom_points = points[points[:, 1] > y + h - ADJ]
-        if len(bottom_points) > 0:
-            bottom_avg = np.mean(bottom_points[:, 1])
-            bottom_point = (x + w // 2, int(bottom_avg))
-            segment_info["bottom"]["red_pt"] = bottom_point
-            cv2.circle(image_with_alpha, bottom_point, point_size, (255, 0, 0, 255), -1)
-
-        top_points = points[points[:, 1] < y + ADJ]
-        if len(top_points) > 0:
-            top_avg = np.mean(top_points[:, 1])
-            top_point = (x + w // 2, int(top_avg))
-            segment_info["top"]["red_pt"] = top_point
-            cv2.circle(image_with_alpha, top_point, point_size, (255, 0, 0, 255), -1)
-
-        # เส้นขอบดำจุดเฉลี่ยขอบ
-        cv2.line(image_with_alpha, segment_info["right"]["red_pt"], segment_info["right"]["blue_pt"], (0, 0, 0, 255), line_thickness)
-        cv2.line(image_with_alpha, segment_info["left"]["red_pt"], segment_info["left"]["blue_pt"], (0, 0, 0, 255), line_thickness)
-
-    # คำนวณเส้นแบ่งแนวนอน (y) จากจุดกลาง top-bottom (blue line)
-    center_line_y = (segment_info["top"]["blue_pt"][1] + segment_info["bottom"]["blue_pt"][1]) // 2
-    center_x = (segment_info["left"]["blue_pt"][0] + segment_info["right"]["blue_pt"][0]) // 2
-
-    # คำนวณพื้นที่ของแต่ละ segment
-    ys, xs = np.where(mask > 0)
-    for x_point, y_point in zip(xs, ys):
-        if x_point < center_x:
-            if y_point < center_line_y:
-                segment_area['left']['top'] += 1
-            else:
-                segment_area['left']['bottom'] += 1
-        else:
-            if y_point < center_line_y:
-                segment_area['right']['top'] += 1
-            else:
-                segment_area['right']['bottom'] += 1
 
-    segment_area['left']['diff'] = abs(segment_area['left']['top'] - segment_area['left']['bottom'])
-    segment_area['right']['diff'] = abs(segment_area['right']['top'] - segment_area['right']['bottom'])
+        # วาดเส้นขอบน้ำเงินจุดกึ่งกลางเส้นขอบเขียว A
+        cv2.line(image_with_alpha, blue_pts["left"], blue_pts["right"], (0, 0, 255, 255), line_thickness)
 
-    segment_area['left']['all'] = segment_area['left']['top'] + segment_area['left']['bottom']
-    segment_area['right']['all'] = segment_area['right']['top'] + segment_area['right']['bottom']
+        # จุดเฉลี่ยขอบลูก
+        for side in ("left", "right", "bottom", "top"):
+            if side in cnt_red_pts:
+                cv2.circle(image_with_alpha, cnt_red_pts[side], point_size, (255, 0, 0, 255), -1)
 
-    segment_area['left']['diff-percentage'] = (segment_area['left']['diff']) / (segment_area['left']['all']) * 100
-    segment_area['right']['diff-percentage'] = ( segment_area['right']['diff']) / (segment_area['right']['all']) * 100
-   
-    grade, segment_info = calculate_grade_by_distance(segment_info, segment_area)
+        # เส้นขอบดำจุดเฉลี่ยขอบ
+        for side in ("right", "left"):
+            if side in red_pts:
+                cv2.line(image_with_alpha, red_pts[side], blue_pts[side], (0, 0, 0, 255), line_thickness)
 
     colors = {
         'AB': (50, 255, 50, 100),
         'C': (50, 255, 255, 100),
     }
 
-    for seg, m in [('left', left_mask), ('right', right_mask)]:
-        overlay = np.zeros_like(image_with_alpha, dtype=np.uint8)
-        overlay[m > 0] = colors[segment_info[seg]['grade']]
-        image_with_alpha = cv2.addWeighted(image_with_alpha, 1.0, overlay, 0.5, 0)
-
-
+    # ระบายสีเฉพาะบริเวณที่มี mask (ผลเท่ากับ addWeighted ทั้งภาพ เพราะ overlay ส่วนอื่นเป็น 0)
+    height, width = mask.shape[:2]
+    center_x = min(max(center_x, 0), width)
+    mx, my, mw, mh = cv2.boundingRect(mask)
+    for seg, (x0, x1) in [('left', (mx, min(mx + mw, center_x))), ('right', (max(mx, center_x), mx + mw))]:
+        if x1 <= x0 or mh == 0:
+            continue
+        roi = image_with_alpha[my:my + mh, x0:x1]
+        overlay = np.zeros_like(roi)
+        overlay[mask[my:my + mh, x0:x1] > 0] = colors[segment_info[seg]['grade']]
+        image_with_alpha[my:my + mh, x0:x1] = cv2.addWeighted(roi, 1.0, overlay, 0.5, 0)
+
+    return image_with_alpha
+
+def draw_results(image, mask, bounding_box, config=None):
+    """วัดผลและวาดผลลัพธ์ในขั้นตอนเดียว (เทียบเท่า measure + render_results)"""
+    config = config or get_config()
+    segment_info, grade, segment_area = measure(mask, config=config)
+    image_with_alpha = render_results(image, mask, bounding_box, segment_info, config)
     return image_with_alpha, segment_info, grade, segment_area
 
-def process_image(image_path):
-    loader_config()
-    image = cv2.imread(image_path)
+def load_image(image, color_order='BGR'):
+    """
+    รับรูปได้ทั้ง path ของไฟล์ หรือ numpy array ที่ระบุลำดับสี ('BGR' หรือ 'RGB')
+    คืนค่ารูป BGR สำหรับส่งเข้าโมเดล หรือ None ถ้าโหลดไม่ได้
+    """
+    if isinstance(image, str):
+        return cv2.imread(image)
+    if image is None:
+        return None
+    if color_order == 'RGB':
+        return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+    if color_order == 'BGR':
+        return image
+    raise ValueError(f"Unsupported color_order: {color_order}")
+
+def process_image(image, render=True, color_order='BGR', config=None):
+    """
+    วิเคราะห์รูปทุเรียนจาก path หรือ numpy array (ระบุลำดับสีด้วย color_order)
+    render=False จะข้ามการวาดผลลัพธ์ทั้งหมด (ImageResult.image เป็น None) สำหรับงานที่ต้องการแค่เกรด
+    config คือ ConfigSnapshot ที่ใช้ตลอดการวิเคราะห์ (ไม่ระบุ = ค่าล่าสุดจาก get_config())
+    คืนค่า ImageResult
+    """
+    start = time.perf_counter()
+    config = config or get_config()
+    timings = {}
+    with timed(timings, 'decode'):
+        image = load_image(image, color_order)
     if image is None:
-        return None, "Error: Cannot load image."
+        return ImageResult(error="Cannot load image.", elapsed=time.perf_counter() - start, timings=timings)
 
-    image_height, image_width = image.shape[:2]
-    results = model(image, device=device)[0]
+    yolo = get_model(config)
+    with timed(timings, 'inference'):
+        results = yolo(image, device=device, imgsz=config.model_imgsz)[0]
+    result = _grade_results(image, results, render, config, timings)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def process_batch(images, render=True, color_order='BGR', config=None):
+    """
+    วิเคราะห์รูปหลายรูปแบบ batch inference (เรียกโมเดลครั้งเดียวต่อกลุ่มรูปที่ขนาดเท่ากัน)
+    คืนค่า list ของ ImageResult เรียงตามลำดับรูปที่ส่งเข้ามา
+    (elapsed ของแต่ละรูป = เวลาโหลดรูป + เวลา inference เฉลี่ยต่อรูป + เวลาวัดผล)
+    """
+    config = config or get_config()
+    loaded, load_times = [], []
+    for image in images:
+        start = time.perf_counter()
+        loaded.append(load_image(image, color_order))
+        load_times.append(time.perf_counter() - start)
+    outputs = [ImageResult(error="Cannot load image.", elapsed=t, timings={'decode': t}) for t in load_times]
+
+    # รวม batch เฉพาะรูปขนาดเดียวกัน: รูปต่างขนาดใน batch เดียวถูกเติมขอบเป็นสี่เหลี่ยมจัตุรัสทุกรูป
+    # ทำให้ช้ากว่าวิเคราะห์ทีละรูปราว 2 เท่า (benchmarks/bench_batch.py)
+    groups = {}
+    for i, image in enumerate(loaded):
+        if image is not None:
+            groups.setdefault(image.shape[:2], []).append(i)
+
+    if groups:
+        yolo = get_model(config)
+    for indices in groups.values():
+        start = time.perf_counter()
+        batch_results = yolo([loaded[i] for i in indices], device=device, imgsz=config.model_imgsz)
+        inference_share = (time.perf_counter() - start) / len(indices)
+        for i, results in zip(indices, batch_results):
+            start = time.perf_counter()
+            timings = {'decode': load_times[i], 'inference': inference_share}
+            outputs[i] = _grade_results(loaded[i], results, render, config, timings)
+            outputs[i].elapsed = load_times[i] + inference_share + time.perf_counter() - start
+
+    return outputs
+
+def _unpad_masks(masks, image_height, image_width):
+    """
+    ตัดขอบ letterbox ออกจาก mask ของโมเดล ให้ mask ครอบคลุมเฉพาะพื้นที่ของภาพจริง
+    (ultralytics ย่อภาพแล้วเติมขอบให้เป็นขนาด input ซึ่งใน batch ที่รูปขนาดต่างกันจะเป็นสี่เหลี่ยมจัตุรัส
+    คำนวณขอบแบบเดียวกับ ultralytics.utils.ops.scale_masks)
+    """
+    mask_height, mask_width = masks.shape[-2:]
+    gain = min(mask_height / image_height, mask_width / image_width)
+    pad_w = (mask_width - image_width * gain) / 2
+    pad_h = (mask_height - image_height * gain) / 2
+    top, left = int(round(pad_h - 0.1)), int(round(pad_w - 0.1))
+    bottom, right = mask_height - int(round(pad_h + 0.1)), mask_width - int(round(pad_w + 0.1))
+    return masks[..., top:bottom, left:right]
+
+def _upsample_mask(seg_mask, image_height, image_width):
+    """ขยาย mask ของโมเดลเป็นขนาดภาพเต็ม (วิธีเดิม)"""
+    import torch
+
+    resized_mask = torch.nn.functional.interpolate(
+        seg_mask.unsqueeze(0).unsqueeze(0),
+        size=(image_height, image_width),
+        mode='bilinear',
+        align_corners=False
+    ).squeeze().cpu().numpy()
+
+    return (resized_mask > 0.5).astype(np.uint8) * 255
+
+def _upsample_mask_roi(seg_mask, image_height, image_width):
+    """
+    ขยาย mask เฉพาะกรอบที่ครอบส่วนที่มีค่าของ mask แทนการขยายเต็มภาพ
+    กรอบถูกจัดให้ตรงกับอัตราส่วน mask:ภาพ เพื่อให้ interpolate ของกรอบ sample ตำแหน่งเดียวกับวิธีเดิม
+    คืนค่า (binary_mask, (x0, y0)) หรือ (None, None) ถ้า mask ว่าง
+    """
+    import torch
+
+    mask_height, mask_width = seg_mask.shape
+    ys, xs = torch.nonzero(seg_mask > 0, as_tuple=True)
+    if len(ys) == 0:
+        return None, None
+
+    def aligned_range(lo, hi, mask_size, image_size):
+        # ขนาดขั้นที่ทำให้ตำแหน่ง sample ของกรอบตรงกับของภาพเต็ม
+        step = np.gcd(mask_size, image_size)
+        step_in, step_out = mask_size // step, image_size // step
+        # เผื่อแถวว่างของ mask อย่างน้อย 1 แถวรอบด้าน (bilinear ใช้พิกเซลข้างเคียง)
+        start = max((lo - 1) // step_in, 0)
+        stop = min(-(-(hi + 2) // step_in), step)
+        return start * step_in, stop * step_in, start * step_out, stop * step_out
+
+    my0, my1, y0, y1 = aligned_range(int(ys.min()), int(ys.max()), mask_height, image_height)
+    mx0, mx1, x0, x1 = aligned_range(int(xs.min()), int(xs.max()), mask_width, image_width)
+
+    resized_mask = torch.nn.functional.interpolate(
+        seg_mask[my0:my1, mx0:mx1].unsqueeze(0).unsqueeze(0),
+        size=(y1 - y0, x1 - x0),
+        mode='bilinear',
+        align_corners=False
+    ).squeeze().cpu().numpy()
+
+    return (resized_mask > 0.5).astype(np.uint8) * 255, (x0, y0)
+
+def _interp_axis(in_size, out_size, start, stop):
+    # ตำแหน่ง sample และน้ำหนักของ bilinear (align_corners=False) แบบเดียวกับ torch interpolate
+    scale = np.float32(in_size / out_size)
+    src = np.maximum((np.arange(start, stop, dtype=np.float32) + np.float32(0.5)) * scale - np.float32(0.5),
+                     np.float32(0))
+    i0 = np.minimum(src.astype(np.int64), in_size - 1)
+    i1 = np.minimum(i0 + 1, in_size - 1)
+    return i0, i1, (src - i0).astype(np.float32)
+
+def _upsample_region(mask, image_height, image_width, x0, x1, y0, y1):
+    """
+    ขยาย mask (numpy float) เป็นขนาดภาพเต็มเฉพาะบริเวณ [y0:y1, x0:x1] ของภาพ
+    ได้ค่าเท่ากับส่วนเดียวกันของ _upsample_mask ทุกพิกเซล โดยไม่ต้องขยายทั้งภาพ
+    """
+    mask_height, mask_width = mask.shape
+    r0, r1, wy = _interp_axis(mask_height, image_height, y0, y1)
+    c0, c1, wx = _interp_axis(mask_width, image_width, x0, x1)
+    # ใช้เฉพาะคอลัมน์ของ mask ที่บริเวณนี้อ้างถึง
+    lo, hi = c0[0], c1[-1] + 1
+    mask = mask[:, lo:hi]
+    rows = mask[r0] * (1 - wy)[:, None] + mask[r1] * wy[:, None]
+    resized = rows[:, c0 - lo] * (1 - wx) + rows[:, c1 - lo] * wx
+    return (resized > 0.5).astype(np.uint8) * 255
+
+def _native_points(mask, native_mask, image_height, image_width, adj):
+    """
+    blue_pt/red_pt ของโหมด native ในพิกัดภาพ ให้ตรงกับโหมด full
+    red_pt เป็นค่าเฉลี่ยของจุดบน contour ภายใน adj พิกเซลจากขอบกรอบ ซึ่งแคบกว่าพิกเซลของ mask โมเดล
+    จึงขยาย mask เป็นความละเอียดภาพเฉพาะแถบแคบๆ ตามขอบกรอบทั้ง 4 ด้าน แล้วหา contour ในแถบนั้น
+    คืนค่า (blue_pts, red_pts) หรือ None ถ้าแถบใดไม่มี mask (ให้ใช้ contour ของ mask โมเดลแทน)
+    """
+    contours, _ = cv2.findContours(native_mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contours:
+        return None
+    # ผลของ measure() มาจาก contour ตัวสุดท้าย (ตัวหลังเขียนทับตัวก่อน)
+    bx, by, bw, bh = cv2.boundingRect(contours[-1])
+    mask_height, mask_width = native_mask.shape
+    sx, sy = image_width / mask_width, image_height / mask_height
+
+    # ขอบของ mask ที่ขยายแล้วอยู่ห่างจากขอบพิกเซล mask ไม่เกิน 1 พิกเซล mask
+    # แถบต้องกว้างเกิน adj เพื่อให้ขอบที่ตัดแถบไม่ถูกนับเป็นจุดของด้านนั้น
+    x0, x1 = max(int((bx - 1) * sx), 0), min(int(np.ceil((bx + bw + 1) * sx)), image_width)
+    y0, y1 = max(int((by - 1) * sy), 0), min(int(np.ceil((by + bh + 1) * sy)), image_height)
+    margin = adj + 2
+    strips = {
+        'left': (x0, min(int(np.ceil((bx + 2) * sx)) + margin, x1), y0, y1),
+        'right': (max(int((bx + bw - 2) * sx) - margin, x0), x1, y0, y1),
+        'top': (x0, x1, y0, min(int(np.ceil((by + 2) * sy)) + margin, y1)),
+        'bottom': (x0, x1, max(int((by + bh - 2) * sy) - margin, y0), y1),
+    }
 
-    all_results = []
+    points = {}
+    for side, (sx0, sx1, sy0, sy1) in strips.items():
+        strip = _upsample_region(mask, image_height, image_width, sx0, sx1, sy0, sy1)
+        strip_contours, _ = cv2.findContours(strip, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE, offset=(sx0, sy0))
+        if not strip_contours:
+            return None
+        points[side] = np.concatenate([cnt.reshape(-1, 2) for cnt in strip_contours])
 
-    if results.masks is not None:
-        masks = results.masks.data
-        for i, (seg_mask, box) in enumerate(zip(masks, results.boxes)):
-            resized_mask = torch.nn.functional.interpolate(
-                seg_mask.unsqueeze(0).unsqueeze(0),
-                size=(image_height, image_width),
-                mode='bilinear',
-                align_corners=False
-            ).squeeze().cpu().numpy()
+    left, right = points['left'][:, 0].min(), points['right'][:, 0].max()
+    top, bottom = points['top'][:, 1].min(), points['bottom'][:, 1].max()
+    bbox = (int(left), int(top), int(right - left + 1), int(bottom - top + 1))
+    return _side_points(bbox, points, adj)
 
-            binary_mask = (resized_mask > 0.5).astype(np.uint8) * 255
+def _measure_detection(seg_mask, image_height, image_width, config, timings=None):
+    """
+    วัดผลทุเรียนหนึ่งลูกตาม config.mask_mode
+    คืนค่า (segment_info, grade, segment_area, full_mask_or_None)
+    """
+    if config.mask_mode == 'native':
+        with timed(timings, 'upsample'):
+            mask_height, mask_width = seg_mask.shape
+            mask = seg_mask.cpu().numpy().astype(np.float32)
+            native_mask = (mask > 0.5).astype(np.uint8) * 255
+        with timed(timings, 'contour'):
+            points = _native_points(mask, native_mask, image_height, image_width, config.adj)
+        scale = (image_width / mask_width, image_height / mask_height)
+        return (*measure(native_mask, scale=scale, config=config, timings=timings, points=points), None)
+
+    if config.mask_mode == 'roi':
+        with timed(timings, 'upsample'):
+            roi_mask, offset = _upsample_mask_roi(seg_mask, image_height, image_width)
+        if roi_mask is not None:
+            return (*measure(roi_mask, offset=offset, config=config, timings=timings), None)
+
+    with timed(timings, 'upsample'):
+        binary_mask = _upsample_mask(seg_mask, image_height, image_width)
+    return (*measure(binary_mask, config=config, timings=timings), binary_mask)
+
+def _grade_results(image, results, render, config, timings=None):
+    """แปลงผลลัพธ์จากโมเดลของรูปหนึ่งรูปเป็น ImageResult (เวลาของแต่ละขั้นบวกเข้า timings)"""
+    image_height, image_width = image.shape[:2]
+    result = ImageResult(timings=timings if timings is not None else {})
+    timings = result.timings
 
+    if results.masks is not None:
+        masks = _unpad_masks(results.masks.data, image_height, image_width)
+        for seg_mask, box in zip(masks, results.boxes):
+            # mask ที่อยู่ในขอบ letterbox ทั้งหมดจะว่างหลังตัดขอบ วัดผลไม่ได้
+            if not bool((seg_mask > 0.5).any()):
+                continue
             x1, y1, x2, y2 = box.xyxy.cpu().numpy()[0].astype(int)
             w, h = x2 - x1, y2 - y1
 
-            result_image, segment_info, grade, segment_area = draw_results(image.copy(), binary_mask, (x1, y1, w, h))
-
-            all_results.append({
-                'image': result_image,
-                'text': f"Durian {i+1}:\n"
-                        f"  L-Grade: {segment_info['left']['grade']}\n"
-                        f"  R-Grade: {segment_info['right']['grade']}\n"
-                        f"  Segment Area:\n"
-                        f"   - L-diff: {segment_area['left']['diff-percentage']:.2f}%\n"
-                        f"   - R-diff: {segment_area['right']['diff-percentage']:.2f}%\n"
-                        f"  Grade: {grade}"
-            })
-
-    if not all_results:
-        return None, "No durians detected."
-
-    # Return all results for batch processing
-    if len(all_results) > 1:
-        # If multiple durians detected in one image, return all results
-        combined_text = "\n".join([r['text'] for r in all_results])
-        # Check if any durian is grade C
-        overall_grade = "C" if any("Grade: C" in r['text'] for r in all_results) else "AB"
-        combined_text += f"\n\nOverall Grade: {overall_grade}"
-        return all_results[0]['image'], combined_text
-    else:
-        # Return single result for backward compatibility
-        return all_results[0]['image'], all_results[0]['text']
+            segment_info, grade, segment_area, binary_mask = _measure_detection(
+                seg_mask, image_height, image_width, config, timings)
+
+            # วาดเฉพาะรูปของทุเรียนลูกแรกที่วัดได้ เพราะเป็นรูปเดียวที่ส่งกลับไป
+            if render and result.image is None:
+                if binary_mask is None:
+                    with timed(timings, 'upsample'):
+                        binary_mask = _upsample_mask(seg_mask, image_height, image_width)
+                with timed(timings, 'render'):
+                    result.image = render_results(image, binary_mask, (x1, y1, w, h), segment_info, config)
+
+            result.detections.append(DetectionResult.from_measurement(segment_info, grade, segment_area, (x1, y1, w, h)))
+
+    return result
@@ -0,0 +1,97 @@
+import threading
+import time
+from collections import deque
+
+class FrameGrabber:
+    """
+    อ่านเฟรมจากกล้องเต็มความเร็วใน thread แยก แล้วเก็บเฉพาะเฟรมล่าสุดไว้ใน ring buffer ขนาดเล็ก
+    เฟรมเก่าที่ยังไม่มีใครอ่านจะถูกทิ้ง (นับไว้ใน frames_dropped) แทนการค้างอยู่ใน buffer ของ driver
+    """
+
+    def __init__(self, camera, buffer_size=2):
+        self.camera = camera
+        # แต่ละช่องเก็บ (frame_id, timestamp, frame) โดย timestamp เป็น time.time() ตอนอ่านเฟรมได้
+        self._frames = deque(maxlen=buffer_size)
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+        self._last_read_id = 0
+
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.fps = 0.0
+        self.error = None
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        """
+        หยุด thread อ่านเฟรม (ไม่ release กล้อง ผู้เรียกต้องทำเอง)
+        คืนค่า False ถ้า thread ยังไม่จบภายใน timeout (เช่นค้างใน camera.read()) ซึ่งยังใช้กล้องอยู่
+        """
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            return not thread.is_alive()
+        return True
+
+    @property
+    def running(self):
+        return self._running
+
+    def _run(self):
+        fps_count, fps_start = 0, time.time()
+        while self._running:
+            try:
+                ret, frame = self.camera.read()
+            except Exception as e:
+                ret, self.error = False, e
+            timestamp = time.time()
+            if not ret:
+                break
+
+            with self._condition:
+                self.frames_captured += 1
+                # ช่องเก่าสุดที่จะถูกเขียนทับ ถ้ายังไม่ถูกอ่านถือว่าเป็นเฟรมที่ถูกทิ้ง
+                if len(self._frames) == self._frames.maxlen and self._frames[0][0] > self._last_read_id:
+                    self.frames_dropped += 1
+                self._frames.append((self.frames_captured, timestamp, frame))
+                self._condition.notify_all()
+
+            fps_count += 1
+            if timestamp - fps_start >= 1.0:
+                self.fps = fps_count / (timestamp - fps_start)
+                fps_count, fps_start = 0, timestamp
+
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+
+    def wait_latest(self, after_id=0, timeout=1.0):
+        """
+        รอจนมีเฟรมที่ใหม่กว่า after_id แล้วคืนค่าเฟรมล่าสุด (frame_id, timestamp, frame)
+        คืนค่า None เมื่อหมดเวลาหรือกล้องหยุดทำงาน
+        """
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while not self._frames or self._frames[-1][0] <= after_id:
+                remaining = deadline - time.monotonic()
+                if not self._running or remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+            item = self._frames[-1]
+            self._mark_read(item[0])
+            return item
+
+    def _mark_read(self, frame_id):
+        # เฟรมที่อยู่ระหว่างเฟรมที่อ่านครั้งก่อนกับครั้งนี้ถูกข้ามไป
+        skipped = sum(1 for fid, _, _ in self._frames if self._last_read_id < fid < frame_id)
+        self.frames_dropped += skipped
+        self._last_read_id = max(self._last_read_id, frame_id)
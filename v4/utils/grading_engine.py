@@ -0,0 +1,122 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.config_loader import get_config
+
+def default_worker_count():
+    """จำนวน worker เริ่มต้น: ครึ่งหนึ่งของจำนวน core (อย่างน้อย 1 ไม่เกิน 4)"""
+    return max(1, min(4, (os.cpu_count() or 2) // 2))
+
+_ready_barrier = None
+
+def _init_worker(threads, ready_barrier):
+    """เรียกครั้งเดียวตอน worker เริ่ม: จำกัด thread ของ torch แล้วโหลด/warm-up โมเดลของ worker นี้"""
+    global _ready_barrier
+    _ready_barrier = ready_barrier
+    import torch
+    torch.set_num_threads(threads)
+
+    from utils import durian_grader
+    durian_grader.warm_up()
+
+def _worker_ready():
+    # ถืองานไว้จน worker ทุกตัวได้งานนี้พร้อมกัน worker ที่โหลดเสร็จก่อนจึงรับงานเกินหนึ่งชิ้นไม่ได้
+    _ready_barrier.wait()
+    return os.getpid()
+
+def _worker_process_batch(images, render, color_order, config):
+    from utils import durian_grader
+    return durian_grader.process_batch(images, render=render, color_order=color_order, config=config)
+
+class GradingEngine:
+    """
+    pool ของ worker process สำหรับวิเคราะห์รูป แต่ละ worker มีโมเดลของตัวเอง
+    งาน inference และการวัดผลจึงไม่แย่ง GIL กับ Tk main loop และใช้ได้หลาย core
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or default_worker_count()
+        # แบ่ง core ให้แต่ละ worker ไม่ให้ torch เปิด thread ซ้อนกันเกินจำนวน core
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        # ใช้ spawn เสมอ (fork หลังจากโหลด torch/Tk แล้วไม่ปลอดภัย)
+        context = multiprocessing.get_context('spawn')
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(threads, context.Barrier(self.workers)),
+        )
+        self._ready = threading.Event()
+
+    def start(self, on_ready=None, on_error=None):
+        """
+        เริ่ม worker ทุกตัวพร้อมกัน (แต่ละตัวโหลดโมเดลใน initializer) โดยไม่รอ
+        พร้อมใช้เมื่อได้ pid ครบ workers ตัวที่ต่างกัน (ทุก worker โหลดเสร็จ ไม่ใช่แค่ตัวที่เร็วที่สุด)
+        on_ready(elapsed) / on_error(exception) ถูกเรียกจาก thread ของ executor
+        """
+        start = time.perf_counter()
+        futures = [self._executor.submit(_worker_ready) for _ in range(self.workers)]
+        remaining = [len(futures)]
+        pids = set()
+        lock = threading.Lock()
+
+        def done(future):
+            error = future.exception()
+            with lock:
+                if error is None:
+                    pids.add(future.result())
+                remaining[0] -= 1
+                finished = remaining[0] == 0
+            if error is None and finished and len(pids) != self.workers:
+                error = RuntimeError(f"Only {len(pids)} of {self.workers} workers reported ready.")
+            if error is not None:
+                print(f"Grading engine error: {error}")
+                if on_error:
+                    on_error(error)
+            elif finished:
+                self._ready.set()
+                elapsed = time.perf_counter() - start
+                print(f"Grading engine ready ({self.workers} workers) in {elapsed:.2f}s")
+                if on_ready:
+                    on_ready(elapsed)
+
+        for future in futures:
+            future.add_done_callback(done)
+        return futures
+
+    def is_ready(self):
+        """True เมื่อ worker ทุกตัวโหลดโมเดลเสร็จแล้ว"""
+        return self._ready.is_set()
+
+    def submit_batch(self, images, render=True, color_order='BGR', config=None):
+        """
+        แบ่งรูปเป็นก้อนเท่าๆ กันตามจำนวน worker แล้วส่งเข้า pool
+        คืนค่า list ของ Future แต่ละตัวให้ผลเป็น list ของ ImageResult ของก้อนนั้น เรียงตามลำดับเดิม
+        """
+        # ใช้ snapshot ของ process หลัก ให้ทุก worker วิเคราะห์ด้วยค่าเดียวกัน
+        config = config or get_config()
+        images = list(images)
+        chunks = min(self.workers, len(images))
+        futures = []
+        for i in range(chunks):
+            chunk = images[len(images) * i // chunks:len(images) * (i + 1) // chunks]
+            futures.append(self._executor.submit(_worker_process_batch, chunk, render, color_order, config))
+        return futures
+
+    def process_batch(self, images, render=True, color_order='BGR', config=None):
+        """เหมือน durian_grader.process_batch แต่กระจายงานไปทุก worker (รอจนเสร็จ)"""
+        outputs = []
+        for future in self.submit_batch(images, render, color_order, config):
+            outputs.extend(future.result())
+        return outputs
+
+    def process_image(self, image, render=True, color_order='BGR', config=None):
+        """เหมือน durian_grader.process_image แต่รันใน worker (รอจนเสร็จ)"""
+        return self.process_batch([image], render, color_order, config)[0]
+
+    def shutdown(self, wait=True):
+        """ยกเลิกงานที่ยังไม่เริ่มและปิด worker ทั้งหมด"""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,114 @@
+from dataclasses import dataclass, field
+
+SIDES = ('left', 'right', 'top', 'bottom')
+
+def _point(pt):
+    return None if pt is None else (int(pt[0]), int(pt[1]))
+
+@dataclass(slots=True)
+class DetectionResult:
+    """ผลการวัดทุเรียนหนึ่งลูก (ตัวเลขล้วน ไม่มีข้อความที่จัดรูปแบบแล้ว)"""
+    grade: str
+    left_grade: str
+    right_grade: str
+    left_diff: float
+    right_diff: float
+    # (x, y, w, h) ของกรอบจากโมเดล ในพิกัดภาพ
+    bbox: tuple
+    # จุดของแต่ละด้าน ('left', 'right', 'top', 'bottom') -> (x, y) หรือ None
+    red_pts: dict
+    blue_pts: dict
+    # พื้นที่ส่วนบน/ล่างของฝั่งซ้าย/ขวา (พิกเซลภาพ)
+    left_area: tuple = (0, 0)
+    right_area: tuple = (0, 0)
+
+    @classmethod
+    def from_measurement(cls, segment_info, grade, segment_area, bbox):
+        """สร้างจากผลของ measure() / calculate_grade_by_distance()"""
+        return cls(
+            grade=grade,
+            left_grade=segment_info['left']['grade'],
+            right_grade=segment_info['right']['grade'],
+            left_diff=float(segment_area['left']['diff-percentage']),
+            right_diff=float(segment_area['right']['diff-percentage']),
+            bbox=tuple(int(v) for v in bbox),
+            red_pts={side: _point(segment_info[side]['red_pt']) for side in SIDES},
+            blue_pts={side: _point(segment_info[side]['blue_pt']) for side in SIDES},
+            left_area=(segment_area['left']['top'], segment_area['left']['bottom']),
+            right_area=(segment_area['right']['top'], segment_area['right']['bottom']),
+        )
+
+@dataclass(slots=True)
+class ImageResult:
+    """ผลการวิเคราะห์รูปหนึ่งรูป: ทุเรียนทุกลูกที่พบ รูปที่วาดผลแล้ว (ถ้ามี) และเวลาที่ใช้"""
+    detections: list = field(default_factory=list)
+    # รูปที่วาดผลของทุเรียนลูกแรก (None เมื่อ render=False หรือไม่พบทุเรียน)
+    image: object = None
+    # ข้อความผิดพลาด เช่นเปิดรูปไม่ได้ (None = วิเคราะห์สำเร็จ)
+    error: str = None
+    # เวลาที่ใช้วิเคราะห์รูปนี้ (วินาที)
+    elapsed: float = 0.0
+    # เวลาของแต่ละขั้น {stage: วินาที} ดู utils.stage_timer.STAGES
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def grade(self):
+        """เกรดรวมของรูป: C ถ้ามีลูกใดเป็น C, None ถ้าไม่พบทุเรียนหรือผิดพลาด"""
+        if not self.detections:
+            return None
+        return "C" if any(d.grade == "C" for d in self.detections) else "AB"
+
+def overall_grade(results):
+    """เกรดรวมของหลายรูป: C ถ้ามีรูปใดเป็น C ไม่เช่นนั้น AB"""
+    return "C" if any(r.grade == "C" for r in results) else "AB"
+
+def result_to_dict(result):
+    """แปลง ImageResult เป็น dict ของค่าพื้นฐาน (สำหรับ JSON) ไม่รวมรูปที่วาดผลแล้ว"""
+    return {
+        'grade': result.grade,
+        'error': result.error,
+        'elapsed_ms': round(result.elapsed * 1000, 2),
+        'timings_ms': {stage: round(seconds * 1000, 2) for stage, seconds in result.timings.items()},
+        'detections': [
+            {
+                'grade': d.grade,
+                'left_grade': d.left_grade,
+                'right_grade': d.right_grade,
+                'left_diff': round(d.left_diff, 4),
+                'right_diff': round(d.right_diff, 4),
+                'bbox': list(d.bbox),
+                'red_pts': {side: list(pt) if pt else None for side, pt in d.red_pts.items()},
+                'blue_pts': {side: list(pt) if pt else None for side, pt in d.blue_pts.items()},
+                'left_area': list(d.left_area),
+                'right_area': list(d.right_area),
+            }
+            for d in result.detections
+        ],
+    }
+
+def result_from_dict(data):
+    """สร้าง ImageResult กลับจาก dict ของ result_to_dict (ไม่มีรูปที่วาดผลแล้ว)"""
+    def point(pt):
+        return tuple(pt) if pt else None
+
+    detections = [
+        DetectionResult(
+            grade=d['grade'],
+            left_grade=d['left_grade'],
+            right_grade=d['right_grade'],
+            left_diff=d['left_diff'],
+            right_diff=d['right_diff'],
+            bbox=tuple(d['bbox']),
+            red_pts={side: point(pt) for side, pt in d['red_pts'].items()},
+            blue_pts={side: point(pt) for side, pt in d['blue_pts'].items()},
+            left_area=tuple(d['left_area']),
+            right_area=tuple(d['right_area']),
+        )
+        for d in data.get('detections', [])
+    ]
+    return ImageResult(
+        detections=detections,
+        error=data.get('error'),
+        elapsed=data.get('elapsed_ms', 0.0) / 1000,
+        timings={stage: ms / 1000 for stage, ms in data.get('timings_ms', {}).items()},
+    )
@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import cv2
+
+FORMATS = ('jpg', 'png', 'webp')
+
+# ชื่อไฟล์ใช้ได้: {date} {time} {source} {kind} {grade} {seq} {ext} (โฟลเดอร์ย่อยถูกสร้างให้อัตโนมัติ)
+DEFAULT_PATTERN = '{date}/{time}_{source}_{kind}_{grade}_{seq:06d}.{ext}'
+
+_TO_BGR = {
+    'BGR': None,
+    'RGB': cv2.COLOR_RGB2BGR,
+    'BGRA': None,
+    'RGBA': cv2.COLOR_RGBA2BGRA,
+}
+
+class ImageWriter:
+    """
+    บันทึกรูป (ที่วาดผลแล้ว และ/หรือ เฟรมดิบ) ลงดิสก์ใน thread แยก
+    submit() ไม่บล็อกเสมอ: ถ้าคิวเต็ม (ดิสก์เขียนไม่ทัน) จะทิ้งรูปนั้นแล้วนับใน dropped
+    การแปลงสีและ encode ทั้งหมดอยู่ใน thread ของ writer ไม่อยู่ใน thread วิเคราะห์/UI
+    """
+
+    def __init__(self, directory, fmt='jpg', quality=90, pattern=DEFAULT_PATTERN, max_queue=16):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unsupported image format: {fmt}")
+        self.directory = directory
+        self.fmt = fmt
+        self.quality = quality
+        self.pattern = pattern
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """เขียนรูปที่ค้างในคิวให้หมด (ไม่เกิน timeout) แล้วหยุด thread"""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _encode_params(self):
+        # quality 0-100 ใช้กับ jpg/webp, png แปลงเป็นระดับการบีบอัด 9 (เล็กสุด) ถึง 0 (เร็วสุด)
+        if self.fmt == 'jpg':
+            return [cv2.IMWRITE_JPEG_QUALITY, int(self.quality)]
+        if self.fmt == 'webp':
+            return [cv2.IMWRITE_WEBP_QUALITY, max(int(self.quality), 1)]
+        return [cv2.IMWRITE_PNG_COMPRESSION, min(max(9 - int(self.quality) // 11, 0), 9)]
+
+    def submit(self, image, kind='annotated', source='camera', grade=None, color_order='RGB', ts=None):
+        """
+        ส่งรูปเข้าคิวเขียน คืนค่า False ถ้าถูกทิ้งเพราะคิวเต็ม
+        (ไม่ copy รูป ผู้เรียกต้องไม่แก้ไข array หลังส่ง)
+        """
+        if image is None or self._thread is None:
+            return False
+        # นับ seq ให้รูปที่ถูกทิ้งด้วย เลขที่หายไปในชื่อไฟล์จึงบอกได้ว่ามีรูปถูกทิ้ง
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        try:
+            self._queue.put_nowait((image, kind, source, grade, color_order, ts or time.time(), seq))
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    @property
+    def pending(self):
+        return self._queue.qsize()
+
+    def file_path(self, kind, source, grade, ts, seq):
+        stamp = datetime.fromtimestamp(ts)
+        # source อาจเป็น path ของไฟล์ ใช้เฉพาะชื่อไฟล์
+        source = os.path.splitext(os.path.basename(str(source)))[0] or 'image'
+        name = self.pattern.format(
+            date=stamp.strftime('%Y%m%d'),
+            time=stamp.strftime('%H%M%S_') + f"{stamp.microsecond // 1000:03d}",
+            source=source, kind=kind, grade=grade or 'none', seq=seq, ext=self.fmt,
+        )
+        return os.path.join(self.directory, name)
+
+    def _write(self, image, kind, source, grade, color_order, ts, seq):
+        code = _TO_BGR[color_order]
+        if code is not None:
+            image = cv2.cvtColor(image, code)
+        # jpg ไม่รองรับ alpha
+        if self.fmt == 'jpg' and image.ndim == 3 and image.shape[2] == 4:
+            image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+
+        ok, buffer = cv2.imencode('.' + self.fmt, image, self._encode_params())
+        if not ok:
+            raise RuntimeError(f"Cannot encode {self.fmt} image.")
+        path = self.file_path(kind, source, grade, ts, seq)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # เขียนด้วย Python แทน cv2.imwrite เพื่อให้ใช้ path ภาษาไทยบน Windows ได้
+        with open(path, 'wb') as f:
+            f.write(buffer.tobytes())
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            try:
+                self._write(*item)
+                with self._lock:
+                    self.written += 1
+            except Exception as e:
+                print(f"Image writer error: {e}")
+                with self._lock:
+                    self.errors += 1
@@ -0,0 +1,88 @@
+import os
+import shutil
+import time
+
+# pytorch = ใช้ไฟล์ .pt ตรงๆ, onnx = ONNX Runtime, openvino = OpenVINO (ทั้งสองแบบ export จาก .pt ให้อัตโนมัติ)
+BACKENDS = ('pytorch', 'onnx', 'openvino')
+
+# แพ็กเกจที่ต้องติดตั้งเพิ่มสำหรับแต่ละ backend
+_BACKEND_PACKAGES = {
+    'onnx': ('onnxruntime', 'pip install onnx onnxruntime'),
+    'openvino': ('openvino', 'pip install openvino'),
+}
+
+def exported_model_path(weights, backend, imgsz, cache_dir):
+    """
+    path ของโมเดลที่ export แล้วใน cache_dir
+    ใส่ imgsz ไว้ในชื่อ เพื่อไม่ให้ใช้ไฟล์ที่ export ด้วยขนาดอื่นผิดตัว
+    (ultralytics แยกชนิดโมเดลจากนามสกุล/ชื่อโฟลเดอร์ จึงต้องลงท้ายตามรูปแบบนั้น)
+    """
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    if backend == 'onnx':
+        name = f"{stem}_{imgsz}.onnx"
+    elif backend == 'openvino':
+        name = f"{stem}_{imgsz}_openvino_model"
+    else:
+        raise ValueError(f"Unsupported backend: {backend}")
+    return os.path.join(cache_dir, name)
+
+def _is_stale(exported, weights):
+    """True ถ้ายังไม่เคย export หรือไฟล์ .pt ใหม่กว่าไฟล์ที่ export ไว้"""
+    if not os.path.exists(exported):
+        return True
+    return os.path.getmtime(exported) < os.path.getmtime(weights)
+
+def _check_backend_package(backend):
+    module, hint = _BACKEND_PACKAGES[backend]
+    try:
+        __import__(module)
+    except ImportError:
+        raise RuntimeError(f"Backend '{backend}' requires the '{module}' package ({hint})") from None
+
+def export_model(weights, backend, imgsz=640, cache_dir='model_cache'):
+    """
+    export โมเดล .pt เป็น ONNX/OpenVINO แล้วเก็บไว้ใน cache_dir
+    ถ้ามีไฟล์ที่ export ไว้แล้วและไม่เก่ากว่า .pt จะใช้ของเดิมทันที
+    คืนค่า path ของโมเดลที่ export แล้ว
+    """
+    exported = exported_model_path(weights, backend, imgsz, cache_dir)
+    if not _is_stale(exported, weights):
+        return exported
+
+    _check_backend_package(backend)
+    from ultralytics import YOLO
+
+    start = time.perf_counter()
+    # dynamic=True ให้ letterbox แบบเดียวกับ PyTorch (ไม่บังคับเป็นสี่เหลี่ยมจัตุรัส)
+    # mask ที่ได้จึงมีขนาดเท่ากัน และโค้ดวัดผลทำงานเหมือนเดิมทุกประการ
+    output = YOLO(weights).export(format=backend, imgsz=imgsz, dynamic=True)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    if os.path.isdir(exported):
+        shutil.rmtree(exported)
+    shutil.move(str(output), exported)
+    print(f"Exported {weights} to {exported} in {time.perf_counter() - start:.2f}s")
+    return exported
+
+def load_model(weights, backend='pytorch', imgsz=640, cache_dir='model_cache'):
+    """
+    โหลดโมเดลตาม backend ที่เลือก คืนค่า (model, device)
+    ทุก backend คืน ultralytics Results รูปแบบเดียวกัน จึงใช้กับ _grade_results ได้โดยตรง
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unsupported backend: {backend}")
+
+    import torch
+    from ultralytics import YOLO
+
+    if backend == 'pytorch':
+        # ตรวจสอบว่าใช้ GPU ได้หรือไม่
+        print("Using CUDA:", torch.cuda.is_available())
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        model = YOLO(weights)
+        model.to(device)
+        return model, device
+
+    # ONNX Runtime / OpenVINO ใช้สำหรับเครื่องที่ไม่มี GPU
+    exported = export_model(weights, backend, imgsz, cache_dir)
+    return YOLO(exported, task='segment'), 'cpu'
@@ -0,0 +1,42 @@
+import numpy as np
+
+
+def empty_segment_area():
+    """โครงสร้าง segment_area เริ่มต้น (ซ้าย/ขวา × บน/ล่าง)"""
+    return {
+        'left': {'top': 0, 'bottom': 0, "diff": 0, "all": 0, "diff-percentage": 0.0},
+        'right': {'top': 0, 'bottom': 0, "diff": 0, "all": 0, "diff-percentage": 0.0},
+    }
+
+
+def compute_segment_area(mask, center_x, center_line_y, pixel_area=1.0):
+    """
+    นับพื้นที่ของ mask แยกเป็น ซ้าย/ขวา × บน/ล่าง แบบ vectorized
+
+    ให้ผลเหมือน loop เดิมใน draw_results ทุกประการ:
+    พิกเซลที่ x < center_x เป็นฝั่งซ้าย และ y < center_line_y เป็นส่วนบน
+    แต่ใช้การ slice + np.count_nonzero แทนการวนทีละพิกเซล
+
+    pixel_area คือพื้นที่ของพิกเซล mask หนึ่งพิกเซลในหน่วยพิกเซลภาพ
+    (ใช้เมื่อ mask มีความละเอียดต่ำกว่าภาพ)
+    """
+    segment_area = empty_segment_area()
+
+    height, width = mask.shape[:2]
+    # จำกัดเส้นแบ่งให้อยู่ในภาพ (index ติดลบจะทำให้ slice ผิดความหมาย)
+    cx = min(max(int(center_x), 0), width)
+    cy = min(max(int(center_line_y), 0), height)
+
+    top, bottom = mask[:cy], mask[cy:]
+    segment_area['left']['top'] = int(round(np.count_nonzero(top[:, :cx]) * pixel_area))
+    segment_area['left']['bottom'] = int(round(np.count_nonzero(bottom[:, :cx]) * pixel_area))
+    segment_area['right']['top'] = int(round(np.count_nonzero(top[:, cx:]) * pixel_area))
+    segment_area['right']['bottom'] = int(round(np.count_nonzero(bottom[:, cx:]) * pixel_area))
+
+    for side in ('left', 'right'):
+        area = segment_area[side]
+        area['diff'] = abs(area['top'] - area['bottom'])
+        area['all'] = area['top'] + area['bottom']
+        area['diff-percentage'] = area['diff'] / area['all'] * 100
+
+    return segment_area
@@ -0,0 +1,121 @@
+import threading
+import time
+
+import cv2
+from PIL import Image
+
+class PreviewRenderer:
+    """
+    ย่อเฟรมกล้องสำหรับ live preview ใน thread แยก แล้วส่ง PIL image ขนาดพอดีช่องแสดงผลให้ on_ready
+    - เก็บแค่เฟรมล่าสุด (latest-wins) เฟรมที่มาระหว่างย่อจะถูกแทนที่ ไม่ค้างคิว
+    - แสดงไม่เกิน max_fps ไม่ขึ้นกับ FPS ของกล้อง
+    - ไม่ย่อเฟรมถัดไปจนกว่า main loop จะเรียก frame_shown() จึงไม่มี callback กองใน Tk ตอน UI ช้า
+    on_ready(image) ถูกเรียกจาก thread ของ renderer ผู้เรียกต้องส่งต่อเข้า main loop เอง
+    """
+
+    def __init__(self, on_ready, max_fps=15.0):
+        self.on_ready = on_ready
+        self.max_fps = max_fps
+        self._condition = threading.Condition()
+        self._frame = None
+        self._size = None
+        self._shown = True
+        self._hold_until = 0.0
+        self._running = False
+        self._thread = None
+
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=1.0):
+        with self._condition:
+            self._running = False
+            self._frame = None
+            self._condition.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, frame, color_order='BGR'):
+        """ส่งเฟรมล่าสุด (ไม่ copy เฟรม ผู้เรียกต้องไม่แก้ไข array หลังส่ง)"""
+        with self._condition:
+            if self._frame is not None:
+                self.frames_skipped += 1
+            self._frame = (frame, color_order)
+            self._condition.notify()
+
+    def set_size(self, width, height):
+        """ขนาดช่องแสดงผล (เรียกจาก main thread ตอนเปิดกล้องและหลังปรับขนาดหน้าต่าง)"""
+        with self._condition:
+            self._size = (max(int(width), 1), max(int(height), 1))
+            self._condition.notify()
+
+    def hold(self, seconds):
+        """หยุด live preview ชั่วคราว (เช่นระหว่างแสดงรูปผลการวิเคราะห์)"""
+        with self._condition:
+            self._hold_until = time.monotonic() + seconds
+
+    @property
+    def holding(self):
+        return time.monotonic() < self._hold_until
+
+    def frame_shown(self):
+        """main loop แสดงรูปล่าสุดแล้ว พร้อมรับรูปถัดไป"""
+        with self._condition:
+            self._shown = True
+            self._condition.notify()
+
+    def _next_frame(self):
+        # รอจนมีเฟรม รู้ขนาดช่อง และรูปก่อนหน้าแสดงแล้ว
+        with self._condition:
+            while self._running and (self._frame is None or self._size is None or not self._shown):
+                self._condition.wait(0.5)
+            if not self._running:
+                return None
+            wait = self._hold_until - time.monotonic()
+            if wait > 0:
+                self._condition.wait(wait)
+                return False
+            (frame, color_order), size = self._frame, self._size
+            self._frame = None
+            self._shown = False
+            return frame, color_order, size
+
+    def _run(self):
+        last_render = 0.0
+        while self._running:
+            # จำกัดอัตราแสดงผล: รอให้ครบ 1/max_fps นับจากรูปก่อน (ระหว่างนั้นเฟรมใหม่แทนที่เฟรมเดิม)
+            if self.max_fps > 0:
+                delay = last_render + 1.0 / self.max_fps - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            item = self._next_frame()
+            if item is None:
+                return
+            if item is False:
+                continue
+            last_render = time.monotonic()
+            frame, color_order, size = item
+            try:
+                self.on_ready(render_preview(frame, *size, color_order=color_order))
+                self.frames_rendered += 1
+            except Exception as e:
+                print(f"Preview render error: {e}")
+                self.frame_shown()
+
+def render_preview(frame, max_width, max_height, color_order='BGR'):
+    """ย่อเฟรมให้พอดีช่อง (INTER_AREA) แล้วแปลงสีหลังย่อ ซึ่งถูกกว่าแปลงทั้งเฟรมเต็ม"""
+    height, width = frame.shape[:2]
+    ratio = min(max_width / max(width, 1), max_height / max(height, 1))
+    size = (max(int(width * ratio), 1), max(int(height * ratio), 1))
+    interpolation = cv2.INTER_AREA if size[0] < width else cv2.INTER_LINEAR
+    small = cv2.resize(frame, size, interpolation=interpolation)
+    if color_order == 'BGR':
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2RGB)
+    return Image.fromarray(small)
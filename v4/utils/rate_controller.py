@@ -0,0 +1,40 @@
+import statistics
+from collections import deque
+
+class AdaptiveRateController:
+    """
+    ปรับช่วงเวลาการวิเคราะห์ (analysis interval) อัตโนมัติจาก latency ที่วัดได้จริง
+
+    - เป้าหมายหลัก: ให้ worker วิเคราะห์ไม่เกิน target_utilization ของเวลา
+      (interval = เวลาวิเคราะห์ต่อเฟรม / target_utilization)
+    - ถ้า latency ตั้งแต่ถ่ายเฟรมจนได้ผลเกิน latency_budget จะถอย interval ออกเพิ่ม
+    - interval อยู่ในช่วง [min_interval, max_interval] เสมอ
+    """
+
+    def __init__(self, min_interval=0.1, max_interval=2.0, target_utilization=0.8,
+                 latency_budget=1.0, window=10, smoothing=0.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_utilization = target_utilization
+        self.latency_budget = latency_budget
+        self.smoothing = smoothing
+        self._processing = deque(maxlen=window)
+        self._latency = deque(maxlen=window)
+        self.interval = min_interval
+
+    def record(self, processing_time, latency):
+        """
+        บันทึกผลของการวิเคราะห์หนึ่งครั้งแล้วคำนวณ interval ใหม่
+        processing_time = เวลาที่ใช้วิเคราะห์, latency = เวลาตั้งแต่ถ่ายเฟรมจนได้ผล (วินาที)
+        """
+        self._processing.append(processing_time)
+        self._latency.append(latency)
+
+        # ใช้ median ของช่วงหลังสุด ไม่ให้เฟรมที่ช้าผิดปกติครั้งเดียวดึงค่าไปไกล
+        target = statistics.median(self._processing) / self.target_utilization
+        if statistics.median(self._latency) > self.latency_budget:
+            target = max(target, self.interval * 1.25)
+
+        interval = self.smoothing * self.interval + (1 - self.smoothing) * target
+        self.interval = min(max(interval, self.min_interval), self.max_interval)
+        return self.interval
@@ -0,0 +1,193 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+from utils.grading_result import overall_grade, result_from_dict, result_to_dict
+
+DB_FILE = 'results.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    source TEXT NOT NULL,
+    grade TEXT,
+    image_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries (ts);
+CREATE INDEX IF NOT EXISTS idx_entries_grade ON entries (grade);
+CREATE INDEX IF NOT EXISTS idx_entries_source ON entries (source);
+
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY,
+    entry_id INTEGER NOT NULL REFERENCES entries (id),
+    position INTEGER NOT NULL,
+    path TEXT,
+    grade TEXT,
+    error TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_images_entry ON images (entry_id);
+"""
+
+class StoredEntry:
+    """การวิเคราะห์หนึ่งครั้งที่อ่านจากฐานข้อมูล (รูปเดียวหรือทั้ง batch) โดย results เป็น ImageResult ที่ไม่มีรูป"""
+    __slots__ = ('id', 'ts', 'source', 'grade', 'paths', 'results')
+
+    def __init__(self, id, ts, source, grade, paths, results):
+        self.id = id
+        self.ts = ts
+        self.source = source
+        self.grade = grade
+        self.paths = paths
+        self.results = results
+
+class ResultStore:
+    """
+    เก็บผลการวิเคราะห์ลง SQLite แทนการสะสมใน list
+    add() แค่ส่งเข้าคิว แล้ว thread เขียนจะรวมหลายรายการเป็น transaction เดียว (ไม่บล็อก UI/thread วิเคราะห์)
+    ไม่เก็บประวัติในหน่วยความจำ อ่านทีละหน้าจากไฟล์ด้วย page()/iter_entries()
+    """
+
+    def __init__(self, path=DB_FILE, flush_interval=1.0, max_batch=500):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+
+        with closing(self._connect()) as conn:
+            # WAL ให้อ่านประวัติได้ระหว่างที่ thread เขียนกำลังเขียน
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _connect(self):
+        # เปิด connection ใหม่ต่อการใช้งาน (sqlite3 connection ใช้ข้าม thread ไม่ได้)
+        return sqlite3.connect(self.path, timeout=10)
+
+    def add(self, source, results, paths=None, grade=None, ts=None):
+        """
+        บันทึกการวิเคราะห์หนึ่งครั้ง: source เช่น path ของไฟล์, 'camera' หรือ 'batch'
+        results = list ของ ImageResult, grade = เกรดรวม (ไม่ระบุ = คำนวณจาก results)
+        """
+        results = list(results)
+        entry = {
+            'ts': ts if ts is not None else time.time(),
+            'source': source,
+            'grade': grade if grade is not None else (overall_grade(results) if results else None),
+            'paths': list(paths) if paths is not None else [None] * len(results),
+            'results': [result_to_dict(result) for result in results],
+        }
+        self._queue.put(entry)
+
+    def flush(self, on_done=None):
+        """
+        ให้ thread เขียนเขียนรายการที่ส่งเข้าคิวก่อนหน้านี้ทันทีโดยไม่รอ flush_interval (ไม่บล็อกผู้เรียก)
+        on_done() ถูกเรียกจาก thread เขียนหลังเขียนเสร็จ (ฝั่ง UI ต้องส่งต่อเข้า main loop เอง)
+        """
+        self._queue.put(on_done or (lambda: None))
+
+    def close(self):
+        """เขียนรายการที่ค้างให้หมดแล้วหยุด thread เขียน"""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        conn = self._connect()
+        try:
+            while True:
+                # รายการในคิว: dict = ผลที่ต้องเขียน, None = หยุด, callable = คำขอ flush() (เขียนทันทีแล้วเรียก)
+                item = self._queue.get()
+                batch = [item]
+                # รวมรายการที่เข้ามาระหว่างรอ flush_interval เป็น transaction เดียว
+                deadline = time.monotonic() + self.flush_interval
+                while isinstance(item, dict) and len(batch) < self.max_batch:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+
+                try:
+                    self._write(conn, [entry for entry in batch if isinstance(entry, dict)])
+                except sqlite3.Error as e:
+                    print(f"Result store error: {e}")
+                if callable(item):
+                    try:
+                        item()
+                    except Exception as e:
+                        print(f"Result store flush callback error: {e}")
+                if item is None:
+                    return
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _write(conn, entries):
+        with conn:
+            for entry in entries:
+                cursor = conn.execute(
+                    "INSERT INTO entries (ts, source, grade, image_count) VALUES (?, ?, ?, ?)",
+                    (entry['ts'], entry['source'], entry['grade'], len(entry['results'])))
+                conn.executemany(
+                    "INSERT INTO images (entry_id, position, path, grade, error, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(cursor.lastrowid, i, path, result['grade'], result['error'], json.dumps(result))
+                     for i, (path, result) in enumerate(zip(entry['paths'], entry['results']))])
+
+    @staticmethod
+    def _where(grade=None, source=None, since=None, until=None):
+        clauses, params = [], []
+        for clause, value in (("grade = ?", grade), ("source = ?", source), ("ts >= ?", since), ("ts < ?", until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def count(self, **filters):
+        """จำนวนการวิเคราะห์ที่ตรงเงื่อนไข (grade, source, since, until เป็น unix time)"""
+        where, params = self._where(**filters)
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM entries" + where, params).fetchone()[0]
+
+    def page(self, after_id=0, limit=100, **filters):
+        """
+        อ่านรายการที่ id มากกว่า after_id เรียงจากเก่าไปใหม่ไม่เกิน limit รายการ คืนค่า list ของ StoredEntry
+        (ใช้ id ของรายการสุดท้ายเป็น after_id ของหน้าถัดไป)
+        """
+        where, params = self._where(**filters)
+        where = (where + " AND" if where else " WHERE") + " id > ?"
+        conn = self._connect()
+        try:
+            rows = conn.execute("SELECT id, ts, source, grade FROM entries" + where + " ORDER BY id LIMIT ?",
+                                params + [after_id, limit]).fetchall()
+            if not rows:
+                return []
+            images = {}
+            placeholders = ",".join("?" * len(rows))
+            for entry_id, path, data in conn.execute(
+                    f"SELECT entry_id, path, data FROM images WHERE entry_id IN ({placeholders}) "
+                    "ORDER BY entry_id, position", [row[0] for row in rows]):
+                images.setdefault(entry_id, []).append((path, data))
+        finally:
+            conn.close()
+
+        return [
+            StoredEntry(entry_id, ts, source, grade,
+                        [path for path, _ in images.get(entry_id, [])],
+                        [result_from_dict(json.loads(data)) for _, data in images.get(entry_id, [])])
+            for entry_id, ts, source, grade in rows
+        ]
+
+    def iter_entries(self, page_size=200, **filters):
+        """วนอ่านทุกรายการทีละหน้า (ไม่โหลดประวัติทั้งหมดเข้าหน่วยความจำพร้อมกัน)"""
+        after_id = 0
+        while True:
+            entries = self.page(after_id, page_size, **filters)
+            if not entries:
+                return
+            yield from entries
+            after_id = entries[-1].id
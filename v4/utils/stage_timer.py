@@ -0,0 +1,80 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# ลำดับขั้นของ pipeline ที่จับเวลา (ใช้เรียงการแสดงผล)
+STAGES = ('decode', 'inference', 'upsample', 'contour', 'area', 'render')
+
+@contextmanager
+def timed(timings, stage):
+    """
+    จับเวลาบล็อกโค้ดแล้วบวกเข้า timings[stage] (วินาที)
+    บวกสะสมเพราะบางขั้นเกิดหลายครั้งต่อรูป (ทุเรียนหลายลูก) และ timings เป็น None = ไม่จับเวลา
+    """
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+def _percentile(sorted_values, q):
+    # nearest-rank บนข้อมูลที่เรียงแล้ว
+    index = min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+class StageStats:
+    """
+    เก็บเวลาของแต่ละขั้นย้อนหลัง window รูปล่าสุด แล้วคำนวณ percentile แบบ rolling
+    record() เรียกได้จากหลาย thread
+    """
+
+    def __init__(self, window=200):
+        self.window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings):
+        """บันทึก timings ของรูปหนึ่งรูป ({stage: วินาที})"""
+        with self._lock:
+            for stage, seconds in timings.items():
+                self._samples.setdefault(stage, deque(maxlen=self.window)).append(seconds)
+
+    def percentiles(self, qs=(50, 95)):
+        """คืนค่า {stage: {q: วินาที}} เรียงตาม STAGES (ขั้นที่ยังไม่มีข้อมูลจะไม่อยู่ในผล)"""
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items() if values}
+        order = [s for s in STAGES if s in samples] + sorted(s for s in samples if s not in STAGES)
+        return {stage: {q: _percentile(samples[stage], q) for q in qs} for stage in order}
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+
+    def format_table(self):
+        """ข้อความหลายบรรทัดสำหรับแผง diagnostics: p50/p95 ของแต่ละขั้นเป็น ms"""
+        lines = [f"{'stage':<10}{'p50':>8}{'p95':>8}"]
+        for stage, values in self.percentiles((50, 95)).items():
+            lines.append(f"{stage:<10}{values[50] * 1000:>8.1f}{values[95] * 1000:>8.1f}")
+        return "\n".join(lines)
+
+def batch_summary(results, stats=None):
+    """
+    สรุปเวลาของ batch หนึ่งบรรทัดสำหรับ log: เวลารวมของแต่ละขั้นใน batch
+    และ p95 แบบ rolling จาก stats (ถ้าระบุ)
+    """
+    totals = {}
+    for result in results:
+        for stage, seconds in result.timings.items():
+            totals[stage] = totals.get(stage, 0.0) + seconds
+    p95 = stats.percentiles((95,)) if stats is not None else {}
+    parts = []
+    for stage in [s for s in STAGES if s in totals] + sorted(s for s in totals if s not in STAGES):
+        part = f"{stage}={totals[stage] * 1000:.1f}ms"
+        if stage in p95:
+            part += f" (p95 {p95[stage][95] * 1000:.1f})"
+        parts.append(part)
+    return f"[timing] batch of {len(results)}: " + (", ".join(parts) or "no stages")
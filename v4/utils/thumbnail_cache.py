@@ -0,0 +1,87 @@
+import itertools
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+from PIL import Image
+from customtkinter import CTkImage
+
+def fit_size(width, height, max_width, max_height):
+    """ขนาดใหม่ที่คงอัตราส่วนภาพและพอดีกับ max_width x max_height"""
+    ratio = min(max_width / max(width, 1), max_height / max(height, 1))
+    return max(int(width * ratio), 1), max(int(height * ratio), 1)
+
+def make_thumbnail(image, max_width, max_height):
+    """ย่อรูป RGB/RGBA ด้วย INTER_AREA แล้วสร้าง CTkImage (ไม่แตะ Tk จึงเรียกนอก main thread ได้)"""
+    height, width = image.shape[:2]
+    size = fit_size(width, height, max_width, max_height)
+    interpolation = cv2.INTER_AREA if size[0] < width else cv2.INTER_LINEAR
+    img_pil = Image.fromarray(cv2.resize(image, size, interpolation=interpolation))
+    return CTkImage(light_image=img_pil, dark_image=img_pil, size=img_pil.size)
+
+class ThumbnailCache:
+    """
+    สร้าง thumbnail ใน worker thread และเก็บไว้ใน LRU cache ตาม (image_id, ขนาดช่อง)
+    รูปเดิมในช่องขนาดเดิมจึงไม่ต้องย่อใหม่ และงานของช่องที่ถูกขอใหม่ก่อนเริ่มทำจะถูกข้าม
+    on_ready(tile, image_id, size, ctk_image) ถูกเรียกจาก worker thread ผู้เรียกต้องส่งต่อเข้า main loop เอง
+    """
+
+    def __init__(self, on_ready, max_entries=64, workers=2):
+        self.on_ready = on_ready
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._latest = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnail")
+
+    def new_id(self):
+        """id ใหม่สำหรับรูปหนึ่งรูป (ใช้แทน id() ของ array ที่อาจถูกใช้ซ้ำหลัง array ถูกลบ)"""
+        return next(self._ids)
+
+    def get(self, image_id, size):
+        with self._lock:
+            key = (image_id, size)
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        return None
+
+    def request(self, tile, image_id, image, size):
+        """
+        ขอ thumbnail ของรูปสำหรับช่อง tile ขนาด size (max_width, max_height)
+        ถ้ามีใน cache จะเรียก on_ready ทันทีใน thread ที่เรียก ไม่เช่นนั้นส่งไปย่อใน worker
+        """
+        cached = self.get(image_id, size)
+        with self._lock:
+            self._latest[tile] = (image_id, size)
+        if cached is not None:
+            self.on_ready(tile, image_id, size, cached)
+            return
+        self._executor.submit(self._build, tile, image_id, image, size)
+
+    def forget_tiles(self):
+        """ยกเลิกงานของทุกช่องที่ยังไม่เริ่ม (เช่นตอนรีเซ็ต batch) โดยไม่ล้าง cache"""
+        with self._lock:
+            self._latest.clear()
+
+    def _build(self, tile, image_id, image, size):
+        with self._lock:
+            if self._latest.get(tile) != (image_id, size):
+                return
+        try:
+            thumbnail = make_thumbnail(image, *size)
+        except Exception as e:
+            print(f"Thumbnail error: {e}")
+            return
+        with self._lock:
+            self._cache[(image_id, size)] = thumbnail
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+            current = self._latest.get(tile) == (image_id, size)
+        if current:
+            self.on_ready(tile, image_id, size, thumbnail)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,116 @@
+import queue
+import threading
+
+import cv2
+
+_END = object()
+
+class VideoSampler:
+    """
+    อ่านไฟล์วิดีโอใน thread แยก (decode ล่วงหน้า) แล้วส่งเฉพาะเฟรมที่ห่างกัน interval วินาทีตามเวลาของวิดีโอ
+    เฟรมที่ไม่ได้ใช้เรียกแค่ grab() ไม่ต้อง retrieve()/แปลงสี จึงอ่านได้เร็วกว่าเวลาจริงมาก
+    วนลูปได้เป็น (frame_index, video_time, frame BGR) ตามลำดับเวลา
+    """
+
+    def __init__(self, path, interval, queue_size=16, start_time=0.0, end_time=None):
+        self.path = path
+        # interval <= 0 = ใช้ทุกเฟรม
+        self.interval = max(interval, 0.0)
+        self.start_time = start_time
+        self.end_time = end_time
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._thread = None
+
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            self.capture.release()
+            raise RuntimeError(f"Cannot open video: {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0
+        self.frame_count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+        self.frames_read = 0
+        self.frames_sampled = 0
+        self.last_time = 0.0
+        self.error = None
+
+    @property
+    def duration(self):
+        """ความยาววิดีโอจาก metadata (วินาที) หรือ 0 ถ้าไม่ทราบ"""
+        return self.frame_count / self.fps if self.fps > 0 else 0.0
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        # เคลียร์คิวให้ thread ที่รอ put อยู่ออกจากลูปได้
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.capture.release()
+
+    def _frame_time(self, index):
+        # ใช้ลำดับเฟรม/FPS เป็นหลัก (POS_MSEC ของบาง container ไม่แม่น)
+        if self.fps > 0:
+            return index / self.fps
+        return self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def _run(self):
+        next_time = self.start_time
+        index = -1
+        try:
+            while not self._stop.is_set():
+                if not self.capture.grab():
+                    break
+                index += 1
+                self.frames_read += 1
+                video_time = self._frame_time(index)
+                if self.end_time is not None and video_time > self.end_time:
+                    break
+                # เผื่อค่าคลาดเคลื่อนเล็กน้อยของเวลาแต่ละเฟรม
+                if video_time + 1e-6 < next_time:
+                    continue
+
+                ret, frame = self.capture.retrieve()
+                if not ret:
+                    break
+                # นับรอบถัดไปจากตารางเวลา (ไม่ใช่จากเวลาเฟรม) เพื่อไม่ให้ช่วงห่างค่อยๆ เลื่อน
+                if self.interval > 0:
+                    while next_time <= video_time + 1e-6:
+                        next_time += self.interval
+                self.frames_sampled += 1
+                self.last_time = video_time
+                if not self._put((index, video_time, frame)):
+                    return
+        except Exception as e:
+            self.error = e
+        self._put(_END)
+
+    def __iter__(self):
+        if self._thread is None:
+            self.start()
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                break
+            yield item
+        if self.error is not None:
+            raise self.error